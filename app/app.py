@@ -13,25 +13,39 @@ if str(APP_SRC) not in sys.path:
     sys.path.insert(0, str(APP_SRC))
 
 from paths import DB_PATH as db_path
-from utils.constants import NA_VALUE, POLUENTES_ROTULO, POLUENTES_ROTULO_REVERSO
+from utils.backends import BackendSQLite
+from utils.constants import NA_VALUE, POLUENTES_ROTULO_REVERSO, rotulo_poluente
 from utils.db import (
+    BACKEND,
     busca_cidades,
-    busca_coletas,
+    COLUNAS_GRAFICO,
+    busca_coletas_estacao,
     busca_estacoes,
+    busca_estatisticas,
+    busca_locais_coletas,
     busca_poluentes,
+    conta_coletas,
     cria_banco_sqlite,
+    itera_coletas,
     obtem_dados_unicos,
+    versao_banco,
 )
-from utils.geo import cria_mapa
+from utils.geo import area_visivel, cria_mapa
 from utils.plots import cria_boxplot, cria_grafico
-from utils.sql import efetiva_selecao, monta_filtro_terrestre, placeholders
+from utils.sql import efetiva_selecao, normaliza_area, normaliza_filtro
 from utils.ui import avisa_se, informa_se, multiselecao_todos_padrao, pills_multi
 
 
 # -------------------------
 # Configurações iniciais
 # -------------------------
-cria_banco_sqlite()
+# Máximo de coletas exibidas na tabela e linhas lidas por bloco ao preenchê-la
+LIMITE_TABELA = 100_000
+BLOCO_TABELA = 10_000
+
+# O backend Parquet consulta o dataset diretamente, sem ingestão no banco
+if BACKEND == BackendSQLite.nome:
+    cria_banco_sqlite()
 st.set_page_config(
     page_title="Visualização de Coletas de Poluentes",
     layout="wide",
@@ -44,6 +58,21 @@ st.sidebar.header("Filtros")
 incluir_coletas_oceanicas = st.sidebar.checkbox(
     "Incluir coletas oceânicas?", value=True, key="incluir_oceanicas"
 )
+somente_area_visivel = st.sidebar.checkbox(
+    "Buscar apenas na área visível do mapa?",
+    value=False,
+    key="somente_area_visivel",
+    help="Consulta só as estações dentro da área exibida no mapa (com uma margem).",
+)
+# Área (normalizada) exibida no mapa na última interação; usada no modo por área
+if somente_area_visivel:
+    area_mapa = st.session_state.get("area_mapa")
+else:
+    # Descarta a área e o enquadramento anteriores: ao religar o modo, a
+    # consulta parte do mapa atual e não de uma área já obsoleta
+    for chave in ("area_mapa", "centro_mapa", "zoom_mapa"):
+        st.session_state.pop(chave, None)
+    area_mapa = None
 
 # -------------------------
 # Controle de visibilidade dos filtros
@@ -96,8 +125,10 @@ poluentes_val = []
 if (
     estacoes_val or incluir_coletas_oceanicas
 ):  # Só mostra o seletor de poluentes se ao menos uma estação for selecionada
-    poluentes_disponiveis = busca_poluentes(db_path, estacoes_val)
-    poluentes_opcoes = [POLUENTES_ROTULO.get(p, p) for p in poluentes_disponiveis]
+    poluentes_disponiveis = busca_poluentes(
+        db_path, estacoes_val, incluir_coletas_oceanicas
+    )
+    poluentes_opcoes = [rotulo_poluente(p) for p in poluentes_disponiveis]
     selecionados = pills_multi(
         "Selecione os poluentes",
         poluentes_opcoes,
@@ -113,7 +144,9 @@ elif estacoes_val == [] and cidades_val:
 # -------------------------
 # Estrutura da consulta
 # -------------------------
-coletas = []
+locais = []
+n_coletas = 0
+filtro = None
 if estados_val and cidades_val and estacoes_val and poluentes_val:
     # Seleções efetivas (se vazio, usa todas as disponíveis em cada nível)
     estados_ok = efetiva_selecao(estados_val, ufs)
@@ -121,21 +154,21 @@ if estados_val and cidades_val and estacoes_val and poluentes_val:
     estacoes_ok = efetiva_selecao(estacoes_val, estacoes_disponiveis)
     poluentes_ok = efetiva_selecao(poluentes_val, poluentes_disponiveis)
 
-    # Monta filtro terrestre e params
-    filtro_terrestre, params = monta_filtro_terrestre(
-        estados_ok, cidades_ok, estacoes_ok, poluentes_ok
+    # Filtro normalizado (terrestre e, opcionalmente, oceânico)
+    filtro = normaliza_filtro(
+        estados_ok,
+        cidades_ok,
+        estacoes_ok,
+        poluentes_ok,
+        incluir_coletas_oceanicas,
+        area_mapa,
     )
 
-    if incluir_coletas_oceanicas:
-        pol_sql = placeholders(len(poluentes_ok))
-        query_oceanica = f" OR (state = '{NA_VALUE}' AND city = '{NA_VALUE}' AND pollutant IN ({pol_sql}))"
-        sql_query = f"SELECT * FROM coletas WHERE {filtro_terrestre}{query_oceanica}"
-        params = [*params, *poluentes_ok]
-    else:
-        sql_query = f"SELECT * FROM coletas WHERE {filtro_terrestre}"
-
-    # Executa a query
-    coletas = busca_coletas(db_path, sql_query, params)
+    # Total por consulta agregada e estações exibidas no mapa por consulta distinta,
+    # sem ler as coletas
+    versao = versao_banco(db_path)
+    n_coletas = conta_coletas(db_path, filtro, versao)
+    locais = busca_locais_coletas(db_path, filtro, versao)
 elif (poluentes_val == [] and estacoes_val) or (
     incluir_coletas_oceanicas is False and poluentes_val == []
 ):
@@ -145,7 +178,7 @@ elif (estados_val == []) and (incluir_coletas_oceanicas is False):
         True,
         "Por favor, selecione pelo menos um estado para iniciar ou inclua coletas oceânicas.",
     )
-    coletas = []
+    locais = []
 
 
 # -------------------------
@@ -156,31 +189,69 @@ col1, col2 = st.columns([2, 1], gap="large")
 # Coluna 1: Mapa e contagem de registros
 ss = None
 with col1:
-    st.sidebar.info(f"Número de coletas: {len(coletas)}")
+    st.sidebar.info(f"Número de coletas: {n_coletas}")
     st.write("### Mapa das Coletas")
     st.write("Clique em um ponto no mapa obter mais informações sobre a estação.")
-    if len(coletas) > 0:
+    # No modo por área, o mapa continua visível (mesmo sem estações na área) para
+    # que o usuário possa navegar até outra região
+    if len(locais) > 0 or area_mapa is not None:
         try:
-            if "lat" in coletas.columns and "lon" in coletas.columns:
-                gdf = gpd.GeoDataFrame(
-                    coletas,
-                    geometry=gpd.points_from_xy(coletas["lon"], coletas["lat"]),
-                    crs="EPSG:4326",
-                )
-                gdf = gdf[["station_name", "city", "state", "lat", "lon", "geometry"]]
-                m = cria_mapa(gdf)
-                map_data = st_folium(
-                    m,
-                    width=700,
-                    height=500,
-                    returned_objects=["last_object_clicked_tooltip"],
-                )
+            if len(locais) == 0 or {"lat", "lon"} <= set(locais.columns):
+                if len(locais) > 0:
+                    gdf = gpd.GeoDataFrame(
+                        locais,
+                        geometry=gpd.points_from_xy(locais["lon"], locais["lat"]),
+                        crs="EPSG:4326",
+                    )
+                    gdf = gdf[
+                        ["station_name", "city", "state", "lat", "lon", "geometry"]
+                    ]
+                    # No modo por área, o enquadramento é o do usuário
+                    m = cria_mapa(gdf, enquadrar=not somente_area_visivel)
+                else:
+                    m = folium.Map(
+                        location=st.session_state.get("centro_mapa", (-15.8, -47.9)),
+                        zoom_start=st.session_state.get("zoom_mapa") or 5,
+                    )
+
+                if somente_area_visivel:
+                    # Mantém o enquadramento do usuário quando os marcadores mudam
+                    map_data = st_folium(
+                        m,
+                        key="mapa_area",
+                        width=700,
+                        height=500,
+                        center=st.session_state.get("centro_mapa"),
+                        zoom=st.session_state.get("zoom_mapa"),
+                        returned_objects=[
+                            "last_object_clicked_tooltip",
+                            "bounds",
+                            "center",
+                            "zoom",
+                        ],
+                    )
+                    if map_data and map_data.get("center"):
+                        centro = map_data["center"]
+                        st.session_state.centro_mapa = (centro["lat"], centro["lng"])
+                        st.session_state.zoom_mapa = map_data.get("zoom")
+                    area = area_visivel(map_data.get("bounds") if map_data else None)
+                    if area is not None and normaliza_area(area) != area_mapa:
+                        # Nova área: refaz a consulta só com as estações visíveis
+                        st.session_state.area_mapa = normaliza_area(area)
+                        st.rerun()
+                else:
+                    map_data = st_folium(
+                        m,
+                        width=700,
+                        height=500,
+                        returned_objects=["last_object_clicked_tooltip"],
+                    )
 
                 if map_data and map_data.get("last_object_clicked_tooltip"):
                     clicked_station = map_data["last_object_clicked_tooltip"]
                     if (
                         clicked_station
-                        and clicked_station in coletas["station_name"].values
+                        and clicked_station in locais["station_name"].values
                     ):
                         ss = clicked_station
             else:
@@ -195,11 +266,11 @@ with col1:
 
 # Coluna 2: Gráfico de coletas
 with col2:
-    if len(coletas) > 0:
+    if len(locais) > 0:
         if "selected_station" not in st.session_state:
             st.session_state.selected_station = None
         if ss is None:
-            unique_stations = coletas["station_name"].unique().tolist()
+            unique_stations = locais["station_name"].unique().tolist()
             selected_station = st.selectbox(
                 "Escolha uma estação para visualizar o gráfico (ou clique no mapa)",
                 options=["Nenhuma"] + unique_stations,
@@ -209,12 +280,16 @@ with col2:
             if selected_station != "Nenhuma":
                 ss = selected_station
         if ss:
-            sd = coletas[coletas["station_name"] == ss]
-            sd["sample_dt"] = pd.to_datetime(sd["sample_dt"])
+            # Série da estação lida pela chave primária, já com datas e tipos corretos
+            sd = busca_coletas_estacao(
+                db_path, ss, poluentes_ok, versao_banco(db_path), COLUNAS_GRAFICO
+            )
+            poluentes_estacao = sorted(sd["pollutant"].unique().tolist())
+            local = locais.loc[locais["station_name"] == ss, ["city", "state"]]
 
             st.write(f"### Estação {ss}")
-            if sd["city"].values[0] != "N/A":
-                st.write(f"{sd['city'].values[0]} - {sd['state'].values[0]}")
+            if not local.empty and local["city"].iloc[0] != NA_VALUE:
+                st.write(f"{local['city'].iloc[0]} - {local['state'].iloc[0]}")
             if not sd.empty:
                 chart = cria_grafico(sd)
                 bplot = cria_boxplot(sd)
@@ -228,41 +303,49 @@ with col2:
                 st.write(
                     f"###### Data: {sd['sample_dt'].min().date().strftime('%d/%m/%Y')} a {sd['sample_dt'].max().date().strftime('%d/%m/%Y')}"
                 )
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write("##### Poluente A")
-                    st.write(
-                        f"###### Média: {sd[sd['pollutant'] == 'A']['value'].mean():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Desvio Padrão: {sd[sd['pollutant'] == 'A']['value'].std():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Mediana: {sd[sd['pollutant'] == 'A']['value'].median():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Mínimo: {sd[sd['pollutant'] == 'A']['value'].min():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Máximo: {sd[sd['pollutant'] == 'A']['value'].max():.2f} mg/L"
-                    )
-                with col2:
-                    st.write("##### Poluente B")
-                    st.write(
-                        f"###### Média: {sd[sd['pollutant'] == 'B']['value'].mean():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Desvio Padrão: {sd[sd['pollutant'] == 'B']['value'].std():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Mediana: {sd[sd['pollutant'] == 'B']['value'].median():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Mínimo: {sd[sd['pollutant'] == 'B']['value'].min():.2f} mg/L"
-                    )
-                    st.write(
-                        f"###### Máximo: {sd[sd['pollutant'] == 'B']['value'].max():.2f} mg/L"
-                    )
+                # Estatísticas lidas dos agregados materializados na ingestão
+                estatisticas = busca_estatisticas(
+                    db_path, ss, poluentes_estacao, versao_banco(db_path)
+                )
+                colunas_stats = st.columns(max(len(estatisticas), 1))
+                for coluna_st, linha in zip(colunas_stats, estatisticas.itertuples()):
+                    with coluna_st:
+                        rotulo = rotulo_poluente(linha.pollutant)
+                        st.write(f"##### {rotulo}")
+                        st.write(f"###### Média: {linha.media:.2f} mg/L")
+                        st.write(f"###### Desvio Padrão: {linha.desvio:.2f} mg/L")
+                        st.write(f"###### Mediana: {linha.mediana:.2f} mg/L")
+                        st.write(f"###### Mínimo: {linha.minimo:.2f} mg/L")
+                        st.write(f"###### Máximo: {linha.maximo:.2f} mg/L")
 
             else:
                 st.warning("Nenhum dado encontrado para a estação selecionada.")
+
+
+# -------------------------
+# Tabela das coletas
+# -------------------------
+if filtro is not None and n_coletas > 0:
+    st.write("### Tabela das Coletas")
+    if st.checkbox(
+        "Mostrar as coletas do filtro?",
+        value=False,
+        key="mostrar_tabela",
+        help=f"Exibe até {LIMITE_TABELA} coletas, carregadas em blocos.",
+    ):
+        # A tabela é redesenhada a cada bloco lido; a leitura para no limite, então
+        # a memória fica limitada a LIMITE_TABELA linhas
+        tabela = st.empty()
+        blocos = []
+        exibidas = 0
+        for bloco in itera_coletas(db_path, filtro, tamanho_bloco=BLOCO_TABELA):
+            blocos.append(bloco.iloc[: LIMITE_TABELA - exibidas])
+            exibidas += len(blocos[-1])
+            tabela.dataframe(
+                pd.concat(blocos, ignore_index=True),
+                use_container_width=True,
+                hide_index=True,
+            )
+            if exibidas >= LIMITE_TABELA:
+                break
+        st.caption(f"Exibindo {exibidas} de {n_coletas} coletas.")
@@ -0,0 +1,89 @@
+"""Compara o tempo de consulta dos backends SQLite e Parquet com os mesmos filtros.
+
+Uso (a partir da raiz do repositório, com o banco já criado pelo app):
+
+    python app/src/compara_backends.py --repeticoes 5
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from paths import DATASET_PATH, DB_PATH
+from utils.backends import BACKENDS, COLUNAS_FATO, COLUNAS_MAPA, cria_backend
+from utils.indice import IndiceFiltros
+from utils.sql import FiltroColetas, normaliza_filtro
+
+
+def filtros_de_teste(indice: IndiceFiltros) -> dict[str, FiltroColetas]:
+    """Monta filtros representativos, do mais amplo ao mais restrito."""
+    estados = indice.estados()
+    cidades = indice.cidades(estados)
+    estacoes = indice.estacoes(cidades)
+    filtros = {
+        "todos": normaliza_filtro(
+            estados, cidades, estacoes, indice.poluentes(estacoes, True), True
+        )
+    }
+    if estados:
+        estado = estados[:1]
+        cidades_estado = indice.cidades(estado)
+        estacoes_estado = indice.estacoes(cidades_estado)
+        filtros["um estado"] = normaliza_filtro(
+            estado,
+            cidades_estado,
+            estacoes_estado,
+            indice.poluentes(estacoes_estado),
+        )
+        estacao = estacoes_estado[:1]
+        filtros["uma estação"] = normaliza_filtro(
+            estado, cidades_estado, estacao, indice.poluentes(estacao)
+        )
+    return filtros
+
+
+def cronometra(funcao, repeticoes: int) -> tuple[float, int]:
+    """Retorna a mediana do tempo (ms) das execuções e o número de linhas lidas."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        linhas = len(funcao())
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), linhas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    parser.add_argument("--parquet", type=Path, default=DATASET_PATH)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = [cria_backend(nome, args.db, args.parquet) for nome in BACKENDS]
+    filtros = filtros_de_teste(IndiceFiltros(backends[0].combinacoes_filtros()))
+
+    print(f"{'backend':<10}{'filtro':<14}{'colunas':<10}{'linhas':>8}{'ms':>10}")
+    for nome_filtro, filtro in filtros.items():
+        for rotulo, colunas in (("mapa", COLUNAS_MAPA), ("todas", tuple(COLUNAS_FATO))):
+            for backend in backends:
+                ms, linhas = cronometra(
+                    lambda: backend.coletas(filtro, colunas), args.repeticoes
+                )
+                print(
+                    f"{backend.nome:<10}{nome_filtro:<14}{rotulo:<10}"
+                    f"{linhas:>8}{ms:>10.2f}"
+                )
+        for backend in backends:
+            ms, linhas = cronometra(lambda: backend.locais(filtro), args.repeticoes)
+            print(
+                f"{backend.nome:<10}{nome_filtro:<14}{'locais':<10}"
+                f"{linhas:>8}{ms:>10.2f}"
+            )
+
+    for backend in backends:
+        backend.fecha()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Gera o dataset particionado das coletas a partir de um Parquet único.
+
+O `src/data_prep.py` já grava o dataset ao final da preparação; este script
+converte um Parquet no formato longo já existente (p.ex. o gerado pelo notebook).
+
+Uso (a partir da raiz do repositório):
+
+    python app/src/constroi_dataset.py
+    python app/src/constroi_dataset.py --origem coletas.parquet --pasta data/coletas
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from paths import DATASET_PATH, PARQUET_PATH
+from utils.dataset import LINHAS_POR_GRUPO, grava_dataset
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--origem", type=Path, default=PARQUET_PATH)
+    parser.add_argument("--pasta", type=Path, default=DATASET_PATH)
+    parser.add_argument("--linhas-por-grupo", type=int, default=LINHAS_POR_GRUPO)
+    args = parser.parse_args()
+
+    gravados = grava_dataset(
+        pd.read_parquet(args.origem), args.pasta, args.linhas_por_grupo
+    )
+    for arquivo in gravados:
+        print(f"{arquivo.stat().st_size / 1024:>10.1f} KB  {arquivo}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Gera o armazenamento local (GeoParquet) das malhas municipais usadas pelos mapas.
+
+Executar uma vez em uma máquina com acesso à rede (ou apontando `--origem` para
+arquivos locais, com os campos {codigo} e/ou {uf}) e copiar a pasta gerada para os
+servidores sem internet.
+
+Uso (a partir da raiz do repositório):
+
+    python app/src/constroi_municipios.py --ufs ES MG RJ SP
+    python app/src/constroi_municipios.py --ufs RJ --origem "malhas/{uf}.gpkg"
+"""
+
+import argparse
+from pathlib import Path
+
+from paths import MUNICIPIOS_PATH
+from utils.municipios import (
+    CODIGOS_ESTADOS,
+    TOLERANCIAS,
+    URL_MUNICIPIOS,
+    constroi_municipios,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ufs", nargs="+", default=sorted(CODIGOS_ESTADOS))
+    parser.add_argument("--origem", default=URL_MUNICIPIOS)
+    parser.add_argument("--pasta", type=Path, default=MUNICIPIOS_PATH)
+    parser.add_argument("--tolerancias", type=float, nargs="+", default=TOLERANCIAS)
+    parser.add_argument("--sobrescrever", action="store_true")
+    args = parser.parse_args()
+
+    gravados = constroi_municipios(
+        args.ufs,
+        origem=args.origem,
+        pasta=args.pasta,
+        tolerancias=tuple(args.tolerancias),
+        sobrescrever=args.sobrescrever,
+    )
+    for arquivo in gravados:
+        print(f"{arquivo.stat().st_size / 1024:>10.1f} KB  {arquivo}")
+
+
+if __name__ == "__main__":
+    main()
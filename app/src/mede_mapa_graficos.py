@@ -0,0 +1,75 @@
+"""Mede o tempo de montagem do mapa com gráficos em função do número de estações.
+
+Gera coletas sintéticas (mesmo número de coletas por estação) e cronometra
+`cria_mapa_com_graficos`. Com a montagem agrupada por estação, o tempo por estação
+deve ficar aproximadamente constante (~25-29 ms com 32, 128 e 512 estações e 24
+coletas). Gerar os gráficos em paralelo por processos não reduziu esse tempo em
+nenhum desses tamanhos, e por isso a geração é sequencial.
+
+Uso (a partir da raiz do repositório):
+
+    python app/src/mede_mapa_graficos.py --estacoes 50 100 200 400 --coletas 24
+"""
+
+import argparse
+import time
+
+import altair as alt
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from utils.geo import cria_mapa_com_graficos
+
+# Localidade mínima, para que a medição não dependa de acesso à rede
+LOCALE_MEDICAO = alt.Locale(
+    number={"decimal": ",", "thousands": ".", "grouping": [3], "currency": ["R$", ""]}
+)
+
+
+def coletas_sinteticas(
+    n_estacoes: int, n_coletas: int, semente: int = 0
+) -> gpd.GeoDataFrame:
+    """Gera `n_coletas` datas com dois poluentes para cada uma de `n_estacoes` estações."""
+    rng = np.random.default_rng(semente)
+    estacoes = pd.DataFrame(
+        {
+            "station_name": [f"E{i}" for i in range(n_estacoes)],
+            "city": "Cidade",
+            "state": "RJ",
+            "lat": rng.uniform(-23.0, -21.0, n_estacoes),
+            "lon": rng.uniform(-44.0, -41.0, n_estacoes),
+        }
+    )
+    datas = pd.date_range("2025-01-01", periods=n_coletas, freq="7D")
+    coletas = estacoes.merge(pd.DataFrame({"sample_dt": datas}), how="cross").merge(
+        pd.DataFrame({"pollutant": ["pol_a", "pol_b"]}), how="cross"
+    )
+    coletas["value"] = rng.uniform(0, 10, len(coletas))
+    return gpd.GeoDataFrame(
+        coletas,
+        geometry=gpd.points_from_xy(coletas["lon"], coletas["lat"]),
+        crs="EPSG:4326",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--estacoes", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--coletas", type=int, default=24)
+    args = parser.parse_args()
+
+    print(f"{'estações':>9}{'linhas':>9}{'s':>9}{'ms/estação':>12}")
+    for n_estacoes in args.estacoes:
+        gdf = coletas_sinteticas(n_estacoes, args.coletas)
+        inicio = time.perf_counter()
+        cria_mapa_com_graficos(gdf, LOCALE_MEDICAO)
+        segundos = time.perf_counter() - inicio
+        print(
+            f"{n_estacoes:>9}{len(gdf):>9}{segundos:>9.2f}"
+            f"{segundos * 1000 / n_estacoes:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
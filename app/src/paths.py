@@ -5,4 +5,10 @@ from pathlib import Path
 parent_path = Path(__file__).resolve().parents[2]
 
 PARQUET_PATH = parent_path / "data" / "pontos_coleta_municipios_longo.parquet"
+DATASET_PATH = parent_path / "data" / "coletas"
 DB_PATH = parent_path / "data" / "coletas.db"
+ENTRADAS_PATH = parent_path / "data"
+COLETAS_BRUTAS_PATH = parent_path / "data" / "coletas_brutas.parquet"
+MUNICIPIOS_PATH = parent_path / "data" / "municipios"
+LOCALIZACAO_PATH = parent_path / "data" / "estacoes_municipios.parquet"
+MAPS_PATH = parent_path / "maps"
@@ -0,0 +1,727 @@
+"""Backends de consulta das coletas: SQLite (esquema estrela) e Parquet (via Arrow).
+
+Todos os backends implementam `BackendColetas` e retornam os mesmos DataFrames
+tipados (textos categóricos, `value` float32 e `sample_dt` datetime64), de modo que
+as funções de `utils/db.py` e o app não dependem de onde os dados estão.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Empty, LifoQueue
+from typing import Iterable, Iterator, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import NA_VALUE
+from utils.sql import (
+    CHAVE_AMOSTRAS,
+    SELECT_AMOSTRAS,
+    FiltroColetas,
+    monta_consulta_coletas,
+    monta_consulta_locais,
+    monta_contagem_coletas,
+    monta_filtro_estacao,
+    monta_pagina_coletas,
+)
+
+# Pragmas aplicados às conexões de leitura do pool. O journal_mode=WAL é gravado
+# no arquivo pela ingestão e permite leituras concorrentes durante a escrita.
+PRAGMAS_LEITURA = {
+    "query_only": 1,
+    "mmap_size": 256 * 1024 * 1024,  # 256 MiB mapeados em memória
+    "cache_size": -64 * 1024,  # valores negativos são em KiB -> 64 MiB por conexão
+    "temp_store": "MEMORY",
+}
+
+# Número máximo de conexões abertas simultaneamente pelo pool
+TAMANHO_POOL = 8
+
+# Quantidade de instruções preparadas mantidas em cache por conexão
+INSTRUCOES_EM_CACHE = 256
+
+# Linhas por bloco na leitura em streaming das coletas
+TAMANHO_BLOCO = 50_000
+
+# Conjuntos de colunas pedidos por cada visão do app
+COLUNAS_MAPA = ("station_name", "city", "state", "lat", "lon")
+COLUNAS_GRAFICO = ("station_name", "sample_dt", "pollutant", "value")
+COLUNAS_TABELA = ("state", "city", "station_name", "sample_dt", "pollutant", "value")
+
+# Colunas da tabela fato necessárias para montar cada coluna do resultado
+COLUNAS_FATO = {
+    "station_name": "station_id",
+    "city": "station_id",
+    "state": "station_id",
+    "lat": "station_id",
+    "lon": "station_id",
+    "sample_dt": "sample_day",
+    "pollutant": "pollutant_id",
+    "value": "value",
+}
+
+# Granularidades dos agregados. Cada período é identificado pelo dia epoch de seu
+# início; a granularidade "total" usa sempre o período 0.
+GRANULARIDADES = {
+    "dia": "datetime64[D]",
+    "mes": "datetime64[M]",
+    "ano": "datetime64[Y]",
+    "total": None,
+}
+
+COLUNAS_ESTATISTICAS = [
+    "pollutant",
+    "periodo",
+    "n",
+    "media",
+    "desvio",
+    "mediana",
+    "minimo",
+    "maximo",
+    "p25",
+    "p75",
+]
+
+
+def _valida_colunas(colunas: Sequence[str]) -> None:
+    invalidas = set(colunas) - set(COLUNAS_FATO)
+    if invalidas:
+        raise ValueError(f"Colunas inválidas: {', '.join(sorted(invalidas))}")
+
+
+def _valida_granularidade(granularidade: str) -> None:
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade '{granularidade}' inválida.")
+
+
+def calcula_agregados(
+    amostras: pd.DataFrame, chaves: Sequence[str] = ("station_id", "pollutant_id")
+) -> pd.DataFrame:
+    """Calcula os agregados de todas as granularidades para as amostras informadas.
+
+    Args:
+        amostras (pd.DataFrame): Amostras com as colunas de `chaves`, `sample_day`
+            (dias desde 1970-01-01) e `value`.
+        chaves (Sequence[str], optional): Colunas que identificam cada série.
+            Padrão é ("station_id", "pollutant_id").
+
+    Returns:
+        pd.DataFrame: Colunas de `chaves`, granularidade, periodo, n, soma,
+            soma_quadrados, minimo, maximo, p25, p50 e p75.
+    """
+    chaves = list(chaves)
+    amostras = amostras.dropna(subset=["value"])
+    amostras = amostras.assign(
+        value=amostras["value"].astype("float64"),
+        quadrado=amostras["value"].astype("float64") ** 2,
+    )
+    dias = amostras["sample_day"].to_numpy(dtype="int64").astype("datetime64[D]")
+
+    partes = []
+    for granularidade, unidade in GRANULARIDADES.items():
+        if unidade is None:
+            periodo = np.zeros(len(amostras), dtype="int64")
+        else:
+            periodo = dias.astype(unidade).astype("datetime64[D]").astype("int64")
+
+        grupos = amostras.assign(periodo=periodo).groupby(
+            [*chaves, "periodo"], sort=False, observed=True
+        )
+        agregado = grupos.agg(
+            n=("value", "size"),
+            soma=("value", "sum"),
+            soma_quadrados=("quadrado", "sum"),
+            minimo=("value", "min"),
+            maximo=("value", "max"),
+        )
+        quantis = grupos["value"].quantile([0.25, 0.5, 0.75]).unstack()
+        quantis.columns = ["p25", "p50", "p75"]
+        agregado = agregado.join(quantis).reset_index()
+        agregado["granularidade"] = granularidade
+        partes.append(agregado)
+
+    colunas = [
+        *chaves,
+        "granularidade",
+        "periodo",
+        "n",
+        "soma",
+        "soma_quadrados",
+        "minimo",
+        "maximo",
+        "p25",
+        "p50",
+        "p75",
+    ]
+    return pd.concat(partes, ignore_index=True)[colunas]
+
+
+def estatisticas_de_agregados(df: pd.DataFrame) -> pd.DataFrame:
+    """Deriva média, desvio padrão amostral e mediana a partir dos agregados.
+
+    Args:
+        df (pd.DataFrame): Agregados com as colunas pollutant, periodo, n, soma,
+            soma_quadrados, minimo, maximo, p25, p50 e p75.
+
+    Returns:
+        pd.DataFrame: Colunas de COLUNAS_ESTATISTICAS.
+    """
+    df = df.copy()
+    n = df["n"].astype(float)
+    df["periodo"] = pd.to_datetime(df["periodo"], unit="D")
+    df["media"] = df["soma"] / n
+    variancia = (df["soma_quadrados"] - df["soma"] ** 2 / n) / (n - 1)
+    df["desvio"] = np.sqrt(variancia.clip(lower=0).where(n > 1))
+    df = df.rename(columns={"p50": "mediana"})
+    return df[COLUNAS_ESTATISTICAS].reset_index(drop=True)
+
+
+class PoolConexoes:
+    """Pool de conexões somente leitura ao banco SQLite.
+
+    Cada conexão é emprestada a uma única thread por vez (uma sessão do Streamlit
+    executa em sua própria thread), e devolvida ao pool ao final do uso. As
+    conexões permanecem abertas entre execuções do app, reaproveitando o cache de
+    páginas, o mmap e as instruções preparadas de cada uma.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        tamanho_maximo: int = TAMANHO_POOL,
+        pragmas: dict | None = None,
+    ):
+        self.db_path = Path(db_path)
+        self.tamanho_maximo = tamanho_maximo
+        self.pragmas = PRAGMAS_LEITURA if pragmas is None else pragmas
+        self._livres: LifoQueue[sqlite3.Connection] = LifoQueue()
+        self._abertas = 0
+        self._lock = threading.Lock()
+
+    def _abre(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=INSTRUCOES_EM_CACHE,
+        )
+        for pragma, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {valor}")
+        return conn
+
+    @contextmanager
+    def conexao(self, timeout: float | None = 30):
+        """Empresta uma conexão do pool durante o bloco `with`.
+
+        Uma nova conexão é aberta enquanto o pool não atingir `tamanho_maximo`;
+        depois disso, aguarda até `timeout` segundos por uma conexão livre.
+        """
+        try:
+            conn = self._livres.get_nowait()
+        except Empty:
+            with self._lock:
+                pode_abrir = self._abertas < self.tamanho_maximo
+                if pode_abrir:
+                    self._abertas += 1
+            if pode_abrir:
+                try:
+                    conn = self._abre()
+                except Exception:
+                    with self._lock:
+                        self._abertas -= 1
+                    raise
+            else:
+                conn = self._livres.get(timeout=timeout)
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._livres.put(conn)
+
+    def fecha(self) -> None:
+        """Fecha todas as conexões livres do pool."""
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._abertas -= 1
+
+
+class BackendColetas(ABC):
+    """Interface comum dos backends de consulta das coletas."""
+
+    nome: str
+
+    @abstractmethod
+    def versao(self) -> int:
+        """Versão dos dados; muda sempre que os dados de origem mudam."""
+
+    @abstractmethod
+    def combinacoes_filtros(self) -> Iterable[Tuple[str, str, str, str]]:
+        """Combinações distintas (estado, cidade, estação, poluente) existentes."""
+
+    @abstractmethod
+    def coletas(
+        self, filtro: FiltroColetas, colunas: Sequence[str] = COLUNAS_MAPA
+    ) -> pd.DataFrame:
+        """Coletas que satisfazem o filtro, apenas com as colunas pedidas."""
+
+    @abstractmethod
+    def conta_coletas(self, filtro: FiltroColetas) -> int:
+        """Número de coletas que satisfazem o filtro, sem lê-las."""
+
+    @abstractmethod
+    def locais(self, filtro: FiltroColetas) -> pd.DataFrame:
+        """Estações distintas com coletas no filtro, com as colunas de COLUNAS_MAPA."""
+
+    @abstractmethod
+    def itera_coletas(
+        self,
+        filtro: FiltroColetas,
+        colunas: Sequence[str] = COLUNAS_MAPA,
+        tamanho_bloco: int = TAMANHO_BLOCO,
+    ) -> Iterator[pd.DataFrame]:
+        """Coletas que satisfazem o filtro, em blocos de até `tamanho_bloco` linhas."""
+
+    @abstractmethod
+    def coletas_estacao(
+        self,
+        estacao: str,
+        poluentes: Sequence[str],
+        colunas: Sequence[str] = COLUNAS_GRAFICO,
+    ) -> pd.DataFrame:
+        """Coletas de uma única estação, ordenadas por data."""
+
+    @abstractmethod
+    def estatisticas(
+        self, estacao: str, poluentes: Sequence[str], granularidade: str = "total"
+    ) -> pd.DataFrame:
+        """Estatísticas por poluente e período (ver COLUNAS_ESTATISTICAS)."""
+
+    def fecha(self) -> None:
+        """Libera os recursos do backend."""
+
+
+class BackendSQLite(BackendColetas):
+    """Backend sobre o banco SQLite em esquema estrela gerado por `utils/db.py`."""
+
+    nome = "sqlite"
+
+    def __init__(self, db_path: Path, pool: PoolConexoes | None = None):
+        self.db_path = Path(db_path)
+        self.pool = PoolConexoes(db_path) if pool is None else pool
+        self._dimensoes_cache: tuple[int, pd.DataFrame, pd.DataFrame] | None = None
+        self._lock = threading.Lock()
+
+    def versao(self) -> int:
+        with self.pool.conexao() as conn:
+            linha = conn.execute("SELECT MAX(id) FROM log_ingestao").fetchone()
+        return linha[0] or 0
+
+    def combinacoes_filtros(self) -> Iterable[Tuple[str, str, str, str]]:
+        """Pares (estação, poluente) com ao menos uma amostra na tabela fato.
+
+        Inclui os pares cujas amostras não têm valor (sem agregados); cada par é
+        testado por uma busca na chave primária de `amostras`, sem varrê-la.
+        """
+        sql_query = (
+            "SELECT e.state, e.city, e.station_name, p.pollutant "
+            "FROM estacoes e CROSS JOIN poluentes p "
+            "WHERE EXISTS (SELECT 1 FROM amostras a "
+            "WHERE a.station_id = e.station_id AND a.pollutant_id = p.pollutant_id)"
+        )
+        with self.pool.conexao() as conn:
+            return conn.execute(sql_query).fetchall()
+
+    def _dimensoes(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Dimensões com colunas de texto categóricas, indexadas pelo id.
+
+        Ficam em memória até a próxima mudança de versão do banco.
+        """
+        versao = self.versao()
+        with self._lock:
+            if self._dimensoes_cache and self._dimensoes_cache[0] == versao:
+                return self._dimensoes_cache[1:]
+
+        with self.pool.conexao() as conn:
+            estacoes = pd.read_sql_query(
+                "SELECT station_id, station_name, city, state, lat, lon "
+                "FROM estacoes ORDER BY station_id",
+                conn,
+                index_col="station_id",
+            )
+            poluentes = pd.read_sql_query(
+                "SELECT pollutant_id, pollutant FROM poluentes ORDER BY pollutant_id",
+                conn,
+                index_col="pollutant_id",
+            )
+        estacoes = estacoes.astype(
+            {"station_name": "category", "city": "category", "state": "category"}
+        )
+        poluentes = poluentes.astype({"pollutant": "category"})
+        with self._lock:
+            self._dimensoes_cache = (versao, estacoes, poluentes)
+        return estacoes, poluentes
+
+    @staticmethod
+    def _decodifica(
+        fato: pd.DataFrame,
+        estacoes: pd.DataFrame,
+        poluentes: pd.DataFrame,
+        colunas: Sequence[str],
+    ) -> pd.DataFrame:
+        """Converte linhas da tabela fato em colunas tipadas e compactas.
+
+        Textos viram categorias (as mesmas das dimensões), `value` vira float32 e
+        `sample_dt` vira datetime64, sem conversões linha a linha.
+        """
+        resultado = {}
+        if "station_id" in fato:
+            posicoes = estacoes.index.get_indexer(fato["station_id"])
+        if "pollutant_id" in fato:
+            posicoes_pol = poluentes.index.get_indexer(fato["pollutant_id"])
+
+        # allow_fill: ids ausentes das dimensões em cache (-1) viram valores nulos
+        for coluna in colunas:
+            if coluna in ("station_name", "city", "state", "lat", "lon"):
+                resultado[coluna] = estacoes[coluna].array.take(
+                    posicoes, allow_fill=True
+                )
+            elif coluna == "pollutant":
+                resultado[coluna] = poluentes[coluna].array.take(
+                    posicoes_pol, allow_fill=True
+                )
+            elif coluna == "sample_dt":
+                resultado[coluna] = (
+                    fato["sample_day"]
+                    .to_numpy(dtype="int64")
+                    .astype("datetime64[D]")
+                    .astype("datetime64[ns]")
+                )
+            elif coluna == "value":
+                resultado[coluna] = fato["value"].to_numpy(dtype="float32")
+        return pd.DataFrame(resultado, columns=list(colunas))
+
+    def _le_amostras(self, colunas: Sequence[str], monta_consulta) -> pd.DataFrame:
+        """Lê da tabela fato apenas as colunas necessárias e as decodifica.
+
+        Args:
+            colunas (Sequence[str]): Colunas pedidas (ver COLUNAS_FATO).
+            monta_consulta: Função que recebe a cláusula SELECT ... FROM amostras a
+                e retorna a consulta completa e seus parâmetros.
+        """
+        _valida_colunas(colunas)
+        colunas_fato = list(dict.fromkeys(COLUNAS_FATO[c] for c in colunas))
+        select = f"SELECT {', '.join('a.' + c for c in colunas_fato)} FROM amostras a"
+        sql_query, params = monta_consulta(select)
+
+        estacoes, poluentes = self._dimensoes()
+        with self.pool.conexao() as conn:
+            fato = pd.read_sql_query(sql_query, conn, params=params)
+        return self._decodifica(fato, estacoes, poluentes, colunas)
+
+    def coletas(
+        self, filtro: FiltroColetas, colunas: Sequence[str] = COLUNAS_MAPA
+    ) -> pd.DataFrame:
+        return self._le_amostras(
+            colunas, lambda select: monta_consulta_coletas(*filtro, select=select)
+        )
+
+    def conta_coletas(self, filtro: FiltroColetas) -> int:
+        sql_query, params = monta_contagem_coletas(*filtro)
+        with self.pool.conexao() as conn:
+            return conn.execute(sql_query, params).fetchone()[0]
+
+    def locais(self, filtro: FiltroColetas) -> pd.DataFrame:
+        """Lê os ids distintos das estações no banco e os decodifica pela dimensão."""
+        sql_query, params = monta_consulta_locais(*filtro)
+        estacoes, _ = self._dimensoes()
+        with self.pool.conexao() as conn:
+            ids = [linha[0] for linha in conn.execute(sql_query, params)]
+        posicoes = estacoes.index.get_indexer(ids)
+        return estacoes.iloc[posicoes[posicoes >= 0]][list(COLUNAS_MAPA)].reset_index(
+            drop=True
+        )
+
+    def itera_coletas(
+        self,
+        filtro: FiltroColetas,
+        colunas: Sequence[str] = COLUNAS_MAPA,
+        tamanho_bloco: int = TAMANHO_BLOCO,
+    ) -> Iterator[pd.DataFrame]:
+        """Lê as coletas em páginas ordenadas pela chave primária (keyset).
+
+        A conexão é devolvida ao pool entre uma página e outra, então um consumidor
+        que interrompe a leitura não retém recursos do banco.
+        """
+        _valida_colunas(colunas)
+        estacoes, poluentes = self._dimensoes()
+        apos = None
+        while True:
+            sql_query, params = monta_pagina_coletas(
+                *filtro, select=SELECT_AMOSTRAS, apos=apos, limite=tamanho_bloco
+            )
+            with self.pool.conexao() as conn:
+                fato = pd.read_sql_query(sql_query, conn, params=params)
+            if fato.empty:
+                return
+            yield self._decodifica(fato, estacoes, poluentes, colunas)
+            if len(fato) < tamanho_bloco:
+                return
+            apos = tuple(int(valor) for valor in fato.iloc[-1][list(CHAVE_AMOSTRAS)])
+
+    def coletas_estacao(
+        self,
+        estacao: str,
+        poluentes: Sequence[str],
+        colunas: Sequence[str] = COLUNAS_GRAFICO,
+    ) -> pd.DataFrame:
+        def monta_consulta(select):
+            filtro, params = monta_filtro_estacao(estacao, poluentes)
+            return f"{select} WHERE {filtro} ORDER BY a.sample_day", params
+
+        return self._le_amostras(colunas, monta_consulta)
+
+    def estatisticas(
+        self, estacao: str, poluentes: Sequence[str], granularidade: str = "total"
+    ) -> pd.DataFrame:
+        """Lê os agregados materializados na ingestão, sem varrer as amostras."""
+        _valida_granularidade(granularidade)
+        pols = ",".join(["?"] * len(poluentes))
+        sql_query = (
+            "SELECT p.pollutant, g.periodo, g.n, g.soma, g.soma_quadrados, "
+            "g.minimo, g.maximo, g.p25, g.p50, g.p75 "
+            "FROM agregados g "
+            "JOIN estacoes e ON e.station_id = g.station_id "
+            "JOIN poluentes p ON p.pollutant_id = g.pollutant_id "
+            f"WHERE e.station_name = ? AND p.pollutant IN ({pols}) "
+            "AND g.granularidade = ? "
+            "ORDER BY p.pollutant, g.periodo"
+        )
+        with self.pool.conexao() as conn:
+            df = pd.read_sql_query(
+                sql_query, conn, params=(estacao, *poluentes, granularidade)
+            )
+        return estatisticas_de_agregados(df)
+
+    def fecha(self) -> None:
+        self.pool.fecha()
+
+
+class BackendParquet(BackendColetas):
+    """Backend que consulta o Parquet (arquivo ou diretório) diretamente via Arrow.
+
+    Os filtros são convertidos em expressões do `pyarrow.dataset`, que lê apenas as
+    colunas pedidas, descarta row groups cujas estatísticas min/max não satisfazem
+    o filtro e aplica o restante do predicado durante a leitura.
+    """
+
+    nome = "parquet"
+
+    def __init__(self, data_path: Path):
+        self.data_path = Path(data_path)
+        self._dataset = None
+        self._versao_dataset = None
+        self._lock = threading.Lock()
+
+    def versao(self) -> int:
+        from utils.dataset import arquivos_dataset
+
+        assinatura = [
+            (str(arquivo), arquivo.stat().st_size, arquivo.stat().st_mtime_ns)
+            for arquivo in arquivos_dataset(self.data_path)
+        ]
+        return int(hashlib.sha1(repr(assinatura).encode()).hexdigest()[:12], 16)
+
+    def _abre(self):
+        """Abre (ou reabre, se os arquivos mudaram) o dataset Arrow."""
+        import pyarrow.dataset as ds
+
+        versao = self.versao()
+        with self._lock:
+            if self._dataset is None or self._versao_dataset != versao:
+                self._dataset = ds.dataset(
+                    self.data_path, format="parquet", partitioning="hive"
+                )
+                self._versao_dataset = versao
+            return self._dataset
+
+    @staticmethod
+    def _expressao(filtro: FiltroColetas):
+        """Converte o FiltroColetas na expressão Arrow equivalente."""
+        import pyarrow.compute as pc
+
+        poluentes = pc.field("pollutant").isin(list(filtro.poluentes))
+        expressao = (
+            pc.field("state").isin(list(filtro.estados))
+            & pc.field("city").isin(list(filtro.cidades))
+            & pc.field("station_name").isin(list(filtro.estacoes))
+            & poluentes
+        )
+        if filtro.incluir_oceanicas:
+            expressao = expressao | (
+                (pc.field("state") == NA_VALUE)
+                & (pc.field("city") == NA_VALUE)
+                & poluentes
+            )
+        if filtro.area is not None:
+            # Intervalos em lat/lon também descartam row groups pelas estatísticas
+            sul, oeste, norte, leste = filtro.area
+            expressao = (
+                expressao
+                & (pc.field("lat") >= sul)
+                & (pc.field("lat") <= norte)
+                & (pc.field("lon") >= oeste)
+                & (pc.field("lon") <= leste)
+            )
+        return expressao
+
+    @staticmethod
+    def _para_pandas(tabela) -> pd.DataFrame:
+        """Converte uma tabela Arrow nos tipos compactos usados pelo app."""
+        import pyarrow as pa
+
+        if "value" in tabela.column_names:
+            i = tabela.schema.get_field_index("value")
+            tabela = tabela.set_column(
+                i, "value", tabela.column(i).cast(pa.float32())
+            )
+        df = tabela.to_pandas(strings_to_categorical=True)
+        if "sample_dt" in df:
+            df["sample_dt"] = df["sample_dt"].astype("datetime64[ns]")
+        return df
+
+    def _le(self, colunas: Sequence[str], expressao) -> pd.DataFrame:
+        """Lê as colunas pedidas que satisfazem a expressão, já tipadas."""
+        _valida_colunas(colunas)
+        tabela = self._abre().to_table(columns=list(colunas), filter=expressao)
+        return self._para_pandas(tabela)[list(colunas)]
+
+    def combinacoes_filtros(self) -> Iterable[Tuple[str, str, str, str]]:
+        colunas = ["state", "city", "station_name", "pollutant"]
+        tabela = self._abre().to_table(columns=colunas)
+        tabela = tabela.group_by(colunas).aggregate([])
+        return zip(*(tabela.column(c).to_pylist() for c in colunas))
+
+    def coletas(
+        self, filtro: FiltroColetas, colunas: Sequence[str] = COLUNAS_MAPA
+    ) -> pd.DataFrame:
+        return self._le(colunas, self._expressao(filtro))
+
+    def conta_coletas(self, filtro: FiltroColetas) -> int:
+        """Conta as linhas pelo scanner, usando só as colunas do filtro."""
+        return self._abre().count_rows(filter=self._expressao(filtro))
+
+    def locais(self, filtro: FiltroColetas) -> pd.DataFrame:
+        """Lê só as colunas das estações e remove as repetições ainda no Arrow."""
+        colunas = list(COLUNAS_MAPA)
+        tabela = self._abre().to_table(columns=colunas, filter=self._expressao(filtro))
+        tabela = tabela.group_by(colunas).aggregate([])
+        df = self._para_pandas(tabela)[colunas]
+        return df.drop_duplicates("station_name").sort_values(
+            "station_name", ignore_index=True
+        )
+
+    def itera_coletas(
+        self,
+        filtro: FiltroColetas,
+        colunas: Sequence[str] = COLUNAS_MAPA,
+        tamanho_bloco: int = TAMANHO_BLOCO,
+    ) -> Iterator[pd.DataFrame]:
+        """Lê as coletas lote a lote pelo scanner Arrow, sem materializar a tabela."""
+        import pyarrow as pa
+
+        _valida_colunas(colunas)
+        scanner = self._abre().scanner(
+            columns=list(colunas),
+            filter=self._expressao(filtro),
+            batch_size=tamanho_bloco,
+        )
+        for lote in scanner.to_batches():
+            if lote.num_rows:
+                yield self._para_pandas(pa.Table.from_batches([lote]))[list(colunas)]
+
+    def coletas_estacao(
+        self,
+        estacao: str,
+        poluentes: Sequence[str],
+        colunas: Sequence[str] = COLUNAS_GRAFICO,
+    ) -> pd.DataFrame:
+        import pyarrow.compute as pc
+
+        expressao = (pc.field("station_name") == estacao) & pc.field(
+            "pollutant"
+        ).isin(list(poluentes))
+        colunas_leitura = list(dict.fromkeys([*colunas, "sample_dt"]))
+        df = self._le(colunas_leitura, expressao)
+        df = df.sort_values("sample_dt", kind="stable", ignore_index=True)
+        return df[list(colunas)]
+
+    def estatisticas(
+        self, estacao: str, poluentes: Sequence[str], granularidade: str = "total"
+    ) -> pd.DataFrame:
+        """Calcula as estatísticas a partir das amostras da estação."""
+        _valida_granularidade(granularidade)
+        amostras = self.coletas_estacao(
+            estacao, poluentes, ("sample_dt", "pollutant", "value")
+        )
+        amostras = pd.DataFrame(
+            {
+                "pollutant": amostras["pollutant"].astype(str),
+                "sample_day": amostras["sample_dt"]
+                .to_numpy()
+                .astype("datetime64[D]")
+                .astype("int64"),
+                "value": amostras["value"],
+            }
+        )
+        agregados = calcula_agregados(amostras, chaves=["pollutant"])
+        agregados = agregados[agregados["granularidade"] == granularidade]
+        agregados = agregados.sort_values(["pollutant", "periodo"])
+        return estatisticas_de_agregados(agregados)
+
+
+BACKENDS = {
+    BackendSQLite.nome: BackendSQLite,
+    BackendParquet.nome: BackendParquet,
+}
+
+
+def cria_backend(
+    nome: str,
+    db_path: Path,
+    data_path: Path,
+    pool: PoolConexoes | None = None,
+) -> BackendColetas:
+    """Cria o backend de consulta pelo nome ("sqlite" ou "parquet").
+
+    Args:
+        nome (str): Nome do backend.
+        db_path (Path): Caminho do banco SQLite (backend "sqlite").
+        data_path (Path): Caminho do Parquet ou diretório de Parquets
+            (backend "parquet").
+        pool (PoolConexoes | None, optional): Pool a ser usado pelo backend "sqlite".
+
+    Returns:
+        BackendColetas: Backend configurado.
+
+    Raises:
+        ValueError: Se o nome não corresponder a um backend conhecido.
+    """
+    nome = nome.lower()
+    if nome == BackendSQLite.nome:
+        return BackendSQLite(db_path, pool)
+    if nome == BackendParquet.nome:
+        return BackendParquet(data_path)
+    raise ValueError(
+        f"Backend '{nome}' desconhecido. Opções: {', '.join(sorted(BACKENDS))}."
+    )
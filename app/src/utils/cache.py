@@ -0,0 +1,222 @@
+"""Cache em memória, limitado e sensível à versão do banco, para resultados de consultas."""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.constants import NA_VALUE
+from utils.sql import FiltroColetas
+
+# Orçamento padrão de memória do cache de resultados (em bytes)
+LIMITE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Colunas necessárias para reaplicar um filtro em memória
+COLUNAS_FILTRO = frozenset({"state", "city", "station_name", "pollutant"})
+
+# Colunas necessárias adicionalmente quando o filtro tem área
+COLUNAS_AREA = frozenset({"lat", "lon"})
+
+# Campos terrestres do filtro e a coluna que cada um restringe
+DIMENSOES_FILTRO = (
+    ("estados", "state"),
+    ("cidades", "city"),
+    ("estacoes", "station_name"),
+)
+
+# Chave do cache: filtro normalizado + colunas projetadas
+ChaveCache = tuple[FiltroColetas, tuple[str, ...]]
+
+
+def colunas_filtro(
+    filtro: FiltroColetas, base: FiltroColetas | None = None
+) -> frozenset[str]:
+    """Colunas necessárias para aplicar o filtro em memória.
+
+    Com `base`, as coletas já satisfazem esse filtro (mais amplo), então só são
+    necessárias as colunas das restrições que mudam: p.ex. estreitar apenas as
+    estações não exige a coluna `pollutant`.
+
+    Args:
+        filtro (FiltroColetas): Filtro a ser aplicado.
+        base (FiltroColetas | None, optional): Filtro que as coletas já satisfazem.
+            Padrão é None (coletas quaisquer).
+
+    Returns:
+        frozenset[str]: Colunas usadas por `filtra_coletas(df, filtro, base)`.
+    """
+    if base is None:
+        colunas = set(COLUNAS_FILTRO)
+        if filtro.area is not None:
+            colunas |= COLUNAS_AREA
+        return frozenset(colunas)
+
+    colunas = set()
+    terrestres = {
+        coluna
+        for campo, coluna in DIMENSOES_FILTRO
+        if getattr(filtro, campo) != getattr(base, campo)
+    }
+    if filtro.incluir_oceanicas != base.incluir_oceanicas:
+        # As coletas oceânicas da base não passaram pelo filtro terrestre
+        colunas |= {coluna for _, coluna in DIMENSOES_FILTRO}
+    elif terrestres:
+        colunas |= terrestres
+        if filtro.incluir_oceanicas:
+            colunas |= {"state", "city"}
+    if filtro.poluentes != base.poluentes:
+        colunas.add("pollutant")
+    if filtro.area != base.area:
+        colunas |= COLUNAS_AREA
+    return frozenset(colunas)
+
+
+def filtra_coletas(
+    df: pd.DataFrame, filtro: FiltroColetas, base: FiltroColetas | None = None
+) -> pd.DataFrame:
+    """Aplica em memória o mesmo filtro de `monta_consulta_coletas` a um DataFrame.
+
+    Args:
+        df (pd.DataFrame): Coletas com as colunas de `colunas_filtro(filtro, base)`.
+        filtro (FiltroColetas): Filtro a ser aplicado.
+        base (FiltroColetas | None, optional): Filtro que as coletas já satisfazem;
+            só as restrições que mudam em relação a ele são verificadas. Padrão é
+            None (todas).
+
+    Returns:
+        pd.DataFrame: Linhas de `df` que satisfazem o filtro.
+    """
+    colunas = colunas_filtro(filtro, base)
+    mascara = pd.Series(True, index=df.index)
+    for campo, coluna in DIMENSOES_FILTRO:
+        if coluna in colunas:
+            mascara &= df[coluna].isin(getattr(filtro, campo))
+    poluentes = pd.Series(True, index=df.index)
+    if "pollutant" in colunas:
+        poluentes = df["pollutant"].isin(filtro.poluentes)
+    mascara &= poluentes
+    if filtro.incluir_oceanicas and {"state", "city"} <= colunas:
+        mascara |= (df["state"] == NA_VALUE) & (df["city"] == NA_VALUE) & poluentes
+    if filtro.area is not None and COLUNAS_AREA <= colunas:
+        sul, oeste, norte, leste = filtro.area
+        mascara &= df["lat"].between(sul, norte) & df["lon"].between(oeste, leste)
+    return df[mascara]
+
+
+def _tamanho(df: pd.DataFrame) -> int:
+    """Memória ocupada pelo DataFrame, em bytes."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class CacheResultados:
+    """Cache LRU de resultados de `itera_coletas`, chaveado pelo filtro normalizado.
+
+    - O total de memória dos DataFrames guardados é limitado a `limite_bytes`; ao
+      ultrapassá-lo, os resultados usados há mais tempo são descartados.
+    - Todas as entradas são descartadas quando a versão do banco muda.
+    - Uma seleção mais restrita que a de um resultado já guardado (ou com menos
+      colunas) é respondida filtrando/projetando esse resultado em memória, sem nova
+      consulta ao banco.
+
+    Os DataFrames retornados são compartilhados entre sessões e não devem ser
+    modificados no lugar.
+    """
+
+    def __init__(self, limite_bytes: int = LIMITE_CACHE_BYTES):
+        self.limite_bytes = limite_bytes
+        self._entradas: OrderedDict[ChaveCache, pd.DataFrame] = OrderedDict()
+        self._tamanhos: dict[ChaveCache, int] = {}
+        self._total = 0
+        self._versao = None
+        self._lock = threading.Lock()
+
+    def _sincroniza_versao(self, versao) -> None:
+        if versao != self._versao:
+            self._entradas.clear()
+            self._tamanhos.clear()
+            self._total = 0
+            self._versao = versao
+
+    def _busca_base(
+        self, filtro: FiltroColetas, colunas: tuple[str, ...]
+    ) -> ChaveCache | None:
+        """Procura, da mais recente para a mais antiga, uma entrada que cubra o pedido."""
+        pedidas = set(colunas)
+        for chave in reversed(self._entradas):
+            filtro_base, colunas_base = chave
+            if filtro_base == filtro and pedidas <= set(colunas_base):
+                return chave
+            if filtro_base.contem(filtro) and (
+                pedidas | colunas_filtro(filtro, filtro_base)
+            ) <= set(colunas_base):
+                return chave
+        return None
+
+    def obtem(
+        self, filtro: FiltroColetas, versao, colunas: tuple[str, ...]
+    ) -> pd.DataFrame | None:
+        """Retorna o resultado do filtro, se ele (ou um superconjunto) estiver no cache.
+
+        Args:
+            filtro (FiltroColetas): Filtro normalizado da consulta.
+            versao: Versão atual do banco.
+            colunas (tuple[str, ...]): Colunas pedidas, na ordem desejada.
+
+        Returns:
+            pd.DataFrame | None: Resultado em cache ou None se não houver.
+        """
+        chave = (filtro, colunas)
+        with self._lock:
+            self._sincroniza_versao(versao)
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                return self._entradas[chave]
+
+            chave_base = self._busca_base(filtro, colunas)
+            if chave_base is None:
+                return None
+            self._entradas.move_to_end(chave_base)
+            base = self._entradas[chave_base]
+
+        if chave_base[0] != filtro:
+            base = filtra_coletas(base, filtro, chave_base[0])
+        resultado = base[list(colunas)]
+        self.guarda(filtro, versao, colunas, resultado)
+        return resultado
+
+    def guarda(
+        self,
+        filtro: FiltroColetas,
+        versao,
+        colunas: tuple[str, ...],
+        df: pd.DataFrame,
+    ) -> None:
+        """Guarda o resultado de um filtro, descartando os menos usados se necessário.
+
+        Resultados maiores que o limite total não são guardados.
+        """
+        chave = (filtro, colunas)
+        tamanho = _tamanho(df)
+        if tamanho > self.limite_bytes:
+            return
+
+        with self._lock:
+            self._sincroniza_versao(versao)
+            if chave in self._entradas:
+                self._total -= self._tamanhos.pop(chave)
+                del self._entradas[chave]
+
+            while self._entradas and self._total + tamanho > self.limite_bytes:
+                antiga, _ = self._entradas.popitem(last=False)
+                self._total -= self._tamanhos.pop(antiga)
+
+            self._entradas[chave] = df
+            self._tamanhos[chave] = tamanho
+            self._total += tamanho
+
+    def limpa(self) -> None:
+        """Descarta todos os resultados guardados."""
+        with self._lock:
+            self._entradas.clear()
+            self._tamanhos.clear()
+            self._total = 0
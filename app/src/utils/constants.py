@@ -10,3 +10,35 @@ POLUENTES_ROTULO = {
 
 # Reverso para converter do rótulo exibido para o código do banco
 POLUENTES_ROTULO_REVERSO = {v: k for k, v in POLUENTES_ROTULO.items()}
+
+# Rótulos curtos dos poluentes (legendas dos gráficos e das barras)
+POLUENTES_CURTOS = {"pol_a": "A", "pol_b": "B"}
+
+# Cores dos poluentes nos gráficos, na ordem dos poluentes (repetidas depois da última)
+CORES_POLUENTES = [
+    "green",
+    "purple",
+    "#1f77b4",
+    "#ff7f0e",
+    "#d62728",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+    "#bcbd22",
+    "#17becf",
+]
+
+
+def rotulo_poluente(codigo: str, curto: bool = False) -> str:
+    """Rótulo de um poluente; poluentes sem rótulo cadastrado usam o próprio código."""
+    rotulos = POLUENTES_CURTOS if curto else POLUENTES_ROTULO
+    return rotulos.get(codigo, codigo)
+
+
+def ordena_poluentes(codigos) -> list[str]:
+    """Ordena os códigos de poluentes: os cadastrados em POLUENTES_ROTULO primeiro,
+    na ordem do cadastro, e os demais em ordem alfabética."""
+    ordem = {codigo: i for i, codigo in enumerate(POLUENTES_ROTULO)}
+    return sorted(
+        {str(c) for c in codigos}, key=lambda c: (ordem.get(c, len(ordem)), c)
+    )
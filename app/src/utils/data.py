@@ -4,9 +4,13 @@ import warnings
 from functools import lru_cache
 import altair as alt
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 from pandas.api.types import is_datetime64_any_dtype as is_datetime
 
+from utils.constants import rotulo_poluente
+
+
 def transforma_colunas_datetime_para_string(
     gdf: gpd.GeoDataFrame, cols: list[str], formato: str = "%d/%m/%Y"
 ) -> gpd.GeoDataFrame:
@@ -56,6 +60,43 @@ def gpd_merge(left_gdf, right_df, **merge_kwargs):
     merged = pd.merge(left_gdf, right_df, **merge_kwargs)
     return gpd.GeoDataFrame(merged, geometry=left_gdf.geometry.name, crs=left_gdf.crs)
 
+
+def mapeia_categorias(serie: pd.Series, funcao) -> pd.Series:
+    """Aplica uma transformação às categorias de uma série categórica.
+
+    A função recebe as categorias (um `pd.Index` de textos) e é aplicada uma vez
+    por categoria, não por linha; categorias que ficarem iguais são unidas.
+
+    Args:
+        serie (pd.Series): Série categórica.
+        funcao (Callable[[pd.Index], pd.Index]): Transformação das categorias.
+
+    Returns:
+        pd.Series: Série categórica com as categorias transformadas.
+
+    Raises:
+        TypeError: Se a série não for categórica.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        raise TypeError("A série deve ser categórica.")
+    posicoes, novas = pd.factorize(funcao(serie.cat.categories))
+    # O código -1 (valor ausente) pega o -1 acrescentado ao fim e continua ausente
+    codigos = np.append(posicoes, -1)[serie.cat.codes.to_numpy()]
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=novas),
+        index=serie.index,
+        name=serie.name,
+    )
+
+
+def rotulos_curtos(poluentes: pd.Series) -> pd.Series:
+    """Rótulos curtos (`rotulo_poluente`) de uma série de códigos de poluentes."""
+    poluentes = poluentes.astype(str)
+    return poluentes.map(
+        {p: rotulo_poluente(p, curto=True) for p in poluentes.unique()}
+    )
+
+
 @lru_cache(maxsize=5)
 def carrega_locale_altair(locale: str = "pt-BR") -> alt.Locale:
     """Carrega a configuração de localidade (locale) para Altair a partir dos arquivos JSON do D3.
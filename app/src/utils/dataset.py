@@ -0,0 +1,141 @@
+"""Dataset Parquet das coletas, particionado no estilo Hive por estado, ano e poluente.
+
+Cada partição fica em `state=<UF>/year=<ano>/pollutant=<poluente>/`, com as linhas
+ordenadas por data e estação e gravadas em row groups de até LINHAS_POR_GRUPO
+linhas, com estatísticas min/max por coluna. Um leitor com filtro (p.ex. um
+estado e um mês) descarta as partições pelo caminho e os row groups pelas
+estatísticas, sem ler os dados que não satisfazem o filtro.
+"""
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from paths import DATASET_PATH
+
+# Colunas de partição, na ordem dos diretórios
+PARTICOES = ["state", "year", "pollutant"]
+# Ordem das linhas dentro de cada partição (estatísticas min/max justas por row group)
+ORDEM_LINHAS = ["sample_dt", "station_name"]
+LINHAS_POR_GRUPO = 64 * 1024
+
+
+def particionamento() -> ds.Partitioning:
+    """Particionamento Hive do dataset (estado, ano e poluente)."""
+    return ds.partitioning(
+        pa.schema(
+            [("state", pa.string()), ("year", pa.int16()), ("pollutant", pa.string())]
+        ),
+        flavor="hive",
+    )
+
+
+def arquivos_dataset(caminho: Path) -> list[Path]:
+    """Lista os arquivos Parquet de um dataset (pasta) ou o próprio arquivo."""
+    caminho = Path(caminho)
+    if caminho.is_dir():
+        return sorted(caminho.rglob("*.parquet"))
+    return [caminho]
+
+
+def assinatura_dataset(caminho: Path) -> tuple[int, int]:
+    """Tamanho total (bytes) e maior mtime (ns) dos arquivos de um dataset."""
+    stats = [arquivo.stat() for arquivo in arquivos_dataset(caminho)]
+    return (
+        sum(s.st_size for s in stats),
+        max((s.st_mtime_ns for s in stats), default=0),
+    )
+
+
+def filtros_dataset(
+    estados: list[str] | None = None,
+    poluentes: list[str] | None = None,
+    inicio: pd.Timestamp | None = None,
+    fim: pd.Timestamp | None = None,
+    particionado: bool = True,
+) -> list[tuple] | None:
+    """Monta os filtros de leitura (`pd.read_parquet(filters=...)`) de um recorte.
+
+    Os filtros de estado, poluente e ano descartam partições; os de data
+    descartam row groups pelas estatísticas.
+
+    Args:
+        estados (list[str] | None, optional): Estados; None para todos.
+        poluentes (list[str] | None, optional): Poluentes; None para todos.
+        inicio (pd.Timestamp | None, optional): Data inicial (inclusive).
+        fim (pd.Timestamp | None, optional): Data final (exclusive).
+        particionado (bool, optional): Se a leitura é de um dataset particionado;
+            em um arquivo único não há a coluna do ano. Padrão é True.
+
+    Returns:
+        list[tuple] | None: Filtros na forma conjuntiva, ou None se não há recorte.
+    """
+    filtros = []
+    if estados is not None:
+        filtros.append(("state", "in", list(estados)))
+    if poluentes is not None:
+        filtros.append(("pollutant", "in", list(poluentes)))
+    if inicio is not None:
+        filtros.append(("sample_dt", ">=", inicio))
+        if particionado:
+            filtros.append(("year", ">=", inicio.year))
+    if fim is not None:
+        filtros.append(("sample_dt", "<", fim))
+        if particionado:
+            filtros.append(("year", "<=", (fim - pd.Timedelta(1, "ns")).year))
+    return filtros or None
+
+
+def grava_dataset(
+    coletas: pd.DataFrame,
+    pasta: Path = DATASET_PATH,
+    linhas_por_grupo: int = LINHAS_POR_GRUPO,
+) -> list[Path]:
+    """Grava as coletas (formato longo) como dataset particionado, substituindo o anterior.
+
+    A geometria, se houver, é descartada (as coordenadas ficam em lat/lon). O
+    dataset é gravado em uma pasta temporária ao lado do destino e só então
+    troca de lugar com o anterior, então os leitores nunca veem um dataset pela
+    metade.
+
+    Args:
+        coletas (pd.DataFrame): Coletas com as colunas de PARTICOES (exceto o ano,
+            derivado de `sample_dt`) e de ORDEM_LINHAS.
+        pasta (Path, optional): Pasta do dataset. Padrão é DATASET_PATH.
+        linhas_por_grupo (int, optional): Máximo de linhas por row group. Padrão
+            é LINHAS_POR_GRUPO.
+
+    Returns:
+        list[Path]: Arquivos gravados.
+    """
+    pasta = Path(pasta)
+    coletas = pd.DataFrame(coletas).drop(columns="geometry", errors="ignore")
+    coletas = coletas.assign(
+        state=coletas["state"].astype(str),
+        year=coletas["sample_dt"].dt.year.astype("int16"),
+        pollutant=coletas["pollutant"].astype(str),
+    ).sort_values(PARTICOES + ORDEM_LINHAS, kind="stable")
+    tabela = pa.Table.from_pandas(coletas, preserve_index=False)
+
+    temporaria = pasta.with_name(pasta.name + ".tmp")
+    antiga = pasta.with_name(pasta.name + ".old")
+    for resto in (temporaria, antiga):
+        shutil.rmtree(resto, ignore_errors=True)
+    ds.write_dataset(
+        tabela,
+        temporaria,
+        format="parquet",
+        partitioning=particionamento(),
+        basename_template="parte-{i}.parquet",
+        max_rows_per_group=linhas_por_grupo,
+        min_rows_per_group=min(linhas_por_grupo, 1024),
+        preserve_order=True,
+    )
+    if pasta.exists():
+        pasta.rename(antiga)
+    temporaria.rename(pasta)
+    shutil.rmtree(antiga, ignore_errors=True)
+    return arquivos_dataset(pasta)
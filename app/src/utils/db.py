@@ -3,46 +3,612 @@
 
 import streamlit as st
 import pandas as pd
+import pyarrow.dataset as ds
 import sqlite3
+import hashlib
+import os
+from datetime import datetime
 from pathlib import Path
 import time
-from paths import DB_PATH, PARQUET_PATH
+from typing import Iterator
+from contextlib import closing
+from paths import DATASET_PATH, DB_PATH
+from utils.backends import (
+    COLUNAS_GRAFICO,
+    COLUNAS_TABELA,
+    BackendColetas,
+    BackendSQLite,
+    TAMANHO_BLOCO,
+    PoolConexoes,
+    calcula_agregados,
+    cria_backend,
+)
+from utils.cache import CacheResultados
+from utils.dataset import arquivos_dataset, assinatura_dataset, particionamento
+from utils.indice import IndiceFiltros
+from utils.sql import FiltroColetas
+from utils.utils import hash_arquivo
 
+# Versão do esquema do banco; se a versão gravada for diferente, o banco é recriado
+SCHEMA_VERSAO = 5
 
-@st.cache_data(show_spinner="Gerando banco de dados...")
-def cria_banco_sqlite(data_path: Path = PARQUET_PATH, db_path: Path = DB_PATH) -> str:
-    if DB_PATH.exists():
-        print("Banco já existe, não foi recriado.")
-    else:
-        df = pd.read_parquet(data_path)
+# Quantidade de linhas gravadas por transação durante a ingestão
+TAMANHO_LOTE = 50_000
 
-        # Conexão e exportação
-        conn = sqlite3.connect(db_path)
-        df.to_sql("coletas", conn, if_exists="replace", index=False)
+# Colunas do Parquet que são levadas para o banco (a geometria é descartada)
+COLUNAS_COLETAS = [
+    "state",
+    "city",
+    "station_name",
+    "lat",
+    "lon",
+    "sample_dt",
+    "pollutant",
+    "value",
+]
 
-        # Cria índices úteis
-        cursor = conn.cursor()
-        cursor.execute("CREATE INDEX idx_state ON coletas(state)")
-        cursor.execute("CREATE INDEX idx_city ON coletas(city)")
-        cursor.execute("CREATE INDEX idx_station ON coletas(station_name)")
+FORMATO_DATA_SQLITE = "%Y-%m-%d %H:%M:%S"
 
-        conn.commit()
-        conn.close()
-        print("Banco criado com sucesso.")
-        # st.spinner("Banco criado com sucesso.")
+MSG_BANCO_ATUALIZADO = "Banco já está atualizado."
 
-    return "Banco já existe, não foi recriado."
+# Backend de consulta usado pelo app: "sqlite" (padrão) ou "parquet", que lê o
+# Parquet diretamente via Arrow, sem banco intermediário
+BACKEND = os.environ.get("COLETAS_BACKEND", BackendSQLite.nome).lower()
 
+# Esquema estrela: dimensões de estações e poluentes e uma tabela fato estreita
+# com chaves inteiras, datas em dias desde 1970-01-01 e valores REAL. A chave
+# primária (station_id, pollutant_id, sample_day) da tabela fato, sem rowid,
+# funciona como índice de cobertura para os filtros do app. Cada amostra guarda o
+# arquivo de origem (`arquivo_id`, de `arquivos_ingeridos`), para que as amostras
+# de um arquivo alterado ou removido possam ser apagadas na ingestão seguinte. A tabela virtual
+# `estacoes_rtree` indexa as coordenadas das estações para as consultas por área e
+# a view `coletas` reproduz o formato largo antigo para consultas ad hoc.
+DDL_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS esquema (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS log_ingestao (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origem TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    tamanho INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    linhas INTEGER NOT NULL,
+    marca_dagua TEXT,
+    concluido_em TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS arquivos_ingeridos (
+    arquivo_id INTEGER PRIMARY KEY,
+    origem TEXT NOT NULL,
+    arquivo TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    UNIQUE (origem, arquivo)
+);
+CREATE TABLE IF NOT EXISTS estacoes (
+    station_id INTEGER PRIMARY KEY,
+    station_name TEXT NOT NULL UNIQUE,
+    city TEXT NOT NULL,
+    state TEXT NOT NULL,
+    lat REAL,
+    lon REAL
+);
+CREATE TABLE IF NOT EXISTS poluentes (
+    pollutant_id INTEGER PRIMARY KEY,
+    pollutant TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS amostras (
+    station_id INTEGER NOT NULL REFERENCES estacoes(station_id),
+    pollutant_id INTEGER NOT NULL REFERENCES poluentes(pollutant_id),
+    sample_day INTEGER NOT NULL,
+    value REAL,
+    arquivo_id INTEGER REFERENCES arquivos_ingeridos(arquivo_id),
+    PRIMARY KEY (station_id, pollutant_id, sample_day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agregados (
+    station_id INTEGER NOT NULL,
+    pollutant_id INTEGER NOT NULL,
+    granularidade TEXT NOT NULL,
+    periodo INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    soma REAL,
+    soma_quadrados REAL,
+    minimo REAL,
+    maximo REAL,
+    p25 REAL,
+    p50 REAL,
+    p75 REAL,
+    PRIMARY KEY (station_id, pollutant_id, granularidade, periodo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_estacoes_local
+    ON estacoes(state, city, station_name, station_id);
+CREATE INDEX IF NOT EXISTS idx_amostras_dia ON amostras(sample_day);
+CREATE INDEX IF NOT EXISTS idx_amostras_arquivo ON amostras(arquivo_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS estacoes_rtree USING rtree(
+    station_id,
+    min_lat, max_lat,
+    min_lon, max_lon
+);
+CREATE VIEW IF NOT EXISTS coletas AS
+SELECT
+    e.state,
+    e.city,
+    e.station_name,
+    e.lat,
+    e.lon,
+    datetime(a.sample_day * 86400, 'unixepoch') AS sample_dt,
+    p.pollutant,
+    a.value
+FROM amostras a
+JOIN estacoes e ON e.station_id = a.station_id
+JOIN poluentes p ON p.pollutant_id = a.pollutant_id;
+"""
 
-@st.cache_data
-def prepara_banco(*args):
-    return cria_banco_sqlite(args)
+SQL_UPSERT_ESTACOES = """
+INSERT INTO estacoes (station_name, city, state, lat, lon)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (station_name) DO UPDATE SET
+    city = excluded.city,
+    state = excluded.state,
+    lat = excluded.lat,
+    lon = excluded.lon
+"""
 
+# Índice espacial (R*Tree) das coordenadas das estações, usado nas consultas por
+# área do mapa; cada estação é uma caixa degenerada (um ponto)
+SQL_ATUALIZA_RTREE = """
+INSERT OR REPLACE INTO estacoes_rtree (station_id, min_lat, max_lat, min_lon, max_lon)
+SELECT station_id, lat, lat, lon, lon FROM estacoes
+WHERE lat IS NOT NULL AND lon IS NOT NULL
+"""
 
-# Mostra a mensagem temporária
-status_msg = prepara_banco()
+SQL_UPSERT_POLUENTES = """
+INSERT INTO poluentes (pollutant) VALUES (?)
+ON CONFLICT (pollutant) DO NOTHING
+"""
 
-if status_msg != "Banco já existe, não foi recriado.":
+COLUNAS_AGREGADOS = [
+    "station_id",
+    "pollutant_id",
+    "granularidade",
+    "periodo",
+    "n",
+    "soma",
+    "soma_quadrados",
+    "minimo",
+    "maximo",
+    "p25",
+    "p50",
+    "p75",
+]
+
+SQL_UPSERT_AMOSTRAS = """
+INSERT INTO amostras (station_id, pollutant_id, sample_day, value, arquivo_id)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (station_id, pollutant_id, sample_day) DO UPDATE SET
+    value = excluded.value,
+    arquivo_id = excluded.arquivo_id
+"""
+
+
+def hashes_dataset(caminho: Path) -> dict[str, str]:
+    """Calcula o hash SHA-256 de cada arquivo de um Parquet ou dataset (pasta).
+
+    Args:
+        caminho (Path): Arquivo Parquet ou pasta do dataset.
+
+    Returns:
+        dict[str, str]: Hash de cada arquivo, pelo caminho relativo à pasta (ou
+            pelo nome, para um arquivo único).
+    """
+    caminho = Path(caminho)
+    if not caminho.is_dir():
+        return {caminho.name: hash_arquivo(caminho)}
+    return {
+        arquivo.relative_to(caminho).as_posix(): hash_arquivo(arquivo)
+        for arquivo in arquivos_dataset(caminho)
+    }
+
+
+def hash_dataset(caminho: Path, hashes: dict[str, str] | None = None) -> str:
+    """Calcula o hash SHA-256 de um Parquet ou de um dataset particionado (pasta).
+
+    Para uma pasta, combina o caminho relativo e o hash de cada arquivo, então
+    mover, remover ou alterar qualquer partição muda o resultado.
+
+    Args:
+        caminho (Path): Arquivo Parquet ou pasta do dataset.
+        hashes (dict[str, str] | None, optional): Hashes dos arquivos já
+            calculados (ver `hashes_dataset`). Padrão é None.
+
+    Returns:
+        str: Hash hexadecimal do conteúdo.
+    """
+    caminho = Path(caminho)
+    if hashes is None:
+        hashes = hashes_dataset(caminho)
+    if not caminho.is_dir():
+        return hashes[caminho.name]
+    h = hashlib.sha256()
+    for relativo in sorted(hashes):
+        h.update(relativo.encode())
+        h.update(hashes[relativo].encode())
+    return h.hexdigest()
+
+
+def _prepara_esquema(conn: sqlite3.Connection) -> None:
+    """Garante que o esquema do banco esteja na versão SCHEMA_VERSAO.
+
+    Bancos sem a tabela de esquema (gerados por versões antigas) ou com outra versão
+    são esvaziados e recriados, já que todo o conteúdo é derivado do Parquet.
+    """
+    versao = None
+    tem_esquema = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'esquema'"
+    ).fetchone()
+    if tem_esquema:
+        linha = conn.execute(
+            "SELECT valor FROM esquema WHERE chave = 'versao'"
+        ).fetchone()
+        versao = int(linha[0]) if linha else None
+
+    if versao != SCHEMA_VERSAO:
+        objetos = conn.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for tipo, nome in objetos:
+            conn.execute(f'DROP {tipo.upper()} IF EXISTS "{nome}"')
+
+    conn.executescript(DDL_ESQUEMA)
+    conn.execute(
+        "INSERT OR REPLACE INTO esquema (chave, valor) VALUES ('versao', ?)",
+        (str(SCHEMA_VERSAO),),
+    )
+    conn.commit()
+
+
+def _ultima_ingestao(conn: sqlite3.Connection, origem: str) -> tuple | None:
+    """Retorna (hash, tamanho, mtime_ns) da última ingestão concluída da origem."""
+    return conn.execute(
+        "SELECT hash, tamanho, mtime_ns FROM log_ingestao "
+        "WHERE origem = ? ORDER BY id DESC LIMIT 1",
+        (origem,),
+    ).fetchone()
+
+
+def _dia_epoch(datas: pd.Series):
+    """Converte uma série datetime para dias inteiros desde 1970-01-01."""
+    return datas.values.astype("datetime64[D]").astype("int64")
+
+
+def _grava_dimensoes(
+    conn: sqlite3.Connection, df: pd.DataFrame
+) -> tuple[dict[str, int], dict[str, int]]:
+    """Grava (upsert) estações e poluentes do lote e retorna os mapas nome -> id."""
+    estacoes = (
+        df[["station_name", "city", "state", "lat", "lon"]]
+        .drop_duplicates("station_name", keep="last")
+        .astype({"station_name": str, "city": str, "state": str})
+    )
+    poluentes = df["pollutant"].astype(str).unique()
+    with conn:
+        conn.executemany(
+            SQL_UPSERT_ESTACOES, estacoes.itertuples(index=False, name=None)
+        )
+        conn.executemany(SQL_UPSERT_POLUENTES, ((p,) for p in poluentes))
+        conn.execute(SQL_ATUALIZA_RTREE)
+
+    ids_estacoes = dict(conn.execute("SELECT station_name, station_id FROM estacoes"))
+    ids_poluentes = dict(conn.execute("SELECT pollutant, pollutant_id FROM poluentes"))
+    return ids_estacoes, ids_poluentes
+
+
+def _linhas_amostras(
+    df: pd.DataFrame,
+    ids_estacoes: dict[str, int],
+    ids_poluentes: dict[str, int],
+    arquivo_id: int,
+):
+    """Gera as linhas da tabela fato (ids inteiros, dia epoch, valor e arquivo de
+    origem) do DataFrame."""
+    fato = pd.DataFrame(
+        {
+            "station_id": df["station_name"].astype(str).map(ids_estacoes),
+            "pollutant_id": df["pollutant"].astype(str).map(ids_poluentes),
+            "sample_day": _dia_epoch(df["sample_dt"]),
+            "value": df["value"].astype(float),
+            "arquivo_id": arquivo_id,
+        }
+    ).astype(object)
+    fato = fato.where(fato.notna(), None)
+    return fato.itertuples(index=False, name=None)
+
+
+def _atualiza_agregados(
+    conn: sqlite3.Connection, pares: pd.DataFrame, tamanho_lote: int = TAMANHO_LOTE
+) -> None:
+    """Recalcula os agregados dos pares (estação, poluente) afetados por uma ingestão.
+
+    Apenas os pares que receberam amostras novas ou alteradas são relidos da tabela
+    fato; os agregados dos demais permanecem intocados.
+
+    Args:
+        conn (sqlite3.Connection): Conexão de escrita com o banco.
+        pares (pd.DataFrame): Pares afetados, com colunas station_id e pollutant_id.
+        tamanho_lote (int, optional): Pares recalculados por transação.
+    """
+    pares = pares[["station_id", "pollutant_id"]].drop_duplicates()
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS pares_afetados "
+        "(station_id INTEGER, pollutant_id INTEGER, "
+        "PRIMARY KEY (station_id, pollutant_id))"
+    )
+    for inicio in range(0, len(pares), tamanho_lote):
+        lote = pares.iloc[inicio : inicio + tamanho_lote]
+        with conn:
+            conn.execute("DELETE FROM pares_afetados")
+            conn.executemany(
+                "INSERT INTO pares_afetados VALUES (?, ?)",
+                lote.astype(int).itertuples(index=False, name=None),
+            )
+            amostras = pd.read_sql_query(
+                "SELECT a.station_id, a.pollutant_id, a.sample_day, a.value "
+                "FROM pares_afetados t JOIN amostras a "
+                "ON a.station_id = t.station_id AND a.pollutant_id = t.pollutant_id",
+                conn,
+            )
+            conn.execute(
+                "DELETE FROM agregados WHERE (station_id, pollutant_id) IN "
+                "(SELECT station_id, pollutant_id FROM pares_afetados)"
+            )
+            agregados = calcula_agregados(amostras)[COLUNAS_AGREGADOS]
+            agregados = agregados.astype(object)
+            agregados = agregados.where(agregados.notna(), None)
+            conn.executemany(
+                f"INSERT INTO agregados ({', '.join(COLUNAS_AGREGADOS)}) "
+                f"VALUES ({', '.join(['?'] * len(COLUNAS_AGREGADOS))})",
+                agregados.itertuples(index=False, name=None),
+            )
+
+
+def _arquivos_ingeridos(
+    conn: sqlite3.Connection, origem: str
+) -> dict[str, tuple[int, str]]:
+    """Retorna o id e o hash de cada arquivo da origem já registrado.
+
+    O hash é o da última ingestão concluída do arquivo (vazio se ela foi
+    interrompida antes do fim).
+    """
+    return {
+        arquivo: (arquivo_id, h)
+        for arquivo_id, arquivo, h in conn.execute(
+            "SELECT arquivo_id, arquivo, hash FROM arquivos_ingeridos "
+            "WHERE origem = ?",
+            (origem,),
+        )
+    }
+
+
+def _registra_arquivos(
+    conn: sqlite3.Connection, origem: str, arquivos: list[str]
+) -> dict[str, int]:
+    """Garante um id para cada arquivo e retorna os ids (arquivo -> id).
+
+    Arquivos novos entram com hash vazio; o hash só é gravado ao final da
+    ingestão, então uma ingestão interrompida relê o arquivo na próxima execução.
+    """
+    with conn:
+        conn.executemany(
+            "INSERT INTO arquivos_ingeridos (origem, arquivo, hash) VALUES (?, ?, '') "
+            "ON CONFLICT (origem, arquivo) DO NOTHING",
+            ((origem, arquivo) for arquivo in arquivos),
+        )
+    return {a: i for a, (i, _) in _arquivos_ingeridos(conn, origem).items()}
+
+
+def _remove_amostras(conn: sqlite3.Connection, ids_arquivos: list[int]) -> pd.DataFrame:
+    """Apaga as amostras gravadas a partir dos arquivos informados.
+
+    Returns:
+        pd.DataFrame: Pares (station_id, pollutant_id) que perderam amostras.
+    """
+    if not ids_arquivos:
+        return pd.DataFrame(columns=["station_id", "pollutant_id"])
+    marcadores = ", ".join("?" * len(ids_arquivos))
+    with conn:
+        pares = pd.read_sql_query(
+            "SELECT DISTINCT station_id, pollutant_id FROM amostras "
+            f"WHERE arquivo_id IN ({marcadores})",
+            conn,
+            params=ids_arquivos,
+        )
+        conn.execute(
+            f"DELETE FROM amostras WHERE arquivo_id IN ({marcadores})", ids_arquivos
+        )
+    return pares
+
+
+def _le_arquivo(data_path: Path, arquivo: str) -> pd.DataFrame:
+    """Lê as colunas de COLUNAS_COLETAS de um arquivo de um Parquet ou dataset."""
+    if not data_path.is_dir():
+        return pd.read_parquet(data_path, columns=COLUNAS_COLETAS)
+    # As colunas das partições (estado, ano, poluente) vêm do caminho do arquivo
+    dataset = ds.dataset(
+        [str(data_path / arquivo)],
+        format="parquet",
+        partitioning=particionamento(),
+        partition_base_dir=str(data_path),
+    )
+    return dataset.to_table(columns=COLUNAS_COLETAS).to_pandas()
+
+
+def _marca_dagua(conn: sqlite3.Connection) -> pd.Timestamp | None:
+    """Retorna a maior data de coleta gravada na tabela fato (ou None se vazia)."""
+    dia = conn.execute("SELECT MAX(sample_day) FROM amostras").fetchone()[0]
+    return None if dia is None else pd.Timestamp(dia, unit="D")
+
+
+def ingere_parquet(
+    data_path: Path = DATASET_PATH,
+    db_path: Path = DB_PATH,
+    completo: bool = False,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> int:
+    """Ingere de forma incremental o Parquet de coletas no banco SQLite.
+
+    Se o Parquet (arquivo ou dataset particionado) não mudou desde a última
+    ingestão (mesmo tamanho/mtime ou mesmo hash de conteúdo), nada é feito. Caso
+    contrário, apenas os arquivos cujo hash mudou desde a última ingestão
+    (`arquivos_ingeridos`; no dataset, as partições alteradas) são lidos: as
+    amostras gravadas a partir deles são apagadas e todas as suas linhas atuais
+    são gravadas via upsert nas dimensões (`estacoes`, `poluentes`) e na tabela
+    fato (`amostras`), inclusive coletas com datas anteriores às já gravadas (p.ex.
+    envios atrasados de uma estação) e sem as linhas que saíram do arquivo. As
+    amostras de arquivos que deixaram de existir também são apagadas. Em seguida,
+    os agregados dos pares (estação, poluente) afetados são recalculados em
+    `agregados`. A gravação é feita em lotes de `tamanho_lote` linhas por
+    transação. Os hashes dos arquivos e o registro em `log_ingestao` só são
+    gravados ao final, então uma ingestão interrompida é simplesmente refeita na
+    próxima execução.
+
+    Args:
+        data_path (Path, optional): Parquet ou dataset de entrada. Padrão é DATASET_PATH.
+        db_path (Path, optional): Caminho do banco SQLite. Padrão é DB_PATH.
+        completo (bool, optional): Ignora os hashes gravados e regrava todas as
+            linhas de todos os arquivos, mesmo que o Parquet não tenha mudado.
+            Padrão é False.
+        tamanho_lote (int, optional): Linhas por transação. Padrão é TAMANHO_LOTE.
+
+    Returns:
+        int: Número de linhas gravadas (0 se o banco já estava atualizado ou se só
+            houve remoções).
+    """
+    data_path = Path(data_path)
+    origem = str(data_path.resolve())
+    tamanho, mtime_ns = assinatura_dataset(data_path)
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode = WAL")
+        _prepara_esquema(conn)
+
+        anterior = _ultima_ingestao(conn, origem)
+        if not completo and anterior and anterior[1:] == (tamanho, mtime_ns):
+            return 0
+
+        hashes = hashes_dataset(data_path)
+        hash_atual = hash_dataset(data_path, hashes)
+        if not completo and anterior and anterior[0] == hash_atual:
+            # Conteúdo idêntico (p.ex. arquivo apenas copiado): só atualiza o log
+            conn.execute(
+                "UPDATE log_ingestao SET tamanho = ?, mtime_ns = ? WHERE id = "
+                "(SELECT MAX(id) FROM log_ingestao WHERE origem = ?)",
+                (tamanho, mtime_ns, origem),
+            )
+            conn.commit()
+            return 0
+
+        ingeridos = _arquivos_ingeridos(conn, origem)
+        alterados = [
+            arquivo
+            for arquivo, h in hashes.items()
+            if completo or ingeridos.get(arquivo, (None, None))[1] != h
+        ]
+        removidos = [arquivo for arquivo in ingeridos if arquivo not in hashes]
+        ids_arquivos = _registra_arquivos(conn, origem, alterados)
+
+        # As amostras dos arquivos alterados são regravadas a partir da versão atual
+        # (sem as linhas que saíram dele); as dos removidos apenas saem
+        afetados = [
+            _remove_amostras(
+                conn, [ids_arquivos[arquivo] for arquivo in removidos + alterados]
+            )
+        ]
+        gravadas = 0
+        for arquivo in alterados:
+            df = _le_arquivo(data_path, arquivo)
+            df = df.dropna(subset=["station_name", "pollutant", "sample_dt"])
+
+            ids_estacoes, ids_poluentes = _grava_dimensoes(conn, df)
+            linhas = _linhas_amostras(
+                df, ids_estacoes, ids_poluentes, ids_arquivos[arquivo]
+            )
+            afetados.append(
+                pd.DataFrame(
+                    {
+                        "station_id": df["station_name"].astype(str).map(ids_estacoes),
+                        "pollutant_id": df["pollutant"].astype(str).map(ids_poluentes),
+                    }
+                )
+            )
+            while True:
+                lote = [linha for _, linha in zip(range(tamanho_lote), linhas)]
+                if not lote:
+                    break
+                with conn:
+                    conn.executemany(SQL_UPSERT_AMOSTRAS, lote)
+                gravadas += len(lote)
+
+        _atualiza_agregados(conn, pd.concat(afetados, ignore_index=True))
+
+        nova_marca = _marca_dagua(conn)
+        with conn:
+            conn.executemany(
+                "DELETE FROM arquivos_ingeridos WHERE arquivo_id = ?",
+                ((ids_arquivos[arquivo],) for arquivo in removidos),
+            )
+            conn.executemany(
+                "UPDATE arquivos_ingeridos SET hash = ? WHERE arquivo_id = ?",
+                ((hashes[arquivo], ids_arquivos[arquivo]) for arquivo in alterados),
+            )
+            conn.execute(
+                "INSERT INTO log_ingestao "
+                "(origem, hash, tamanho, mtime_ns, linhas, marca_dagua, concluido_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    origem,
+                    hash_atual,
+                    tamanho,
+                    mtime_ns,
+                    gravadas,
+                    None if nova_marca is None else nova_marca.strftime("%Y-%m-%d"),
+                    datetime.now().strftime(FORMATO_DATA_SQLITE),
+                ),
+            )
+
+    return gravadas
+
+
+@st.cache_data(show_spinner="Atualizando banco de dados...", ttl=600)
+def cria_banco_sqlite(data_path: Path = DATASET_PATH, db_path: Path = DB_PATH) -> str:
+    """Cria ou atualiza incrementalmente o banco SQLite a partir do Parquet.
+
+    O resultado fica em cache por 10 minutos; após isso, a próxima execução do app
+    verifica novamente se o Parquet mudou.
+
+    Args:
+        data_path (Path, optional): Parquet ou dataset de entrada. Padrão é DATASET_PATH.
+        db_path (Path, optional): Caminho do banco SQLite. Padrão é DB_PATH.
+
+    Returns:
+        str: Mensagem descrevendo o resultado da ingestão.
+    """
+    gravadas = ingere_parquet(data_path, db_path)
+    if gravadas == 0:
+        print(MSG_BANCO_ATUALIZADO)
+        return MSG_BANCO_ATUALIZADO
+
+    msg = f"Banco atualizado: {gravadas} linhas ingeridas."
+    print(msg)
+    return msg
+
+
+# Mostra a mensagem temporária (o backend Parquet dispensa a ingestão)
+status_msg = MSG_BANCO_ATUALIZADO
+if BACKEND == BackendSQLite.nome:
+    status_msg = cria_banco_sqlite()
+
+if status_msg != MSG_BANCO_ATUALIZADO:
     # Cria um placeholder para a mensagem
     placeholder = st.sidebar.empty()
     placeholder.success(status_msg)
@@ -50,51 +616,210 @@ if status_msg != "Banco já existe, não foi recriado.":
     placeholder.empty()
 
 
-@st.cache_data
-def obtem_dados_unicos(db_path: Path, coluna: str) -> list[str]:
-    dados_unicos = []
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        query = f"SELECT DISTINCT {coluna} FROM coletas ORDER BY {coluna}"
-        cursor.execute(query)
-        dados_unicos = [row[0] for row in cursor.fetchall()]
-    if coluna in ["state", "city"]:
-        dados_unicos.remove("N/A")
+@st.cache_resource(show_spinner=False)
+def obtem_pool(db_path: Path = DB_PATH) -> PoolConexoes:
+    """Retorna o pool de conexões compartilhado por todas as sessões do app."""
+    return PoolConexoes(db_path)
+
+
+@st.cache_resource(show_spinner=False)
+def obtem_backend(
+    db_path: Path = DB_PATH, data_path: Path = DATASET_PATH, nome: str = BACKEND
+) -> BackendColetas:
+    """Retorna o backend de consulta configurado (ver BACKEND), compartilhado pelo app."""
+    pool = obtem_pool(db_path) if nome == BackendSQLite.nome else None
+    return cria_backend(nome, db_path=db_path, data_path=data_path, pool=pool)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def versao_banco(db_path: Path = DB_PATH) -> int:
+    """Retorna a versão dos dados do backend (no SQLite, o id da última ingestão).
 
-    return dados_unicos
+    Usada como chave de invalidação dos caches derivados dos dados; é relida no
+    máximo uma vez por minuto.
+    """
+    return obtem_backend(db_path).versao()
 
 
-@st.cache_data
-def query(db_path: Path, query: str, params: tuple = ()) -> list[str]:
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchall()
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _constroi_indice(db_path: Path, versao: int) -> IndiceFiltros:
+    """Constrói o índice de filtros para uma versão específica dos dados."""
+    return IndiceFiltros(obtem_backend(db_path).combinacoes_filtros())
+
+
+def obtem_indice(db_path: Path = DB_PATH) -> IndiceFiltros:
+    """Retorna o índice de filtros compartilhado, reconstruído a cada nova ingestão."""
+    return _constroi_indice(db_path, versao_banco(db_path))
+
+
+def obtem_dados_unicos(db_path: Path, coluna: str) -> list[str]:
+    return obtem_indice(db_path).valores(coluna)
 
 
-@st.cache_data
 def busca_cidades(db_path: Path, estados: list[str]) -> list[str]:
-    placeholders = ",".join(["?"] * len(estados))
-    sql_query = f"SELECT DISTINCT city FROM coletas WHERE state IN ({placeholders}) ORDER BY city"
-    params = tuple(estados)
-    return [row[0] for row in query(db_path, sql_query, params)]
+    return obtem_indice(db_path).cidades(estados)
 
 
-@st.cache_data
 def busca_estacoes(db_path: Path, cidades: list[str]) -> list[str]:
-    placeholders = ",".join(["?"] * len(cidades))
-    sql_query = f"SELECT DISTINCT station_name FROM coletas WHERE city IN ({placeholders}) ORDER BY station_name"
-    params = tuple(cidades)
-    return [row[0] for row in query(db_path, sql_query, params)]
+    return obtem_indice(db_path).estacoes(cidades)
+
+
+def busca_poluentes(
+    db_path: Path, estacoes: list[str], incluir_oceanicas: bool = False
+) -> list[str]:
+    return obtem_indice(db_path).poluentes(estacoes, incluir_oceanicas)
+
+
+@st.cache_resource(show_spinner=False)
+def obtem_cache_resultados() -> CacheResultados:
+    """Retorna o cache de resultados compartilhado por todas as sessões do app."""
+    return CacheResultados()
+
+
+@st.cache_data(show_spinner=False)
+def conta_coletas(db_path: Path, filtro: FiltroColetas, versao: int) -> int:
+    """Conta as coletas que satisfazem o filtro com uma consulta agregada.
+
+    Args:
+        db_path (Path): Caminho do banco SQLite.
+        filtro (FiltroColetas): Filtro normalizado.
+        versao (int): Versão dos dados (ver `versao_banco`), usada como chave de cache.
+
+    Returns:
+        int: Número de coletas.
+    """
+    return obtem_backend(db_path).conta_coletas(filtro)
+
+
+def itera_coletas(
+    db_path: Path,
+    filtro: FiltroColetas,
+    colunas: tuple[str, ...] = COLUNAS_TABELA,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> Iterator[pd.DataFrame]:
+    """Lê as coletas que satisfazem o filtro em blocos, sem carregar tudo de uma vez.
+
+    Se o resultado (ou um superconjunto dele) já estiver no cache de resultados, os
+    blocos são fatias dele; caso contrário, são lidos do backend (no SQLite, por
+    paginação na chave primária). Uma leitura do backend que chega ao fim sem
+    ultrapassar o orçamento do cache é guardada nele; uma leitura interrompida pelo
+    consumidor não é guardada.
+
+    Apenas as colunas pedidas são lidas. Colunas de texto são categóricas, `value`
+    é float32 e `sample_dt` já vem como datetime64.
+
+    Args:
+        db_path (Path): Caminho do banco SQLite.
+        filtro (FiltroColetas): Filtro normalizado (ver `utils/sql.py::normaliza_filtro`).
+        colunas (tuple[str, ...], optional): Colunas desejadas. Padrão é COLUNAS_TABELA.
+        tamanho_bloco (int, optional): Linhas por bloco. Padrão é TAMANHO_BLOCO.
+
+    Yields:
+        pd.DataFrame: Blocos de até `tamanho_bloco` coletas (compartilhados; não
+            modificar no lugar).
+    """
+    colunas = tuple(colunas)
+    versao = versao_banco(db_path)
+    cache = obtem_cache_resultados()
+    coletas = cache.obtem(filtro, versao, colunas)
+    if coletas is not None:
+        for inicio in range(0, len(coletas), tamanho_bloco):
+            yield coletas.iloc[inicio : inicio + tamanho_bloco]
+        return
+
+    blocos = []
+    tamanho = 0
+    for bloco in obtem_backend(db_path).itera_coletas(filtro, colunas, tamanho_bloco):
+        if blocos is not None:
+            tamanho += int(bloco.memory_usage(index=True, deep=True).sum())
+            if tamanho <= cache.limite_bytes:
+                blocos.append(bloco)
+            else:
+                # Acima do orçamento, o resultado não seria guardado: libera os blocos
+                blocos = None
+        yield bloco
+    if blocos is not None:
+        if not blocos:
+            coletas = pd.DataFrame(columns=list(colunas))
+        else:
+            # Blocos com categorias diferentes (p.ex. partições do Parquet) viram
+            # object no concat; as colunas voltam a ser categóricas
+            categoricas = {
+                coluna: "category"
+                for coluna in colunas
+                if isinstance(blocos[0][coluna].dtype, pd.CategoricalDtype)
+            }
+            coletas = pd.concat(blocos, ignore_index=True).astype(categoricas)
+        cache.guarda(filtro, versao, colunas, coletas)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def busca_locais_coletas(
+    db_path: Path, filtro: FiltroColetas, versao: int
+) -> pd.DataFrame:
+    """Busca as estações (com cidade, estado e coordenadas) que têm coletas no filtro.
+
+    A consulta retorna só as estações distintas (no SQLite, `SELECT DISTINCT` dos
+    ids na tabela fato, com o filtro aplicado no banco), sem ler as coletas.
+
+    Args:
+        db_path (Path): Caminho do banco SQLite.
+        filtro (FiltroColetas): Filtro normalizado.
+        versao (int): Versão dos dados (ver `versao_banco`), usada como chave de cache.
+
+    Returns:
+        pd.DataFrame: Uma linha por estação, com as colunas de COLUNAS_MAPA.
+    """
+    return obtem_backend(db_path).locais(filtro)
+
+
+@st.cache_data(show_spinner=False)
+def busca_coletas_estacao(
+    db_path: Path,
+    estacao: str,
+    poluentes: list[str],
+    versao: int,
+    colunas: tuple[str, ...] = COLUNAS_GRAFICO,
+) -> pd.DataFrame:
+    """Busca as coletas de uma única estação.
+
+    No SQLite, a leitura usa a chave primária da tabela fato; no Parquet, apenas os
+    row groups que podem conter a estação são lidos.
+
+    Args:
+        db_path (Path): Caminho do banco SQLite.
+        estacao (str): Nome da estação.
+        poluentes (list[str]): Poluentes desejados.
+        versao (int): Versão dos dados (ver `versao_banco`), usada como chave de cache.
+        colunas (tuple[str, ...], optional): Colunas desejadas. Padrão é COLUNAS_GRAFICO.
+
+    Returns:
+        pd.DataFrame: Coletas da estação, ordenadas por data.
+    """
+    return obtem_backend(db_path).coletas_estacao(estacao, poluentes, tuple(colunas))
+
 
+@st.cache_data(show_spinner=False)
+def busca_estatisticas(
+    db_path: Path,
+    estacao: str,
+    poluentes: list[str],
+    versao: int,
+    granularidade: str = "total",
+) -> pd.DataFrame:
+    """Busca as estatísticas de uma estação por poluente e período.
 
-@st.cache_data
-def busca_poluentes(db_path: Path, cidades: list[str]) -> list[str]:
-    sql_query = "SELECT DISTINCT pollutant FROM coletas ORDER BY pollutant"
-    return [row[0] for row in query(db_path, sql_query)]
+    No SQLite, lê os agregados materializados na ingestão, sem varrer as amostras.
 
+    Args:
+        db_path (Path): Caminho do banco SQLite.
+        estacao (str): Nome da estação.
+        poluentes (list[str]): Poluentes desejados.
+        versao (int): Versão dos dados (ver `versao_banco`), usada como chave de cache.
+        granularidade (str, optional): "dia", "mes", "ano" ou "total". Padrão é "total".
 
-@st.cache_data
-def busca_coletas(db_path: Path, sql_query: str, params: tuple = ()) -> pd.DataFrame:
-    with sqlite3.connect(db_path) as conn:
-        return pd.read_sql_query(sql_query, conn, params=params)
+    Returns:
+        pd.DataFrame: Uma linha por poluente e período, com as colunas pollutant,
+            periodo, n, media, desvio, mediana, minimo, maximo, p25 e p75.
+    """
+    return obtem_backend(db_path).estatisticas(estacao, poluentes, granularidade)
@@ -1,50 +1,242 @@
 """Funções utilitárias para manipulação de dados geográficos e criação de mapas interativos."""
 
-from functools import lru_cache
-import warnings
+import json
+from pathlib import Path
+import shutil
+import branca.colormap as cm
+from branca.element import MacroElement
 import folium
+from folium.plugins import MarkerCluster
+from folium.utilities import JsCode
 import geopandas as gpd
+import numpy as np
 import shapely
 import pandas as pd
 import altair as alt
+from jinja2 import Template
+
+from utils.constants import CORES_POLUENTES, NA_VALUE
+from utils.data import rotulos_curtos
+from utils.municipios import (  # noqa: F401
+    CODIGOS_ESTADOS,
+    carrega_municipios,
+    tolerancia_para_zoom,
+)
+
+# Zoom máximo ao enquadrar as estações no mapa (um só ponto não tem extensão)
+ZOOM_MAXIMO_ENQUADRAMENTO = 12
+
+# Escala de cores e preenchimento sem dados do mapa coroplético de municípios
+CORES_COROPLETICO = ["#ffffb2", "#fecc5c", "#fd8d3c", "#f03b20", "#bd0026"]
+COR_SEM_DADOS = "#d9d9d9"
+
+# Frequências dos quadros da camada temporal (como em `pd.Series.dt.to_period`)
+FREQUENCIAS_TEMPORAIS = {"D": "diário", "W": "semanal", "M": "mensal"}
+
+# Cores dos marcadores por tipo de estação
+COR_TERRESTRE = "green"
+COR_OCEANICA = "blue"
+
+# Executado no navegador para cada estação da camada GeoJSON: define o ícone pela
+# propriedade `cor` e associa o popup e o tooltip. O tooltip é só o nome da estação,
+# que o `st_folium` devolve em `last_object_clicked_tooltip` ao clicar no marcador.
+JS_MARCADOR_ESTACAO = JsCode(
+    """
+function(feature, layer) {
+    layer.setIcon(L.AwesomeMarkers.icon({
+        icon: "flask", prefix: "fa", markerColor: feature.properties.cor
+    }));
+    layer.bindPopup(feature.properties.descricao, {maxWidth: 250});
+    layer.bindTooltip(feature.properties.station_name);
+}
+"""
+)
+
+# Bibliotecas Vega dos mapas com gráficos sob demanda (as mesmas do folium.VegaLite)
+JS_VEGA = {
+    "vega": "https://cdn.jsdelivr.net/npm/vega@5",
+    "vega-lite": "https://cdn.jsdelivr.net/npm/vega-lite@5",
+    "vega-embed": "https://cdn.jsdelivr.net/npm/vega-embed@6",
+}
 
-# fmt: off
-CODIGOS_ESTADOS = {
-    "AC": 12, "AL": 27, "AP": 16, "AM": 13, "BA": 29, "CE": 23, "DF": 53, "ES": 32,
-    "GO": 52, "MA": 21, "MT": 51, "MS": 50, "MG": 31, "PA": 15, "PB": 25, "PR": 41,
-    "PE": 26, "PI": 22, "RJ": 33, "RN": 24, "RS": 43, "RO": 11, "RR": 14, "SC": 42,
-    "SP": 35, "SE": 28, "TO": 17
+# Formato das datas e casas decimais dos valores nos arquivos de dados dos gráficos
+FORMATO_DATA_GRAFICO = "%Y-%m-%dT%H:%M:%S"
+CASAS_DECIMAIS_GRAFICO = 4
+
+# Executado no navegador para cada estação do mapa com gráficos sob demanda: o
+# popup começa vazio e, na primeira abertura, busca o arquivo JSON da estação e
+# desenha o gráfico a partir do modelo comum a todas as estações. __PASTA__ e
+# __MODELO__ são substituídos em `cria_mapa_graficos_sob_demanda`.
+JS_POPUP_GRAFICO = """
+function(feature, layer) {
+    const modelo = __MODELO__;
+    const div = document.createElement("div");
+    div.style.width = "400px";
+    div.style.minHeight = "260px";
+    div.textContent = "Carregando gráfico...";
+    layer.bindTooltip(feature.properties.descricao);
+    layer.bindPopup(div, {maxWidth: 400});
+    layer.on("popupopen", function() {
+        if (div.dataset.carregado) { return; }
+        div.dataset.carregado = "1";
+        fetch("__PASTA__/" + feature.properties.arquivo)
+            .then(function(resposta) { return resposta.json(); })
+            .then(function(d) {
+                const spec = JSON.parse(JSON.stringify(modelo));
+                spec.title = d.titulo;
+                spec.data = {values: d.sample_dt.map(function(data, i) {
+                    return {
+                        station_name: d.estacao,
+                        sample_dt: data,
+                        pollutant: d.poluentes[d.pollutant[i]],
+                        value: d.value[i]
+                    };
+                })};
+                div.textContent = "";
+                return vegaEmbed(div, spec);
+            })
+            .catch(function() {
+                delete div.dataset.carregado;
+                div.textContent = "Não foi possível carregar o gráfico.";
+            });
+    });
 }
-# fmt: on
+"""
+
+
+def _coordenadas_pontos(pontos: list[shapely.Point] | gpd.GeoSeries) -> np.ndarray:
+    """Extrai as coordenadas (x, y) finitas dos pontos em um array (n, 2)."""
+    geometrias = np.asarray(pontos, dtype=object)
+    if geometrias.size == 0:
+        raise ValueError("A série de pontos está vazia.")
+    if (shapely.get_type_id(geometrias) != shapely.GeometryType.POINT).any():
+        raise TypeError("GeoSeries deve conter apenas objetos Point.")
+    coordenadas = shapely.get_coordinates(geometrias)
+    coordenadas = coordenadas[np.isfinite(coordenadas).all(axis=1)]
+    if len(coordenadas) == 0:
+        raise ValueError("A série de pontos não tem coordenadas válidas.")
+    return coordenadas
+
+
+def obtem_limites(
+    pontos: list[shapely.Point] | gpd.GeoSeries,
+) -> tuple[tuple[float, float], tuple[float, float]]:
+    """Calcula a caixa que envolve um conjunto de pontos.
+
+    Usa apenas mínimos e máximos das coordenadas (uma passada, sem depender do
+    número de pontos distintos), então funciona igualmente com um ponto ou com
+    milhões.
+
+    Args:
+        pontos (list[shapely.Point]|gpd.GeoSeries[shapely.Point]): Conjunto de pontos.
+
+    Returns:
+        tuple[tuple[float, float], tuple[float, float]]: ((sul, oeste), (norte,
+            leste)), no formato esperado por `folium.Map.fit_bounds`.
+    """
+    coordenadas = _coordenadas_pontos(pontos)
+    oeste, sul = coordenadas.min(axis=0)
+    leste, norte = coordenadas.max(axis=0)
+    return (float(sul), float(oeste)), (float(norte), float(leste))
 
 
 def obtem_centroide(pontos: list[shapely.Point] | gpd.GeoSeries) -> tuple[float, float]:
-    """Calcula o centroide de um conjunto de pontos.
+    """Calcula o centro da caixa que envolve um conjunto de pontos.
 
     Args:
         pontos (list[shapely.Point]|gpd.GeoSeries[shapely.Point]): Conjunto de pontos.
 
     Returns:
-        tuple[float, float]: Coordenadas (latitude, longitude) do centroide.
+        tuple[float, float]: Coordenadas (latitude, longitude) do centro.
     """
-    if isinstance(pontos, gpd.GeoSeries) and not all(
-        isinstance(p, shapely.Point) for p in pontos
-    ):
-        raise TypeError("GeoSeries deve conter apenas objetos Point.")
+    (sul, oeste), (norte, leste) = obtem_limites(pontos)
+    return (sul + norte) / 2, (oeste + leste) / 2
 
-    if pontos.empty:
-        raise ValueError("A série de pontos está vazia.")
-    from shapely.geometry import Polygon
 
-    poly = Polygon([[ponto.x, ponto.y] for ponto in pontos])
-    return poly.convex_hull.centroid.coords[0][::-1]
+def enquadra_mapa(
+    m: folium.Map,
+    pontos: list[shapely.Point] | gpd.GeoSeries,
+    zoom_maximo: int = ZOOM_MAXIMO_ENQUADRAMENTO,
+) -> folium.Map:
+    """Ajusta a visão inicial do mapa para exibir todos os pontos.
 
+    Args:
+        m (folium.Map): Mapa a ser enquadrado.
+        pontos (list[shapely.Point]|gpd.GeoSeries[shapely.Point]): Conjunto de pontos.
+        zoom_maximo (int, optional): Zoom máximo do enquadramento, que evita
+            aproximar demais quando há um só ponto (ou pontos muito próximos).
+            Padrão é ZOOM_MAXIMO_ENQUADRAMENTO.
+
+    Returns:
+        folium.Map: O próprio mapa.
+    """
+    m.fit_bounds(obtem_limites(pontos), max_zoom=zoom_maximo)
+    return m
+
+
+def area_visivel(limites: dict | None) -> tuple[float, float, float, float] | None:
+    """Converte os limites retornados pelo `st_folium` em (sul, oeste, norte, leste).
 
-def cria_mapa(gdf: gpd.GeoDataFrame) -> folium.Map:
-    """Cria um mapa interativo com marcadores para cada ponto no GeoDataFrame.
     Args:
-        df (gpd.GeoDataFrame): GeoDataFrame contendo os dados a serem plotados.
-            Deve conter as colunas: 'station_name', 'city', 'state', 'lat', 'lon', 'geometry'.
+        limites (dict | None): Valor de "bounds" retornado pelo `st_folium`, no
+            formato {"_southWest": {"lat", "lng"}, "_northEast": {"lat", "lng"}}.
+
+    Returns:
+        tuple[float, float, float, float] | None: Área visível ou None se os limites
+            ainda não estiverem disponíveis.
+    """
+    if not limites:
+        return None
+    sudoeste, nordeste = limites.get("_southWest"), limites.get("_northEast")
+    if not sudoeste or not nordeste or sudoeste.get("lat") is None:
+        return None
+    return (sudoeste["lat"], sudoeste["lng"], nordeste["lat"], nordeste["lng"])
+
+
+def camada_estacoes(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Reduz as coletas a uma linha por estação, com as propriedades dos marcadores.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Coletas com as colunas 'station_name', 'city',
+            'state' e 'geometry' (pode ter várias linhas por estação).
+
+    Returns:
+        gpd.GeoDataFrame: Uma linha por estação, com as colunas 'station_name',
+            'descricao' (HTML do popup), 'cor' e 'geometry'.
+    """
+    estacoes = gdf.drop_duplicates("station_name")
+    nome = estacoes["station_name"].astype(str)
+    cidade = estacoes["city"].astype(str)
+    estado = estacoes["state"].astype(str)
+    oceanica = (cidade == NA_VALUE).to_numpy()
+
+    descricao = "<b>Estação:</b> " + nome
+    local = "<br><b>Cidade:</b> " + cidade + "<br><b>Estado:</b> " + estado
+    descricao = descricao.where(oceanica, descricao + local)
+    return gpd.GeoDataFrame(
+        {
+            "station_name": nome.to_numpy(),
+            "descricao": descricao.to_numpy(),
+            "cor": np.where(oceanica, COR_OCEANICA, COR_TERRESTRE),
+        },
+        geometry=estacoes.geometry.to_numpy(),
+        crs=gdf.crs or "EPSG:4326",
+    )
+
+
+def cria_mapa(gdf: gpd.GeoDataFrame, enquadrar: bool = True) -> folium.Map:
+    """Cria um mapa interativo com um marcador por estação do GeoDataFrame.
+
+    As estações são enviadas ao navegador em uma única camada GeoJSON, agrupadas
+    em clusters no cliente; o tamanho da página depende do número de estações, não
+    do número de coletas.
+
+    Args:
+        gdf (gpd.GeoDataFrame): GeoDataFrame contendo os dados a serem plotados.
+            Deve conter as colunas: 'station_name', 'city', 'state', 'geometry'.
+        enquadrar (bool, optional): Ajusta a visão inicial para exibir todas as
+            estações (ver `enquadra_mapa`); sem isso, o mapa é centrado nas
+            estações com zoom fixo. Padrão é True.
 
     Returns:
         folium.Map: Mapa interativo com os pontos plotados.
@@ -54,8 +246,11 @@ def cria_mapa(gdf: gpd.GeoDataFrame) -> folium.Map:
     if gdf.empty:
         raise ValueError("O GeoDataFrame está vazio.")
 
-    centroide = obtem_centroide(pontos=gdf["geometry"])
+    estacoes = camada_estacoes(gdf)
+    centroide = obtem_centroide(pontos=estacoes["geometry"])
     m = folium.Map(location=centroide, zoom_start=7)
+    if enquadrar:
+        enquadra_mapa(m, estacoes["geometry"])
 
     folium.TileLayer(
         tiles="https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png",
@@ -64,89 +259,504 @@ def cria_mapa(gdf: gpd.GeoDataFrame) -> folium.Map:
         control=False,
     ).add_to(m)
 
-    for row in gdf.itertuples():
-        nome_estacao = row.station_name
-        cidade = row.city
-        estado = row.state
-        lat = row.lat
-        lon = row.lon
-
-        if cidade == "N/A":
-            tooltip = f"\
-            <b>Estação:</b> {nome_estacao}"
-        else:
-            tooltip = f"\
-                <b>Estação:</b> {nome_estacao}<br>\
-                <b>Cidade:</b> {cidade}<br>\
-                <b>Estado:</b> {estado}"
-
-        marker = folium.Marker(
-            location=(lat, lon),
-            icon=folium.Icon(
-                icon="flask",
-                prefix="fa",
-                color="green" if cidade != "N/A" else "blue",
-            ),
-            tooltip=f"{nome_estacao}",
-            popup=folium.Popup(tooltip, max_width=250),
-        )
-
-        marker.add_to(m)
+    cluster = MarkerCluster(name="Estações", control=False).add_to(m)
+    folium.GeoJson(
+        estacoes,
+        name="Estações",
+        # O ícone padrão garante o carregamento do Leaflet.awesome-markers; a cor
+        # de cada estação é aplicada em JS_MARCADOR_ESTACAO
+        marker=folium.Marker(icon=folium.Icon(icon="flask", prefix="fa")),
+        on_each_feature=JS_MARCADOR_ESTACAO,
+        control=False,
+    ).add_to(cluster)
 
     return m
 
 
-@lru_cache
-def json_municipios(ufs: list[str] | str) -> gpd.GeoDataFrame:
+def json_municipios(
+    ufs: list[str] | str, tolerancia: float = 0.0
+) -> gpd.GeoDataFrame:
     """Carrega os dados geográficos dos municípios brasileiros para os estados especificados.
 
+    As malhas são lidas do armazenamento local (ver `utils.municipios`), sem acesso
+    à rede; gere-as antes com `python app/src/constroi_municipios.py`.
+
     Args:
         ufs (list[str] | str): Lista de siglas dos estados ou uma única sigla.
+        tolerancia (float, optional): Erro máximo aceito (graus) na simplificação
+            das geometrias; use 0 para junções espaciais exatas e, para camadas de
+            mapa, `tolerancia_para_zoom`. Padrão é 0.
 
     Returns:
         gpd.GeoDataFrame: GeoDataFrame contendo os dados dos municípios dos estados especificados.
 
     Raises:
         ValueError: Se nenhum estado válido for fornecido.
+        FileNotFoundError: Se algum estado não estiver no armazenamento local.
     """
-    url_municipios = "https://raw.githubusercontent.com/tbrugz/geodata-br/refs/heads/master/geojson/geojs-{codigo}-mun.json"
+    return carrega_municipios(ufs, tolerancia)
 
-    if isinstance(ufs, str):
-        ufs = [ufs.upper()]
-    else:
-        ufs = [uf.upper() for uf in ufs]
 
-    ufs_validos = [uf for uf in ufs if uf in CODIGOS_ESTADOS]
-    ufs_invalidos = set(ufs) - set(ufs_validos)
+def agrega_coletas_municipios(
+    coletas: pd.DataFrame, frequencia: str = "M", estatistica: str = "mean"
+) -> pd.DataFrame:
+    """Agrega as coletas por município, poluente e período em uma única passada.
 
-    if ufs_invalidos:
-        warnings.warn(f"Estados inválidos ignorados: {', '.join(ufs_invalidos)}")
+    Coletas sem município (oceânicas, com cidade NA_VALUE) são descartadas.
 
-    if not ufs_validos:
-        raise ValueError("Nenhum estado válido fornecido.")
+    Args:
+        coletas (pd.DataFrame): Coletas com as colunas 'city', 'state',
+            'pollutant', 'sample_dt' e 'value'.
+        frequencia (str, optional): Período da agregação, como em
+            `pd.Series.dt.to_period` ("M" mensal, "Y" anual...). Padrão é "M".
+        estatistica (str, optional): Agregação dos valores ("mean", "median",
+            "max"...). Padrão é "mean".
 
-    gdfs = []
-    for uf in ufs_validos:
-        gdf = gpd.read_file(url_municipios.format(codigo=CODIGOS_ESTADOS[uf]))
-        gdf.columns = ["id", "city", "desc", "geometry"]
-        gdf["state"] = uf
-        gdf = gdf[["id", "city", "state", "geometry"]]
-        gdfs.append(gdf)
+    Returns:
+        pd.DataFrame: Colunas 'state', 'city', 'pollutant', 'periodo' (texto),
+            'valor' e 'n_coletas'.
+    """
+    dados = pd.DataFrame(
+        {
+            "state": coletas["state"].astype("category"),
+            "city": coletas["city"].astype("category"),
+            "pollutant": coletas["pollutant"].astype("category"),
+            "periodo": pd.to_datetime(coletas["sample_dt"]).dt.to_period(frequencia),
+            "value": coletas["value"].astype("float64"),
+        }
+    )
+    dados = dados[dados["city"] != NA_VALUE]
+    agregados = (
+        dados.groupby(["state", "city", "pollutant", "periodo"], observed=True)["value"]
+        .agg(valor=estatistica, n_coletas="count")
+        .reset_index()
+    )
+    agregados["periodo"] = agregados["periodo"].astype(str)
+    return agregados
+
+
+def camada_municipios(
+    agregados: pd.DataFrame,
+    municipios: gpd.GeoDataFrame,
+    poluente: str,
+    periodo: str | None = None,
+) -> gpd.GeoDataFrame:
+    """Associa a métrica de um poluente e período às geometrias dos municípios.
+
+    Os nomes (estado, cidade) dos agregados são convertidos no código IBGE
+    ('id') e a junção com as geometrias é feita pelo código.
 
-    municipios = gpd.GeoDataFrame(pd.concat(gdfs, ignore_index=True), crs="EPSG:4326")
-    municipios["geometry"] = shapely.make_valid(municipios["geometry"])
+    Args:
+        agregados (pd.DataFrame): Resultado de `agrega_coletas_municipios`.
+        municipios (gpd.GeoDataFrame): Municípios com 'id', 'city', 'state' e
+            'geometry' (ver `json_municipios`).
+        poluente (str): Poluente exibido.
+        periodo (str | None, optional): Período exibido; None usa o mais recente
+            com coletas do poluente. Padrão é None.
 
-    return municipios
+    Returns:
+        gpd.GeoDataFrame: Todos os municípios, com 'valor' e 'n_coletas' (NaN
+            nos municípios sem coletas no período).
+    """
+    selecao = agregados[agregados["pollutant"] == poluente]
+    if periodo is None and not selecao.empty:
+        periodo = selecao["periodo"].max()
+    selecao = selecao[selecao["periodo"] == periodo]
+
+    codigos = municipios[["id", "state", "city"]]
+    selecao = selecao.astype({"state": str, "city": str}).merge(
+        codigos, on=["state", "city"], how="inner"
+    )
+    camada = municipios.merge(
+        selecao[["id", "valor", "n_coletas"]], on="id", how="left"
+    )
+    camada["periodo"] = periodo
+    return camada
+
+
+def cria_mapa_coropletico(
+    coletas: pd.DataFrame,
+    poluente: str,
+    periodo: str | None = None,
+    frequencia: str = "M",
+    estatistica: str = "mean",
+    zoom: int = 7,
+) -> folium.Map:
+    """Cria um mapa coroplético com a métrica de um poluente por município.
+
+    As geometrias vêm do armazenamento local (`json_municipios`), na resolução
+    simplificada adequada ao zoom inicial, só para os estados com coletas.
 
+    Args:
+        coletas (pd.DataFrame): Coletas, com as colunas de
+            `agrega_coletas_municipios`.
+        poluente (str): Poluente exibido.
+        periodo (str | None, optional): Período exibido (p.ex. "2025-03"); None
+            usa o mais recente. Padrão é None.
+        frequencia (str, optional): Período da agregação. Padrão é "M".
+        estatistica (str, optional): Agregação dos valores. Padrão é "mean".
+        zoom (int, optional): Zoom inicial, que define a simplificação das
+            geometrias (ver `tolerancia_para_zoom`). Padrão é 7.
+
+    Returns:
+        folium.Map: Mapa com os municípios coloridos pela métrica.
+    """
+    # Só o poluente exibido é agregado (metade ou menos das coletas)
+    agregados = agrega_coletas_municipios(
+        coletas[coletas["pollutant"] == poluente], frequencia, estatistica
+    )
+    if agregados.empty:
+        raise ValueError("Não há coletas em municípios para o mapa coroplético.")
+    ufs = sorted(agregados["state"].astype(str).unique())
+    municipios = json_municipios(ufs, tolerancia_para_zoom(zoom))
+    camada = camada_municipios(agregados, municipios, poluente, periodo)
+
+    valores = camada["valor"].dropna()
+    if valores.empty:
+        raise ValueError(f"Não há coletas de {poluente} no período {periodo}.")
+    minimo, maximo = float(valores.min()), float(valores.max())
+    escala = cm.LinearColormap(
+        CORES_COROPLETICO,
+        vmin=minimo,
+        vmax=maximo if maximo > minimo else minimo + 1,
+        caption=f"{poluente} ({estatistica}, {camada['periodo'].iloc[0]}) - mg/L",
+    )
+
+    oeste, sul, leste, norte = camada.total_bounds
+    m = folium.Map(location=((sul + norte) / 2, (oeste + leste) / 2), zoom_start=zoom)
+    m.fit_bounds([[sul, oeste], [norte, leste]])
+
+    camada = camada.assign(
+        cor=[COR_SEM_DADOS if pd.isna(v) else escala(v) for v in camada["valor"]],
+        valor=camada["valor"].round(2),
+    )
+    folium.GeoJson(
+        camada[["id", "city", "state", "valor", "n_coletas", "cor", "geometry"]],
+        name="Municípios",
+        style_function=lambda feature: {
+            "fillColor": feature["properties"]["cor"],
+            "color": "#636363",
+            "weight": 0.5,
+            "fillOpacity": 0.7,
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=["city", "state", "valor", "n_coletas"],
+            aliases=["Cidade", "Estado", "Valor (mg/L)", "Coletas"],
+        ),
+    ).add_to(m)
+    escala.add_to(m)
+    return m
+
+
+def quadros_temporais(
+    coletas: pd.DataFrame, frequencia: str = "W"
+) -> tuple[pd.DataFrame, list[str], np.ndarray]:
+    """Agrupa as coletas em quadros de tempo, com o valor médio de cada estação.
+
+    As coletas são distribuídas em uma única passada vetorizada: cada coleta
+    recebe os códigos do seu quadro e da sua estação, e somas e contagens são
+    acumuladas por `np.bincount` na posição (quadro, estação).
 
-def cria_mapa_com_graficos(gdf: gpd.GeoDataFrame, locale: alt.Locale) -> folium.Map:
-    """Cria um mapa interativo com marcadores que exibem gráficos Altair em popups.
     Args:
-        gdf (gpd.GeoDataFrame): GeoDataFrame contendo os dados a serem plotados.
-            Deve conter as colunas: 'station_name', 'city', 'state', 'lat', 'lon', 'geometry', 'sample_dt', 'value', 'pollutant'.
+        coletas (pd.DataFrame): Coletas (de um poluente) com as colunas
+            'station_name', 'lat', 'lon', 'sample_dt' e 'value'.
+        frequencia (str, optional): Duração dos quadros, uma das chaves de
+            FREQUENCIAS_TEMPORAIS. Padrão é "W".
+
     Returns:
-        folium.Map: Mapa interativo com os pontos plotados e gráficos nos popups.
+        tuple[pd.DataFrame, list[str], np.ndarray]: Estações ('station_name',
+            'lat', 'lon'), data inicial de cada quadro e matriz (quadros x
+            estações) com a média do quadro (NaN onde não houve coleta).
+    """
+    if frequencia not in FREQUENCIAS_TEMPORAIS:
+        raise ValueError(
+            f"Frequência inválida: {frequencia}. "
+            f"Use uma de: {', '.join(FREQUENCIAS_TEMPORAIS)}."
+        )
+    estacao = pd.Categorical(coletas["station_name"].astype(str))
+    periodos = pd.to_datetime(coletas["sample_dt"]).dt.to_period(frequencia)
+    # Todos os quadros do intervalo, inclusive os sem coletas (a animação não pula)
+    quadro = pd.Categorical(
+        periodos, categories=pd.period_range(periodos.min(), periodos.max())
+    )
+    validas = (estacao.codes >= 0) & (quadro.codes >= 0)
+    validas &= coletas["value"].notna().to_numpy()
+
+    n_estacoes = len(estacao.categories)
+    n_quadros = len(quadro.categories)
+    posicao = (
+        quadro.codes[validas].astype(np.int64) * n_estacoes + estacao.codes[validas]
+    )
+    tamanho = n_quadros * n_estacoes
+    pesos = coletas["value"].to_numpy(dtype=float)[validas]
+    somas = np.bincount(posicao, weights=pesos, minlength=tamanho)
+    contagens = np.bincount(posicao, minlength=tamanho)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medias = (somas / contagens).reshape(n_quadros, n_estacoes)
+
+    # Coordenadas da primeira coleta de cada estação, na ordem das categorias
+    _, primeiras = np.unique(estacao.codes, return_index=True)
+    estacoes = pd.DataFrame(
+        {
+            "station_name": estacao.categories.astype(str),
+            "lat": coletas["lat"].to_numpy()[primeiras],
+            "lon": coletas["lon"].to_numpy()[primeiras],
+        }
+    )
+    quadros = [p.start_time.strftime("%Y-%m-%d") for p in quadro.categories]
+    return estacoes, quadros, medias
+
+
+class CamadaTemporal(MacroElement):
+    """Camada de estações coloridas pelo valor de cada quadro de tempo.
+
+    Um controle deslizante escolhe o quadro e um botão reproduz a sequência.
+    Os dados vão ao navegador de forma compacta: a tabela de estações uma única
+    vez e, para cada quadro, só a lista de valores (na ordem das estações), em
+    vez de uma feição por estação e quadro.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function() {
+            const mapa = {{ this._parent.get_name() }};
+            const dados = {{ this.dados }};
+            const cores = {{ this.cores }};
+            const grupo = L.layerGroup().addTo(mapa);
+            const marcadores = dados.estacoes.map(function(e) {
+                return L.circleMarker([e[1], e[2]], {
+                    radius: 7, weight: 1, color: "#555", fillOpacity: 0.85
+                }).bindTooltip(e[0]);
+            });
+            function hex(c) { return [1, 3, 5].map(function(i) {
+                return parseInt(c.substr(i, 2), 16); }); }
+            function cor(v) {
+                const t = Math.max(0, Math.min(1,
+                    (v - dados.minimo) / ((dados.maximo - dados.minimo) || 1)));
+                const x = t * (cores.length - 1);
+                const k = Math.min(Math.floor(x), cores.length - 2);
+                const a = hex(cores[k]), b = hex(cores[k + 1]), f = x - k;
+                return "rgb(" + a.map(function(c, i) {
+                    return Math.round(c + (b[i] - c) * f); }).join(",") + ")";
+            }
+            let entrada, rotulo, botao, temporizador = null;
+            function mostra(q) {
+                const valores = dados.valores[q];
+                marcadores.forEach(function(m, i) {
+                    const v = valores[i];
+                    if (v === null) { grupo.removeLayer(m); return; }
+                    m.setStyle({fillColor: cor(v)});
+                    m.setTooltipContent(
+                        "<b>" + dados.estacoes[i][0] + "</b><br>" + v + " mg/L");
+                    grupo.addLayer(m);
+                });
+                entrada.value = q;
+                rotulo.textContent = " " + dados.quadros[q];
+            }
+            const controle = L.control({position: "bottomleft"});
+            controle.onAdd = function() {
+                const div = L.DomUtil.create("div", "leaflet-bar");
+                div.style.background = "white";
+                div.style.padding = "6px";
+                botao = L.DomUtil.create("button", "", div);
+                botao.textContent = "\u25B6";
+                entrada = L.DomUtil.create("input", "", div);
+                entrada.type = "range";
+                entrada.min = 0;
+                entrada.max = dados.quadros.length - 1;
+                rotulo = L.DomUtil.create("span", "", div);
+                L.DomEvent.disableClickPropagation(div);
+                entrada.addEventListener("input", function() {
+                    mostra(+entrada.value); });
+                botao.addEventListener("click", function() {
+                    if (temporizador) {
+                        clearInterval(temporizador);
+                        temporizador = null;
+                        botao.textContent = "\u25B6";
+                    } else {
+                        temporizador = setInterval(function() {
+                            mostra((+entrada.value + 1) % dados.quadros.length);
+                        }, {{ this.intervalo }});
+                        botao.textContent = "\u23F8";
+                    }
+                });
+                return div;
+            };
+            controle.addTo(mapa);
+            mostra(0);
+        })();
+        {% endmacro %}
+        """
+    )
+
+    def __init__(
+        self,
+        estacoes: pd.DataFrame,
+        quadros: list[str],
+        valores: np.ndarray,
+        intervalo: int = 800,
+        casas_decimais: int = 2,
+    ):
+        super().__init__()
+        self._name = "CamadaTemporal"
+        arredondados = np.round(valores, casas_decimais)
+        validos = arredondados[~np.isnan(arredondados)]
+        self.minimo = float(validos.min()) if validos.size else 0.0
+        self.maximo = float(validos.max()) if validos.size else 1.0
+        # NaN vira null; listas por quadro, sem repetir as estações
+        valores_json = [
+            [None if np.isnan(v) else float(v) for v in linha]
+            for linha in arredondados
+        ]
+        self.dados = json.dumps(
+            {
+                "estacoes": [
+                    [nome, round(float(lat), 5), round(float(lon), 5)]
+                    for nome, lat, lon in zip(
+                        estacoes["station_name"], estacoes["lat"], estacoes["lon"]
+                    )
+                ],
+                "quadros": quadros,
+                "valores": valores_json,
+                "minimo": self.minimo,
+                "maximo": self.maximo,
+            },
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        self.cores = json.dumps(CORES_COROPLETICO)
+        self.intervalo = int(intervalo)
+
+
+def cria_mapa_temporal(
+    coletas: pd.DataFrame,
+    poluente: str,
+    frequencia: str = "W",
+    intervalo: int = 800,
+) -> folium.Map:
+    """Cria um mapa animado com a evolução do poluente nas estações no tempo.
+
+    Args:
+        coletas (pd.DataFrame): Coletas com as colunas 'station_name', 'lat',
+            'lon', 'sample_dt', 'pollutant' e 'value'.
+        poluente (str): Poluente exibido.
+        frequencia (str, optional): Duração dos quadros ("D", "W" ou "M"); cada
+            estação mostra a média das suas coletas no quadro. Padrão é "W".
+        intervalo (int, optional): Duração de cada quadro na reprodução, em ms.
+            Padrão é 800.
+
+    Returns:
+        folium.Map: Mapa com a camada temporal e a legenda de cores.
+    """
+    com_coordenadas = coletas[["lat", "lon"]].notna().all(axis=1)
+    selecao = coletas[(coletas["pollutant"] == poluente) & com_coordenadas]
+    if selecao.empty:
+        raise ValueError(f"Não há coletas de {poluente} com coordenadas.")
+    estacoes, quadros, valores = quadros_temporais(selecao, frequencia)
+
+    camada = CamadaTemporal(estacoes, quadros, valores, intervalo)
+    pontos = gpd.points_from_xy(estacoes["lon"], estacoes["lat"])
+    m = enquadra_mapa(
+        folium.Map(location=obtem_centroide(pontos), zoom_start=7), pontos
+    )
+    camada.add_to(m)
+    cm.LinearColormap(
+        CORES_COROPLETICO,
+        vmin=camada.minimo,
+        vmax=max(camada.maximo, camada.minimo + 1e-9),
+        caption=f"{poluente} - média {FREQUENCIAS_TEMPORAIS[frequencia]} (mg/L)",
+    ).add_to(m)
+    return m
+
+
+def _titulo_grafico(nome_estacao: str, cidade: str, estado: str) -> str:
+    return (
+        f"Estação {nome_estacao}"
+        f"{'' if cidade == NA_VALUE else f' - {cidade}'}"
+        f"{'' if estado == NA_VALUE else f'/{estado}'}"
+    )
+
+
+def _spec_grafico_estacao(
+    nome_estacao: str, cidade: str, estado: str, dados: pd.DataFrame, locale: dict
+) -> dict:
+    """Gera a especificação Vega-Lite do gráfico de uma estação.
+
+    Função de módulo (e com argumentos serializáveis) para poder ser executada em
+    outro processo.
+    """
+    chart = (
+        alt.Chart(dados)
+        .mark_line(point=alt.OverlayMarkDef(filled=False, fill="white"))
+        .encode(
+            x=alt.X("sample_dt:T", axis=alt.Axis(format="%d %b", title="Data")),
+            y=alt.Y("value:Q", title="Valor (mg/L)"),
+            color=alt.Color(
+                "pollutant:N",
+                legend=alt.Legend(title="Poluente"),
+                scale=alt.Scale(range=CORES_POLUENTES),
+            ),
+            tooltip=[
+                alt.Tooltip("station_name:N", title="Estação"),
+                alt.Tooltip("sample_dt:T", title="Data da coleta", format="%d-%m-%Y"),
+                alt.Tooltip("value:Q", title="Valor (mg/L)"),
+            ],
+        )
+        .properties(
+            width=280,
+            height=220,
+            title=_titulo_grafico(nome_estacao, cidade, estado),
+        )
+        .configure_title(fontSize=14, font="Courier", color="gray", anchor="start")
+        .configure_legend(labelFontSize=10, titleFontSize=12)
+    ).configure(locale=alt.Locale.from_dict(locale))
+    return chart.to_dict()
+
+
+def specs_graficos_estacoes(
+    gdf: pd.DataFrame,
+    locale: alt.Locale,
+) -> dict[str, dict]:
+    """Gera as especificações Vega-Lite dos gráficos de todas as estações.
+
+    As coletas são agrupadas por estação em uma única passada e cada gráfico é
+    gerado uma única vez, no processo atual: distribuir a geração entre processos
+    não reduziu o tempo (~25-29 ms por estação com 32, 128 e 512 estações, com ou
+    sem processos; ver `mede_mapa_graficos.py`).
+
+    Args:
+        gdf (pd.DataFrame): Coletas com as colunas 'station_name', 'city', 'state',
+            'sample_dt', 'value' e 'pollutant'.
+        locale (alt.Locale): Localidade dos gráficos.
+
+    Returns:
+        dict[str, dict]: Especificação de cada estação, pelo nome da estação.
     """
+    locale_dict = locale.to_dict()
+    colunas = ["station_name", "sample_dt", "value", "pollutant"]
+    dados = pd.DataFrame(gdf[[*colunas, "city", "state"]]).assign(
+        pollutant=lambda df: rotulos_curtos(df["pollutant"]),
+        # Valores float32 (coletas compactas) sem os dígitos espúrios da conversão
+        value=lambda df: df["value"].astype("float64").round(CASAS_DECIMAIS_GRAFICO),
+    )
+
+    specs = {}
+    for nome_estacao, dados_estacao in dados.groupby(
+        "station_name", sort=False, observed=True
+    ):
+        primeira = dados_estacao.iloc[0]
+        specs[nome_estacao] = _spec_grafico_estacao(
+            nome_estacao,
+            primeira["city"],
+            primeira["state"],
+            dados_estacao[colunas].reset_index(drop=True),
+            locale_dict,
+        )
+    return specs
+
+
+def _valida_coletas_graficos(gdf: gpd.GeoDataFrame, locale: alt.Locale) -> None:
     if not isinstance(locale, alt.Locale):
         raise TypeError("O argumento locale deve ser um alt.Locale.")
     if not isinstance(gdf, gpd.GeoDataFrame):
@@ -167,74 +777,243 @@ def cria_mapa_com_graficos(gdf: gpd.GeoDataFrame, locale: alt.Locale) -> folium.
         raise ValueError(
             f"Há colunas faltantes no GeoDataFrame: {', '.join(missing_cols)}"
         )
-    if not all(isinstance(p, shapely.Point) for p in gdf["geometry"]):
+    tipos = shapely.get_type_id(np.asarray(gdf["geometry"], dtype=object))
+    if (tipos != shapely.GeometryType.POINT).any():
         raise TypeError("A coluna 'geometry' deve conter apenas objetos Point.")
 
-    centroide = obtem_centroide(pontos=gdf["geometry"])
-    m = folium.Map(location=centroide, zoom_start=8)
 
-    gdf["pollutant"] = gdf["pollutant"].replace({"pol_a": "A", "pol_b": "B"})
+def _tooltip_estacao(nome_estacao: str, cidade: str, estado: str) -> str:
+    return f"<b>Estação:</b> {nome_estacao}<br><b>Cidade:</b> {cidade}<br><b>Estado:</b> {estado}"
 
-    for row in gdf.itertuples():
+
+def cria_mapa_com_graficos(gdf: gpd.GeoDataFrame, locale: alt.Locale) -> folium.Map:
+    """Cria um mapa interativo com marcadores que exibem gráficos Altair em popups.
+
+    Há um marcador e um gráfico por estação (não por coleta); os gráficos são
+    gerados uma única vez por `specs_graficos_estacoes`.
+    Cada popup embute a especificação completa do gráfico, com os dados da
+    estação; para muitas estações, ver `salva_mapa_com_graficos`.
+
+    Args:
+        gdf (gpd.GeoDataFrame): GeoDataFrame contendo os dados a serem plotados.
+            Deve conter as colunas: 'station_name', 'city', 'state', 'lat', 'lon', 'geometry', 'sample_dt', 'value', 'pollutant'.
+        locale (alt.Locale): Localidade dos gráficos.
+    Returns:
+        folium.Map: Mapa interativo com os pontos plotados e gráficos nos popups.
+    """
+    _valida_coletas_graficos(gdf, locale)
+
+    estacoes = gdf.drop_duplicates("station_name")
+    m = enquadra_mapa(
+        folium.Map(location=obtem_centroide(estacoes["geometry"]), zoom_start=8),
+        estacoes["geometry"],
+    )
+
+    specs = specs_graficos_estacoes(gdf, locale)
+
+    for row in estacoes.itertuples():
         nome_estacao = row.station_name
-        cidade = row.city
-        estado = row.state
-        lat = row.lat
-        lon = row.lon
-
-        # Filtra dados para a estação
-        dados_estacao = gdf[gdf["station_name"] == nome_estacao]
-
-        if dados_estacao.empty:
-            continue
-
-        # Cria gráfico Altair
-        chart = (
-            alt.Chart(dados_estacao)
-            .mark_line(point=alt.OverlayMarkDef(filled=False, fill="white"))
-            .encode(
-                x=alt.X("sample_dt:T", axis=alt.Axis(format="%d %b", title="Data")),
-                y=alt.Y("value:Q", title="Valor (mg/L)"),
-                color=alt.Color(
-                    "pollutant:N",
-                    legend=alt.Legend(title="Poluente"),
-                    scale=alt.Scale(range=["green", "purple"]),
-                ),
-                tooltip=[
-                    alt.Tooltip("station_name:N", title="Estação"),
-                    alt.Tooltip(
-                        "sample_dt:T", title="Data da coleta", format="%d-%m-%Y"
-                    ),
-                    alt.Tooltip("value:Q", title="Valor (mg/L)"),
-                ],
-            )
-            .properties(
-                width=280,
-                height=220,
-                title=(
-                    f"Estação {nome_estacao}"
-                    f"{'' if cidade == 'N/A' else f' - {cidade}'}"
-                    f"{'' if estado == 'N/A' else f'/{estado}'}"
-                ),
-            )
-            .configure_title(fontSize=14, font="Courier", color="gray", anchor="start")
-            .configure_legend(labelFontSize=10, titleFontSize=12)
-        ).configure(locale=locale)
 
         # popup com espaço suficiente
-        vega = folium.VegaLite(chart, width=400, height=260)
+        vega = folium.VegaLite(specs[nome_estacao], width=400, height=260)
         popup = folium.Popup(max_width=400)
         vega.add_to(popup)
 
-        tooltip = f"<b>Estação:</b> {nome_estacao}<br><b>Cidade:</b> {cidade}<br><b>Estado:</b> {estado}"
         # Cria marcador
         marker = folium.Marker(
-            location=(lat, lon),
+            location=(row.lat, row.lon),
             icon=folium.Icon(icon="flask-vial", prefix="fa", color="green"),
-            tooltip=tooltip,
+            tooltip=_tooltip_estacao(nome_estacao, row.city, row.state),
             popup=popup,
         )
         popup.add_to(marker)
         marker.add_to(m)
 
     return m
+
+
+def dados_graficos_estacoes(gdf: pd.DataFrame) -> dict[str, dict]:
+    """Reduz as coletas de cada estação aos dados compactos do seu gráfico.
+
+    Os dados são colunares (uma lista por campo) e os poluentes são codificados
+    pela posição em 'poluentes', o que evita repetir nomes de campos e de
+    poluentes em cada coleta.
+
+    Args:
+        gdf (pd.DataFrame): Coletas com as colunas 'station_name', 'city', 'state',
+            'sample_dt', 'value' e 'pollutant'.
+
+    Returns:
+        dict[str, dict]: Dados do gráfico de cada estação, pelo nome da estação,
+            com as chaves 'estacao', 'titulo', 'poluentes', 'sample_dt',
+            'pollutant' e 'value'.
+    """
+    dados = pd.DataFrame(
+        gdf[["station_name", "city", "state", "sample_dt", "value", "pollutant"]]
+    )
+    poluentes = rotulos_curtos(dados["pollutant"])
+    dados["pollutant"] = pd.Categorical(
+        poluentes, categories=sorted(poluentes.unique())
+    )
+    rotulos = dados["pollutant"].cat.categories.tolist()
+    dados["sample_dt"] = pd.to_datetime(dados["sample_dt"]).dt.strftime(
+        FORMATO_DATA_GRAFICO
+    )
+    dados["value"] = dados["value"].astype("float64").round(CASAS_DECIMAIS_GRAFICO)
+
+    graficos = {}
+    for nome_estacao, dados_estacao in dados.groupby(
+        "station_name", sort=False, observed=True
+    ):
+        primeira = dados_estacao.iloc[0]
+        graficos[nome_estacao] = {
+            "estacao": str(nome_estacao),
+            "titulo": _titulo_grafico(
+                nome_estacao, primeira["city"], primeira["state"]
+            ),
+            "poluentes": rotulos,
+            "sample_dt": dados_estacao["sample_dt"].tolist(),
+            "pollutant": dados_estacao["pollutant"].cat.codes.tolist(),
+            "value": dados_estacao["value"].tolist(),
+        }
+    return graficos
+
+
+def _spec_modelo_grafico(locale: alt.Locale) -> dict:
+    """Especificação do gráfico sem dados nem título, comum às estações."""
+    vazio = pd.DataFrame(
+        {
+            "station_name": pd.Series(dtype=str),
+            "sample_dt": pd.Series(dtype="datetime64[ns]"),
+            "value": pd.Series(dtype=float),
+            "pollutant": pd.Series(dtype=str),
+        }
+    )
+    spec = _spec_grafico_estacao("", NA_VALUE, NA_VALUE, vazio, locale.to_dict())
+    for chave in ("data", "datasets", "title"):
+        spec.pop(chave, None)
+    return spec
+
+
+def cria_mapa_graficos_sob_demanda(
+    gdf: gpd.GeoDataFrame,
+    locale: alt.Locale,
+    url_graficos: str,
+    arquivos: dict[str, str],
+) -> folium.Map:
+    """Cria um mapa cujos popups carregam o gráfico da estação só quando abertos.
+
+    O HTML contém apenas os marcadores e um modelo de gráfico comum; os dados de
+    cada estação são buscados (`fetch`) em `url_graficos` na primeira abertura do
+    popup. Por isso, o mapa deve ser servido por HTTP (p.ex. `python -m
+    http.server`): navegadores bloqueiam `fetch` em páginas abertas como arquivo.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Coletas, com as colunas de `cria_mapa_com_graficos`.
+        locale (alt.Locale): Localidade dos gráficos.
+        url_graficos (str): URL (relativa ao HTML) da pasta com os arquivos de
+            dados dos gráficos.
+        arquivos (dict[str, str]): Nome do arquivo de dados de cada estação.
+
+    Returns:
+        folium.Map: Mapa com um marcador por estação e gráficos sob demanda.
+    """
+    _valida_coletas_graficos(gdf, locale)
+
+    estacoes = gdf.drop_duplicates("station_name")
+    m = enquadra_mapa(
+        folium.Map(location=obtem_centroide(estacoes["geometry"]), zoom_start=8),
+        estacoes["geometry"],
+    )
+    for nome, url in JS_VEGA.items():
+        m.get_root().header.add_child(folium.JavascriptLink(url), name=nome)
+
+    nomes = estacoes["station_name"].astype(str)
+    camada = gpd.GeoDataFrame(
+        {
+            "descricao": [
+                _tooltip_estacao(*linha)
+                for linha in zip(nomes, estacoes["city"], estacoes["state"])
+            ],
+            "arquivo": nomes.map(arquivos).to_numpy(),
+        },
+        geometry=estacoes.geometry.to_numpy(),
+        crs=gdf.crs or "EPSG:4326",
+    )
+    js_popup = JS_POPUP_GRAFICO.replace("__PASTA__", url_graficos.rstrip("/"))
+    js_popup = js_popup.replace("__MODELO__", json.dumps(_spec_modelo_grafico(locale)))
+
+    cluster = MarkerCluster(name="Estações", control=False).add_to(m)
+    folium.GeoJson(
+        camada,
+        name="Estações",
+        marker=folium.Marker(
+            icon=folium.Icon(icon="flask-vial", prefix="fa", color="green")
+        ),
+        on_each_feature=JsCode(js_popup),
+        control=False,
+    ).add_to(cluster)
+
+    return m
+
+
+def pasta_graficos(caminho: str | Path) -> Path:
+    """Pasta dos dados dos gráficos de um mapa salvo por `salva_mapa_com_graficos`."""
+    caminho = Path(caminho)
+    return caminho.with_name(f"{caminho.stem}_graficos")
+
+
+def salva_mapa_com_graficos(
+    gdf: gpd.GeoDataFrame,
+    locale: alt.Locale,
+    caminho: str | Path,
+    sob_demanda: bool = True,
+) -> Path:
+    """Salva o mapa com gráficos por estação em um arquivo HTML.
+
+    No modo sob demanda, os dados dos gráficos são gravados em arquivos JSON
+    compactos (um por estação) na pasta '<nome do mapa>_graficos' (ver
+    `pasta_graficos`), ao lado do HTML, e carregados pelos popups quando abertos (ver
+    `cria_mapa_graficos_sob_demanda`); o HTML fica com tamanho proporcional ao
+    número de estações, sem as séries. A pasta é gravada por inteiro em uma pasta
+    temporária e só então substitui a anterior, então não sobram arquivos de
+    gerações com mais estações. Caso contrário, os gráficos são embutidos nos
+    popups (`cria_mapa_com_graficos`).
+
+    Args:
+        gdf (gpd.GeoDataFrame): Coletas, com as colunas de `cria_mapa_com_graficos`.
+        locale (alt.Locale): Localidade dos gráficos.
+        caminho (str | Path): Caminho do arquivo HTML.
+        sob_demanda (bool, optional): Grava os dados dos gráficos fora do HTML.
+            Padrão é True.
+
+    Returns:
+        Path: Caminho do arquivo HTML salvo.
+    """
+    caminho = Path(caminho)
+    if not sob_demanda:
+        cria_mapa_com_graficos(gdf, locale).save(caminho)
+        return caminho
+
+    _valida_coletas_graficos(gdf, locale)
+    pasta = pasta_graficos(caminho)
+    temporaria = pasta.with_name(pasta.name + ".tmp")
+    antiga = pasta.with_name(pasta.name + ".old")
+    for resto in (temporaria, antiga):
+        shutil.rmtree(resto, ignore_errors=True)
+    temporaria.mkdir(parents=True)
+    # Arquivos numerados: nomes de estação podem conter caracteres inválidos
+    arquivos = {}
+    for i, (nome_estacao, dados) in enumerate(dados_graficos_estacoes(gdf).items()):
+        arquivo = f"{i}.json"
+        with open(temporaria / arquivo, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, separators=(",", ":"))
+        arquivos[str(nome_estacao)] = arquivo
+
+    m = cria_mapa_graficos_sob_demanda(gdf, locale, pasta.name, arquivos)
+    if pasta.exists():
+        pasta.rename(antiga)
+    temporaria.rename(pasta)
+    shutil.rmtree(antiga, ignore_errors=True)
+    m.save(caminho)
+    return caminho
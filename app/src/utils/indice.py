@@ -0,0 +1,102 @@
+"""Índice em memória da hierarquia de filtros Estado → Cidade → Estação → Poluente."""
+
+from typing import Iterable, List, Mapping, Sequence, Tuple
+
+from utils.constants import NA_VALUE
+
+# Colunas da hierarquia, da mais geral para a mais específica
+NIVEIS = ("state", "city", "station_name", "pollutant")
+
+
+def _agrupa(pares: Iterable[Tuple[str, str]]) -> dict[str, Tuple[str, ...]]:
+    """Agrupa pares (chave, valor) em um dicionário chave -> tupla ordenada de valores."""
+    grupos: dict[str, set[str]] = {}
+    for chave, valor in pares:
+        grupos.setdefault(chave, set()).add(valor)
+    return {chave: tuple(sorted(valores)) for chave, valores in grupos.items()}
+
+
+def _uniao(mapa: Mapping[str, Tuple[str, ...]], chaves: Sequence[str]) -> List[str]:
+    """Retorna a união ordenada dos valores das chaves informadas."""
+    if len(chaves) == 1:
+        return list(mapa.get(chaves[0], ()))
+    valores: set[str] = set()
+    for chave in chaves:
+        valores.update(mapa.get(chave, ()))
+    return sorted(valores)
+
+
+class IndiceFiltros:
+    """Índice somente leitura da hierarquia usada pelos filtros em cascata do app.
+
+    É construído uma única vez a partir das combinações distintas
+    (estado, cidade, estação, poluente) e responde a todas as consultas da cascata
+    sem acessar o banco. As cidades são indexadas pelo nome, como nos filtros do app.
+    """
+
+    def __init__(self, linhas: Iterable[Tuple[str, str, str, str]]):
+        linhas = list(linhas)
+        self._estados = tuple(
+            sorted({estado for estado, *_ in linhas if estado != NA_VALUE})
+        )
+        self._cidades_por_estado = _agrupa(
+            (estado, cidade) for estado, cidade, _, _ in linhas
+        )
+        self._estacoes_por_cidade = _agrupa(
+            (cidade, estacao) for _, cidade, estacao, _ in linhas
+        )
+        self._poluentes_por_estacao = _agrupa(
+            (estacao, poluente) for _, _, estacao, poluente in linhas
+        )
+        self._estacoes_oceanicas = tuple(
+            sorted(
+                {
+                    estacao
+                    for estado, cidade, estacao, _ in linhas
+                    if estado == NA_VALUE and cidade == NA_VALUE
+                }
+            )
+        )
+        self._todos = {
+            coluna: tuple(sorted({linha[i] for linha in linhas}))
+            for i, coluna in enumerate(NIVEIS)
+        }
+
+    def valores(self, coluna: str) -> List[str]:
+        """Retorna todos os valores distintos de uma coluna da hierarquia.
+
+        Para estado e cidade, o valor N/A (coletas oceânicas) é omitido.
+        """
+        if coluna not in NIVEIS:
+            raise ValueError(f"Coluna '{coluna}' não pode ser usada como filtro.")
+        valores = list(self._todos[coluna])
+        if coluna in ("state", "city") and NA_VALUE in valores:
+            valores.remove(NA_VALUE)
+        return valores
+
+    def estados(self) -> List[str]:
+        """Retorna os estados disponíveis (sem N/A)."""
+        return list(self._estados)
+
+    def cidades(self, estados: Sequence[str]) -> List[str]:
+        """Retorna as cidades dos estados informados."""
+        return _uniao(self._cidades_por_estado, estados)
+
+    def estacoes(self, cidades: Sequence[str]) -> List[str]:
+        """Retorna as estações das cidades informadas."""
+        return _uniao(self._estacoes_por_cidade, cidades)
+
+    def poluentes(
+        self, estacoes: Sequence[str], incluir_oceanicas: bool = False
+    ) -> List[str]:
+        """Retorna os poluentes medidos nas estações informadas.
+
+        Args:
+            estacoes (Sequence[str]): Estações selecionadas.
+            incluir_oceanicas (bool, optional): Inclui também os poluentes medidos
+                nas estações oceânicas. Padrão é False.
+        """
+        estacoes = list(estacoes)
+        if incluir_oceanicas:
+            estacoes.extend(self._estacoes_oceanicas)
+        return _uniao(self._poluentes_por_estacao, estacoes)
@@ -0,0 +1,399 @@
+"""Armazenamento local (GeoParquet) das geometrias dos municípios brasileiros.
+
+As malhas municipais de cada UF são baixadas (ou lidas de arquivos locais) uma única
+vez por `constroi_municipios` e gravadas em GeoParquet, em várias resoluções: a
+original e versões simplificadas com tolerâncias crescentes, que preservam a
+topologia entre municípios vizinhos. Depois disso, `carrega_municipios` lê apenas
+os arquivos locais (com memory-map), sem acesso à rede, escolhendo a resolução mais
+leve que atende à tolerância pedida.
+"""
+
+import math
+import warnings
+from functools import lru_cache
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from paths import LOCALIZACAO_PATH, MUNICIPIOS_PATH
+from utils.constants import NA_VALUE
+
+# fmt: off
+CODIGOS_ESTADOS = {
+    "AC": 12, "AL": 27, "AP": 16, "AM": 13, "BA": 29, "CE": 23, "DF": 53, "ES": 32,
+    "GO": 52, "MA": 21, "MT": 51, "MS": 50, "MG": 31, "PA": 15, "PB": 25, "PR": 41,
+    "PE": 26, "PI": 22, "RJ": 33, "RN": 24, "RS": 43, "RO": 11, "RR": 14, "SC": 42,
+    "SP": 35, "SE": 28, "TO": 17
+}
+# fmt: on
+
+# Origem padrão das malhas: GeoJSON por UF, identificado pelo código IBGE do estado.
+# Aceita também um caminho local com os campos {codigo} e/ou {uf}.
+URL_MUNICIPIOS = "https://raw.githubusercontent.com/tbrugz/geodata-br/refs/heads/master/geojson/geojs-{codigo}-mun.json"
+
+# Tolerâncias de simplificação (graus) gravadas para cada UF; 0 é a malha original
+TOLERANCIAS = (0.0, 0.001, 0.005, 0.02)
+
+COLUNAS_MUNICIPIOS = ["id", "city", "state", "geometry"]
+
+# Tabela persistente estação → município; a chave inclui as coordenadas para que
+# estações movidas sejam localizadas de novo
+CHAVE_LOCALIZACAO = ["station_name", "lat", "lon"]
+COLUNAS_LOCALIZACAO = [*CHAVE_LOCALIZACAO, "city", "state"]
+
+
+def normaliza_ufs(ufs: list[str] | tuple[str, ...] | str) -> tuple[str, ...]:
+    """Converte as siglas para maiúsculas, descartando (com aviso) as inválidas.
+
+    Args:
+        ufs (list[str] | tuple[str, ...] | str): Siglas dos estados ou uma sigla.
+
+    Returns:
+        tuple[str, ...]: Siglas válidas, na ordem recebida.
+
+    Raises:
+        ValueError: Se nenhum estado válido for fornecido.
+    """
+    if isinstance(ufs, str):
+        ufs = [ufs]
+    ufs = [uf.upper() for uf in ufs]
+
+    ufs_validos = tuple(uf for uf in ufs if uf in CODIGOS_ESTADOS)
+    ufs_invalidos = set(ufs) - set(ufs_validos)
+
+    if ufs_invalidos:
+        warnings.warn(f"Estados inválidos ignorados: {', '.join(ufs_invalidos)}")
+
+    if not ufs_validos:
+        raise ValueError("Nenhum estado válido fornecido.")
+    return ufs_validos
+
+
+def ufs_gravadas(
+    tolerancia: float = 0.0, pasta: Path = MUNICIPIOS_PATH
+) -> tuple[str, ...]:
+    """UFs presentes no armazenamento em uma tolerância."""
+    return tuple(
+        uf
+        for uf in CODIGOS_ESTADOS
+        if arquivo_municipios(uf, tolerancia, pasta).exists()
+    )
+
+
+def arquivo_municipios(
+    uf: str, tolerancia: float = 0.0, pasta: Path = MUNICIPIOS_PATH
+) -> Path:
+    """Caminho do GeoParquet de uma UF em uma tolerância de simplificação."""
+    return pasta / f"tolerancia={tolerancia:g}" / f"{uf}.parquet"
+
+
+def tolerancias_gravadas(pasta: Path = MUNICIPIOS_PATH) -> tuple[float, ...]:
+    """Tolerâncias presentes no armazenamento (TOLERANCIAS se ainda vazio)."""
+    gravadas = sorted(
+        float(subpasta.name.split("=", 1)[1])
+        for subpasta in Path(pasta).glob("tolerancia=*")
+        if subpasta.is_dir()
+    )
+    return tuple(gravadas) or TOLERANCIAS
+
+
+def escolhe_tolerancia(
+    tolerancia_maxima: float, tolerancias: tuple[float, ...] = TOLERANCIAS
+) -> float:
+    """Escolhe a maior tolerância gravada que não ultrapassa a tolerância pedida.
+
+    Args:
+        tolerancia_maxima (float): Erro máximo aceito (graus).
+        tolerancias (tuple[float, ...], optional): Tolerâncias disponíveis.
+            Padrão é TOLERANCIAS.
+
+    Returns:
+        float: Tolerância da resolução mais leve que atende ao pedido.
+    """
+    adequadas = [t for t in tolerancias if t <= tolerancia_maxima]
+    return max(adequadas) if adequadas else min(tolerancias)
+
+
+def tolerancia_para_zoom(zoom: float, pixels: float = 1.0) -> float:
+    """Tolerância que mantém o erro da simplificação abaixo de `pixels` no mapa.
+
+    Args:
+        zoom (float): Nível de zoom do mapa (tiles de 256 px).
+        pixels (float, optional): Erro máximo aceito, em pixels. Padrão é 1.
+
+    Returns:
+        float: Tolerância (graus) para `carrega_municipios`.
+    """
+    return pixels * 360 / (256 * math.pow(2, zoom))
+
+
+def simplifica_malha(geometrias: gpd.GeoSeries, tolerancia: float) -> gpd.GeoSeries:
+    """Simplifica a malha preservando as divisas entre municípios vizinhos.
+
+    Usa `shapely.coverage_simplify`, que simplifica cada divisa uma única vez
+    (sem buracos ou sobreposições entre vizinhos); em versões do shapely/GEOS
+    sem essa função, ou se a malha não for uma cobertura válida, simplifica cada
+    município separadamente, preservando apenas a sua própria topologia.
+    """
+    if tolerancia <= 0:
+        return geometrias
+    if hasattr(shapely, "coverage_simplify"):
+        try:
+            simplificadas = shapely.coverage_simplify(
+                geometrias.to_numpy(), tolerancia
+            )
+            return gpd.GeoSeries(
+                simplificadas, index=geometrias.index, crs=geometrias.crs
+            )
+        except shapely.errors.GEOSException:
+            pass
+    return geometrias.simplify(tolerancia, preserve_topology=True)
+
+
+def _le_origem(uf: str, origem: str) -> gpd.GeoDataFrame:
+    gdf = gpd.read_file(origem.format(codigo=CODIGOS_ESTADOS[uf], uf=uf))
+    if "city" not in gdf.columns:
+        gdf.columns = ["id", "city", "desc", "geometry"]
+    gdf["state"] = uf
+    gdf = gdf[COLUNAS_MUNICIPIOS].to_crs("EPSG:4326")
+    gdf["id"] = gdf["id"].astype(str)
+    gdf["geometry"] = shapely.make_valid(gdf["geometry"])
+    return gdf
+
+
+def constroi_municipios(
+    ufs: list[str] | str,
+    origem: str = URL_MUNICIPIOS,
+    pasta: Path = MUNICIPIOS_PATH,
+    tolerancias: tuple[float, ...] = TOLERANCIAS,
+    sobrescrever: bool = False,
+) -> list[Path]:
+    """Grava as malhas municipais das UFs no armazenamento local, em cada tolerância.
+
+    Args:
+        ufs (list[str] | str): Siglas dos estados.
+        origem (str, optional): URL ou caminho das malhas, com os campos {codigo}
+            (código IBGE da UF) e/ou {uf}. Padrão é URL_MUNICIPIOS.
+        pasta (Path, optional): Pasta do armazenamento. Padrão é MUNICIPIOS_PATH.
+        tolerancias (tuple[float, ...], optional): Tolerâncias gravadas.
+            Padrão é TOLERANCIAS.
+        sobrescrever (bool, optional): Refaz as UFs já gravadas. Padrão é False.
+
+    Returns:
+        list[Path]: Arquivos gravados.
+    """
+    gravados = []
+    for uf in normaliza_ufs(ufs):
+        destinos = {t: arquivo_municipios(uf, t, pasta) for t in tolerancias}
+        if not sobrescrever and all(d.exists() for d in destinos.values()):
+            continue
+        municipios = _le_origem(uf, origem)
+        for tolerancia, destino in destinos.items():
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            simplificados = municipios.assign(
+                geometry=simplifica_malha(municipios.geometry, tolerancia)
+            )
+            # A caixa de cada geometria permite filtrar por área na leitura
+            simplificados.to_parquet(destino, write_covering_bbox=True)
+            gravados.append(destino)
+    _le_municipios.cache_clear()
+    return gravados
+
+
+@lru_cache(maxsize=32)
+def _le_municipios(
+    ufs: tuple[str, ...],
+    tolerancia: float,
+    pasta: Path,
+    bbox: tuple[float, float, float, float] | None,
+) -> gpd.GeoDataFrame:
+    arquivos = [arquivo_municipios(uf, tolerancia, pasta) for uf in ufs]
+    faltantes = [arquivo.stem for arquivo in arquivos if not arquivo.exists()]
+    if faltantes:
+        raise FileNotFoundError(
+            f"Malhas municipais não encontradas em {pasta} para: "
+            f"{', '.join(faltantes)}. "
+            "Gere-as com `python app/src/constroi_municipios.py`."
+        )
+    # Colunas explícitas: o pyarrow acrescentaria a partição 'tolerancia=<t>' do
+    # caminho como coluna
+    gdfs = [
+        gpd.read_parquet(
+            arquivo, columns=COLUNAS_MUNICIPIOS, bbox=bbox, memory_map=True
+        )
+        for arquivo in arquivos
+    ]
+    return gpd.GeoDataFrame(pd.concat(gdfs, ignore_index=True), crs="EPSG:4326")
+
+
+def carrega_municipios(
+    ufs: list[str] | str,
+    tolerancia: float = 0.0,
+    pasta: Path = MUNICIPIOS_PATH,
+    bbox: tuple[float, float, float, float] | None = None,
+) -> gpd.GeoDataFrame:
+    """Carrega as malhas municipais do armazenamento local.
+
+    Args:
+        ufs (list[str] | str): Siglas dos estados.
+        tolerancia (float, optional): Erro máximo aceito (graus); é usada a
+            resolução gravada mais leve dentro desse erro (ver `escolhe_tolerancia`
+            e `tolerancia_para_zoom`). Padrão é 0 (malha original).
+        pasta (Path, optional): Pasta do armazenamento. Padrão é MUNICIPIOS_PATH.
+        bbox (tuple[float, float, float, float] | None, optional): Caixa
+            (oeste, sul, leste, norte); só os municípios que a intersectam são
+            lidos. Padrão é None.
+
+    Returns:
+        gpd.GeoDataFrame: Municípios com as colunas 'id', 'city', 'state' e
+            'geometry' (EPSG:4326).
+
+    Raises:
+        ValueError: Se nenhum estado válido for fornecido.
+        FileNotFoundError: Se alguma UF não estiver no armazenamento.
+    """
+    pasta = Path(pasta)
+    municipios = _le_municipios(
+        normaliza_ufs(ufs),
+        escolhe_tolerancia(tolerancia, tolerancias_gravadas(pasta)),
+        pasta,
+        tuple(bbox) if bbox is not None else None,
+    )
+    # Cópia: quem chama pode alterar o resultado sem afetar o cache
+    return municipios.copy()
+
+
+def localiza_pontos(
+    lat: np.ndarray, lon: np.ndarray, municipios: gpd.GeoDataFrame
+) -> pd.DataFrame:
+    """Encontra o município que contém cada ponto.
+
+    Usa um STRtree das geometrias dos municípios: cada ponto é testado apenas
+    contra os municípios cuja caixa o contém. Pontos na divisa entre municípios
+    ficam com o primeiro deles (na ordem de `municipios`); pontos fora de todos
+    (p.ex. oceânicos) ou sem coordenadas ficam com NA_VALUE.
+
+    Args:
+        lat (np.ndarray): Latitudes dos pontos.
+        lon (np.ndarray): Longitudes dos pontos.
+        municipios (gpd.GeoDataFrame): Municípios com as colunas 'city', 'state' e
+            'geometry'.
+
+    Returns:
+        pd.DataFrame: Colunas 'city' e 'state', uma linha por ponto.
+    """
+    pontos = shapely.points(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))
+    cidades = np.full(len(pontos), NA_VALUE, dtype=object)
+    estados = np.full(len(pontos), NA_VALUE, dtype=object)
+    if len(municipios) and len(pontos):
+        arvore = shapely.STRtree(municipios.geometry.to_numpy())
+        indice_ponto, indice_municipio = arvore.query(pontos, predicate="intersects")
+        ordem = np.lexsort((indice_municipio, indice_ponto))
+        indice_ponto, indice_municipio = indice_ponto[ordem], indice_municipio[ordem]
+        _, primeiros = np.unique(indice_ponto, return_index=True)
+        indice_ponto, indice_municipio = (
+            indice_ponto[primeiros],
+            indice_municipio[primeiros],
+        )
+        cidades[indice_ponto] = municipios["city"].to_numpy()[indice_municipio]
+        estados[indice_ponto] = municipios["state"].to_numpy()[indice_municipio]
+    return pd.DataFrame({"city": cidades, "state": estados})
+
+
+def localiza_estacoes(
+    estacoes: pd.DataFrame,
+    caminho: Path = LOCALIZACAO_PATH,
+    ufs: list[str] | str | None = None,
+    pasta: Path = MUNICIPIOS_PATH,
+) -> pd.DataFrame:
+    """Associa cada estação ao seu município, usando a tabela persistente.
+
+    Só as combinações (estação, lat, lon) ainda ausentes da tabela em `caminho`
+    são localizadas (`localiza_pontos`), lendo apenas os municípios na caixa que
+    envolve os novos pontos; o resultado é acrescentado à tabela. Assim, rodar a
+    preparação de novo só localiza estações novas ou movidas. Estações fora de
+    todos os municípios só são gravadas como NA_VALUE se a busca cobriu todas as
+    UFs; caso contrário, voltam a ser localizadas na próxima vez (p.ex. depois de
+    gravar a malha que faltava).
+
+    Args:
+        estacoes (pd.DataFrame): Estações com as colunas 'station_name', 'lat' e
+            'lon' (linhas repetidas são ignoradas).
+        caminho (Path, optional): Arquivo Parquet da tabela estação → município.
+            Padrão é LOCALIZACAO_PATH.
+        ufs (list[str] | str | None, optional): Estados considerados; None usa
+            todos os presentes no armazenamento de malhas. Padrão é None.
+        pasta (Path, optional): Pasta do armazenamento de malhas. Padrão é
+            MUNICIPIOS_PATH.
+
+    Returns:
+        pd.DataFrame: Colunas 'station_name', 'lat', 'lon', 'city' e 'state', uma
+            linha por combinação (estação, lat, lon) de `estacoes`.
+
+    Raises:
+        FileNotFoundError: Se há estações novas com coordenadas e o armazenamento
+            de malhas está vazio (ou não tem alguma das UFs pedidas).
+    """
+    caminho = Path(caminho)
+    pedidas = (
+        pd.DataFrame(estacoes[CHAVE_LOCALIZACAO])
+        .astype({"station_name": str, "lat": float, "lon": float})
+        .drop_duplicates()
+    )
+    if caminho.exists():
+        tabela = pd.read_parquet(caminho, columns=COLUNAS_LOCALIZACAO)
+    else:
+        tabela = pd.DataFrame(columns=COLUNAS_LOCALIZACAO).astype(
+            {"station_name": str, "lat": float, "lon": float}
+        )
+
+    novas = pedidas.merge(
+        tabela[CHAVE_LOCALIZACAO], on=CHAVE_LOCALIZACAO, how="left", indicator=True
+    )
+    novas = novas.loc[novas["_merge"] == "left_only", CHAVE_LOCALIZACAO]
+    if not novas.empty:
+        validas = novas[["lat", "lon"]].notna().all(axis=1).to_numpy()
+        municipios = gpd.GeoDataFrame(columns=COLUNAS_MUNICIPIOS, geometry="geometry")
+        todas_ufs = True
+        if validas.any():
+            ufs = normaliza_ufs(ufs) if ufs is not None else ufs_gravadas(pasta=pasta)
+            if not ufs:
+                raise FileNotFoundError(
+                    f"Nenhuma malha municipal encontrada em {pasta}. "
+                    "Gere-as com `python app/src/constroi_municipios.py`."
+                )
+            todas_ufs = set(ufs) == set(CODIGOS_ESTADOS)
+            caixa = (
+                novas.loc[validas, "lon"].min(),
+                novas.loc[validas, "lat"].min(),
+                novas.loc[validas, "lon"].max(),
+                novas.loc[validas, "lat"].max(),
+            )
+            municipios = carrega_municipios(ufs, pasta=pasta, bbox=caixa)
+        localizadas = localiza_pontos(
+            novas["lat"].to_numpy(), novas["lon"].to_numpy(), municipios
+        )
+        novas = pd.concat(
+            [novas.reset_index(drop=True), localizadas], axis=1
+        )[COLUNAS_LOCALIZACAO]
+        # Um ponto fora das UFs buscadas pode estar em uma UF ainda não gravada:
+        # só é definitivo (e gravado) se a busca cobriu todas
+        definitivas = (
+            ~validas | (novas["city"] != NA_VALUE).to_numpy() | todas_ufs
+        )
+        gravadas = novas[definitivas]
+        if len(gravadas):
+            tabela = (
+                pd.concat([tabela, gravadas], ignore_index=True)
+                if len(tabela)
+                else gravadas
+            )
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            tabela.to_parquet(caminho, index=False)
+        if not definitivas.all():
+            tabela = pd.concat([tabela, novas[~definitivas]], ignore_index=True)
+
+    return pedidas.merge(tabela, on=CHAVE_LOCALIZACAO, how="left")
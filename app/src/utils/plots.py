@@ -1,7 +1,8 @@
 """Funções utilitárias para criação de gráficos interativos usando Altair."""
 
 import altair as alt
-from utils.data import carrega_locale_altair
+from utils.constants import CORES_POLUENTES
+from utils.data import carrega_locale_altair, rotulos_curtos
 import numpy as np
 
 locale = carrega_locale_altair("pt-BR")
@@ -17,7 +18,7 @@ def cria_grafico(df):
             color=alt.Color(
                 "pollutant:N",
                 legend=alt.Legend(title="Poluente"),
-                scale=alt.Scale(range=["green", "purple"]),
+                scale=alt.Scale(range=CORES_POLUENTES),
             ),
             tooltip=[
                 alt.Tooltip("station_name:N", title="Estação"),
@@ -31,13 +32,17 @@ def cria_grafico(df):
 
 
 def cria_boxplot(df):
-    # Verifica se as colunas necessárias existem
-    df["value"] = np.round(np.log(df["value"] + 1), 2)
-    df["pollutant"] = df["pollutant"].replace({"pol_a": "A", "pol_b": "B"})
+    # Não altera o DataFrame recebido (pode ser compartilhado pelo cache)
+    df = df.assign(
+        value=np.round(np.log(df["value"] + 1), 2),
+        pollutant=rotulos_curtos(df["pollutant"]),
+    )
+    # Caixas mais estreitas quando há muitos poluentes, para caberem na largura
+    n_poluentes = max(df["pollutant"].nunique(), 1)
     chart = (
         (
             alt.Chart(df)
-            .mark_boxplot(size=70, extent=0.5)
+            .mark_boxplot(size=max(10, min(70, 350 // n_poluentes)), extent=0.5)
             .encode(
                 x=alt.X("pollutant:N", title="Poluente"),
                 y=alt.Y(
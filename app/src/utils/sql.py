@@ -1,7 +1,41 @@
 """Funções utilitárias para manipulação de consultas SQL em SQLite."""
-from typing import List, Sequence, Tuple
+from typing import List, NamedTuple, Sequence, Tuple
+import math
 import warnings
 
+from utils.constants import NA_VALUE
+
+# Consulta base das coletas no esquema estrela: a tabela fato `amostras` (alias `a`)
+# é filtrada pelas chaves inteiras e unida às dimensões apenas para exibição.
+SELECT_COLETAS = """SELECT
+    e.state,
+    e.city,
+    e.station_name,
+    e.lat,
+    e.lon,
+    datetime(a.sample_day * 86400, 'unixepoch') AS sample_dt,
+    p.pollutant,
+    a.value
+FROM amostras a
+JOIN estacoes e ON e.station_id = a.station_id
+JOIN poluentes p ON p.pollutant_id = a.pollutant_id"""
+
+# Chave primária da tabela fato, usada na paginação por chave (keyset)
+CHAVE_AMOSTRAS = ("station_id", "pollutant_id", "sample_day")
+
+# Área retangular do mapa: (sul, oeste, norte, leste), em graus
+Area = Tuple[float, float, float, float]
+
+# Margem adicionada à área visível do mapa (fração da largura/altura) e passo, em
+# graus, da grade à qual a área é arredondada para reaproveitar consultas em cache
+MARGEM_AREA = 0.25
+PASSO_AREA = 0.5
+
+# Consulta base das páginas de coletas: apenas as colunas estreitas da tabela fato
+SELECT_AMOSTRAS = (
+    "SELECT a.station_id, a.pollutant_id, a.sample_day, a.value FROM amostras a"
+)
+
 
 def placeholders(n: int) -> str:
     """Retorna uma string de placeholders do SQLite do tipo '?, ?, ?' com n itens.
@@ -76,6 +110,11 @@ def monta_filtro_terrestre(
     poluentes: Sequence[str],
 ) -> Tuple[str, List[str]]:
     """Monta a cláusula composta para filtro terrestre com params.
+
+    Os filtros de texto são resolvidos nas dimensões (`estacoes` e `poluentes`) e a
+    tabela fato é filtrada apenas por `station_id`/`pollutant_id`, o que permite ao
+    SQLite responder pela chave primária (station_id, pollutant_id, sample_day).
+
     Args:
         estados (Sequence[str]): Lista de estados para o filtro.
         cidades (Sequence[str]): Lista de cidades para o filtro.
@@ -92,17 +131,355 @@ def monta_filtro_terrestre(
     parts: List[str] = []
     params: List[str] = []
 
-    # Monta as partes da cláusula WHERE
+    # Monta as partes da cláusula WHERE da dimensão de estações
 
     for coluna, valores in (
-        ("state", estados), 
+        ("state", estados),
         ("city", cidades),
         ("station_name", estacoes),
-        ("pollutant", poluentes),
     ):
         # Adiciona a cláusula e os parâmetros se houver valores
         sql_part, p = clausula_in(coluna, valores)
         parts.append(sql_part)
         params.extend(p)
 
-    return "(" + " AND ".join(parts) + ")", params
+    filtro_poluentes, params_poluentes = _filtro_poluentes(poluentes)
+    sql = (
+        "(a.station_id IN (SELECT station_id FROM estacoes WHERE "
+        + " AND ".join(parts)
+        + f") AND {filtro_poluentes})"
+    )
+    return sql, [*params, *params_poluentes]
+
+
+def _filtro_poluentes(poluentes: Sequence[str]) -> Tuple[str, List[str]]:
+    """Cláusula que restringe `a.pollutant_id` aos poluentes informados."""
+    sql_part, params = clausula_in("pollutant", poluentes)
+    return (
+        f"a.pollutant_id IN (SELECT pollutant_id FROM poluentes WHERE {sql_part})",
+        params,
+    )
+
+
+def monta_filtro_estacao(
+    estacao: str, poluentes: Sequence[str]
+) -> Tuple[str, List[str]]:
+    """Monta a cláusula das coletas de uma única estação (terrestre ou oceânica).
+    Args:
+        estacao (str): Nome da estação.
+        poluentes (Sequence[str]): Lista de poluentes para o filtro.
+    Returns:
+        Tuple[str, List[str]]: Tupla com a cláusula SQL e a lista de parâmetros.
+    """
+    filtro_poluentes, params = _filtro_poluentes(poluentes)
+    sql = (
+        "(a.station_id = (SELECT station_id FROM estacoes WHERE station_name = ?) "
+        f"AND {filtro_poluentes})"
+    )
+    return sql, [estacao, *params]
+
+
+def monta_filtro_oceanico(poluentes: Sequence[str]) -> Tuple[str, List[str]]:
+    """Monta a cláusula das coletas oceânicas (estado e cidade iguais a N/A).
+    Args:
+        poluentes (Sequence[str]): Lista de poluentes para o filtro.
+    Returns:
+        Tuple[str, List[str]]: Tupla com a cláusula SQL e a lista de parâmetros.
+    """
+    filtro_poluentes, params = _filtro_poluentes(poluentes)
+    sql = (
+        "(a.station_id IN (SELECT station_id FROM estacoes "
+        "WHERE state = ? AND city = ?) "
+        f"AND {filtro_poluentes})"
+    )
+    return sql, [NA_VALUE, NA_VALUE, *params]
+
+
+def monta_filtro_area(area: Area) -> Tuple[str, List[float]]:
+    """Monta a cláusula das coletas de estações dentro de uma área, pelo R*Tree.
+    Args:
+        area (Area): Área (sul, oeste, norte, leste), em graus.
+    Returns:
+        Tuple[str, List[float]]: Tupla com a cláusula SQL e a lista de parâmetros.
+    """
+    sul, oeste, norte, leste = area
+    sql = (
+        "a.station_id IN (SELECT station_id FROM estacoes_rtree "
+        "WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)"
+    )
+    return sql, [sul, norte, oeste, leste]
+
+
+def _partes_consulta_coletas(
+    estados: Sequence[str],
+    cidades: Sequence[str],
+    estacoes: Sequence[str],
+    poluentes: Sequence[str],
+    incluir_oceanicas: bool = False,
+    area: Area | None = None,
+) -> List[Tuple[str, List]]:
+    """Retorna as cláusulas WHERE (e params) das partes terrestre e oceânica."""
+    partes = [monta_filtro_terrestre(estados, cidades, estacoes, poluentes)]
+    if incluir_oceanicas:
+        partes.append(monta_filtro_oceanico(poluentes))
+    if area is not None:
+        filtro_area, params_area = monta_filtro_area(area)
+        partes = [
+            (f"{where} AND {filtro_area}", [*params, *params_area])
+            for where, params in partes
+        ]
+    return partes
+
+
+def monta_consulta_coletas(
+    estados: Sequence[str],
+    cidades: Sequence[str],
+    estacoes: Sequence[str],
+    poluentes: Sequence[str],
+    incluir_oceanicas: bool = False,
+    area: Area | None = None,
+    select: str = SELECT_COLETAS,
+) -> Tuple[str, List[str]]:
+    """Monta a consulta completa das coletas filtradas.
+
+    As coletas terrestres e oceânicas são conjuntos disjuntos; por isso são unidas
+    com UNION ALL em vez de um OR, que impediria o uso da chave primária.
+
+    Args:
+        estados (Sequence[str]): Lista de estados para o filtro.
+        cidades (Sequence[str]): Lista de cidades para o filtro.
+        estacoes (Sequence[str]): Lista de estações para o filtro.
+        poluentes (Sequence[str]): Lista de poluentes para o filtro.
+        incluir_oceanicas (bool, optional): Inclui as coletas oceânicas dos poluentes
+            selecionados. Padrão é False.
+        area (Area | None, optional): Restringe às estações dentro da área
+            (sul, oeste, norte, leste). Padrão é None (sem restrição).
+        select (str, optional): Cláusula SELECT ... FROM, que deve expor a tabela fato
+            com o alias `a`. Padrão é SELECT_COLETAS (formato largo).
+    Returns:
+        Tuple[str, List[str]]: Tupla com a consulta SQL e a lista de parâmetros.
+    """
+    partes = _partes_consulta_coletas(
+        estados, cidades, estacoes, poluentes, incluir_oceanicas, area
+    )
+    sql_query = "\nUNION ALL\n".join(f"{select}\nWHERE {where}" for where, _ in partes)
+    params = [param for _, params_parte in partes for param in params_parte]
+    return sql_query, params
+
+
+def monta_contagem_coletas(
+    estados: Sequence[str],
+    cidades: Sequence[str],
+    estacoes: Sequence[str],
+    poluentes: Sequence[str],
+    incluir_oceanicas: bool = False,
+    area: Area | None = None,
+) -> Tuple[str, List[str]]:
+    """Monta a consulta que conta as coletas filtradas, sem ler suas colunas.
+    Args:
+        estados (Sequence[str]): Lista de estados para o filtro.
+        cidades (Sequence[str]): Lista de cidades para o filtro.
+        estacoes (Sequence[str]): Lista de estações para o filtro.
+        poluentes (Sequence[str]): Lista de poluentes para o filtro.
+        incluir_oceanicas (bool, optional): Inclui as coletas oceânicas. Padrão é False.
+        area (Area | None, optional): Restringe às estações dentro da área
+            (sul, oeste, norte, leste). Padrão é None (sem restrição).
+    Returns:
+        Tuple[str, List[str]]: Tupla com a consulta SQL e a lista de parâmetros.
+    """
+    sql_query, params = monta_consulta_coletas(
+        estados,
+        cidades,
+        estacoes,
+        poluentes,
+        incluir_oceanicas,
+        area,
+        select="SELECT 1 FROM amostras a",
+    )
+    return f"SELECT COUNT(*) FROM (\n{sql_query}\n)", params
+
+
+def monta_consulta_locais(
+    estados: Sequence[str],
+    cidades: Sequence[str],
+    estacoes: Sequence[str],
+    poluentes: Sequence[str],
+    incluir_oceanicas: bool = False,
+    area: Area | None = None,
+) -> Tuple[str, List[str]]:
+    """Monta a consulta dos ids distintos das estações com coletas filtradas.
+
+    Cada parte lê apenas `station_id` da tabela fato (prefixo da chave primária),
+    sem trazer as coletas para o Python.
+
+    Args:
+        estados (Sequence[str]): Lista de estados para o filtro.
+        cidades (Sequence[str]): Lista de cidades para o filtro.
+        estacoes (Sequence[str]): Lista de estações para o filtro.
+        poluentes (Sequence[str]): Lista de poluentes para o filtro.
+        incluir_oceanicas (bool, optional): Inclui as coletas oceânicas. Padrão é False.
+        area (Area | None, optional): Restringe às estações dentro da área
+            (sul, oeste, norte, leste). Padrão é None (sem restrição).
+    Returns:
+        Tuple[str, List[str]]: Tupla com a consulta SQL e a lista de parâmetros.
+    """
+    sql_query, params = monta_consulta_coletas(
+        estados,
+        cidades,
+        estacoes,
+        poluentes,
+        incluir_oceanicas,
+        area,
+        select="SELECT DISTINCT a.station_id FROM amostras a",
+    )
+    return (
+        "SELECT e.station_id FROM estacoes e "
+        f"WHERE e.station_id IN (\n{sql_query}\n) ORDER BY e.station_id",
+        params,
+    )
+
+
+def monta_pagina_coletas(
+    estados: Sequence[str],
+    cidades: Sequence[str],
+    estacoes: Sequence[str],
+    poluentes: Sequence[str],
+    incluir_oceanicas: bool = False,
+    area: Area | None = None,
+    select: str = SELECT_AMOSTRAS,
+    apos: Tuple[int, int, int] | None = None,
+    limite: int = 50_000,
+) -> Tuple[str, List]:
+    """Monta a consulta de uma página das coletas filtradas (paginação por chave).
+
+    As linhas são ordenadas pela chave primária da tabela fato e cada página começa
+    logo após a última chave da página anterior, o que evita o custo crescente do
+    OFFSET: cada página é uma busca direta no índice.
+
+    Args:
+        estados (Sequence[str]): Lista de estados para o filtro.
+        cidades (Sequence[str]): Lista de cidades para o filtro.
+        estacoes (Sequence[str]): Lista de estações para o filtro.
+        poluentes (Sequence[str]): Lista de poluentes para o filtro.
+        incluir_oceanicas (bool, optional): Inclui as coletas oceânicas. Padrão é False.
+        area (Area | None, optional): Restringe às estações dentro da área
+            (sul, oeste, norte, leste). Padrão é None (sem restrição).
+        select (str, optional): Cláusula SELECT ... FROM amostras a, que deve retornar
+            as colunas de CHAVE_AMOSTRAS. Padrão é SELECT_AMOSTRAS.
+        apos (Tuple[int, int, int] | None, optional): Última chave
+            (station_id, pollutant_id, sample_day) da página anterior; None para a
+            primeira página.
+        limite (int, optional): Número máximo de linhas da página. Padrão é 50.000.
+    Returns:
+        Tuple[str, List]: Tupla com a consulta SQL e a lista de parâmetros.
+    """
+    chave = ", ".join(f"a.{coluna}" for coluna in CHAVE_AMOSTRAS)
+    partes = []
+    params: List = []
+    for where, params_parte in _partes_consulta_coletas(
+        estados, cidades, estacoes, poluentes, incluir_oceanicas, area
+    ):
+        if apos is not None:
+            where = f"{where} AND ({chave}) > (?, ?, ?)"
+            params_parte = [*params_parte, *apos]
+        partes.append(f"{select}\nWHERE {where}")
+        params.extend(params_parte)
+
+    sql_query = (
+        "\nUNION ALL\n".join(partes)
+        + f"\nORDER BY {', '.join(CHAVE_AMOSTRAS)}\nLIMIT ?"
+    )
+    return sql_query, [*params, limite]
+
+
+class FiltroColetas(NamedTuple):
+    """Filtro normalizado das coletas: valores ordenados e sem repetição.
+
+    Seleções equivalentes (p.ex. ["RJ", "SP"] e ["SP", "RJ"]) geram o mesmo filtro,
+    o que permite usá-lo como chave de cache.
+    """
+
+    estados: Tuple[str, ...]
+    cidades: Tuple[str, ...]
+    estacoes: Tuple[str, ...]
+    poluentes: Tuple[str, ...]
+    incluir_oceanicas: bool = False
+    area: Area | None = None
+
+    def contem(self, outro: "FiltroColetas") -> bool:
+        """Indica se todas as coletas de `outro` também satisfazem este filtro."""
+        if outro.incluir_oceanicas and not self.incluir_oceanicas:
+            return False
+        if self.area is not None and (
+            outro.area is None or not area_contem(self.area, outro.area)
+        ):
+            return False
+        return all(
+            set(menor) <= set(maior)
+            for maior, menor in zip(self[:4], outro[:4])
+        )
+
+
+def area_contem(maior: Area, menor: Area) -> bool:
+    """Indica se a área `menor` está inteiramente dentro da área `maior`."""
+    return (
+        maior[0] <= menor[0]
+        and maior[1] <= menor[1]
+        and maior[2] >= menor[2]
+        and maior[3] >= menor[3]
+    )
+
+
+def normaliza_area(
+    area: Area, margem: float = MARGEM_AREA, passo: float = PASSO_AREA
+) -> Area:
+    """Expande a área visível do mapa por uma margem e a arredonda para uma grade.
+
+    Pequenos deslocamentos do mapa resultam na mesma área normalizada, o que evita
+    novas consultas a cada movimento e já traz as estações logo além da borda.
+
+    Args:
+        area (Area): Área visível (sul, oeste, norte, leste), em graus.
+        margem (float, optional): Fração da altura/largura adicionada a cada lado.
+            Padrão é MARGEM_AREA.
+        passo (float, optional): Passo da grade, em graus. Padrão é PASSO_AREA.
+    Returns:
+        Area: Área expandida, arredondada para fora e limitada a latitudes e
+            longitudes válidas.
+    """
+    sul, oeste, norte, leste = area
+    d_lat = (norte - sul) * margem
+    d_lon = (leste - oeste) * margem
+    return (
+        max(math.floor((sul - d_lat) / passo) * passo, -90.0),
+        max(math.floor((oeste - d_lon) / passo) * passo, -180.0),
+        min(math.ceil((norte + d_lat) / passo) * passo, 90.0),
+        min(math.ceil((leste + d_lon) / passo) * passo, 180.0),
+    )
+
+
+def normaliza_filtro(
+    estados: Sequence[str],
+    cidades: Sequence[str],
+    estacoes: Sequence[str],
+    poluentes: Sequence[str],
+    incluir_oceanicas: bool = False,
+    area: Area | None = None,
+) -> FiltroColetas:
+    """Cria o FiltroColetas normalizado a partir das seleções efetivas.
+    Args:
+        estados (Sequence[str]): Lista de estados para o filtro.
+        cidades (Sequence[str]): Lista de cidades para o filtro.
+        estacoes (Sequence[str]): Lista de estações para o filtro.
+        poluentes (Sequence[str]): Lista de poluentes para o filtro.
+        incluir_oceanicas (bool, optional): Inclui as coletas oceânicas. Padrão é False.
+        area (Area | None, optional): Área do mapa (sul, oeste, norte, leste), já
+            normalizada por `normaliza_area`. Padrão é None (sem restrição).
+    Returns:
+        FiltroColetas: Filtro com valores ordenados e sem repetição.
+    """
+    return FiltroColetas(
+        *(tuple(sorted(set(valores))) for valores in (estados, cidades, estacoes, poluentes)),
+        incluir_oceanicas=bool(incluir_oceanicas),
+        area=None if area is None else tuple(float(v) for v in area),
+    )
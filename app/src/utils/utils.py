@@ -1,2 +1,22 @@
+import hashlib
+from pathlib import Path
 
 
+def hash_arquivo(caminho: Path, tamanho_bloco: int = 1 << 20) -> str:
+    """Calcula o hash SHA-256 do conteúdo de um arquivo, lendo-o em blocos.
+
+    Usado tanto na ingestão incremental (`utils.db`) quanto no manifesto dos mapas
+    (`src/manifesto.py`).
+
+    Args:
+        caminho (Path): Caminho do arquivo.
+        tamanho_bloco (int, optional): Tamanho de cada bloco lido, em bytes. Padrão é 1 MiB.
+
+    Returns:
+        str: Hash hexadecimal do conteúdo.
+    """
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        while bloco := f.read(tamanho_bloco):
+            h.update(bloco)
+    return h.hexdigest()
@@ -1,102 +1,132 @@
-from io import StringIO
-
 # import altair as alt
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from shapely import make_valid
 
-from utils.data import carrega_locale_altair, gpd_merge
-from utils.geo import cria_mapa_com_graficos, json_municipios
+from ingestao import ingere_arquivos, lista_entradas
+from manifesto import Manifesto, hash_dados
+from paths import COLETAS_BRUTAS_PATH, DATASET_PATH, ENTRADAS_PATH, MAPS_PATH
+from utils.data import carrega_locale_altair, mapeia_categorias
+from utils.dataset import grava_dataset
+from utils.geo import pasta_graficos, salva_mapa_com_graficos
+from utils.municipios import localiza_estacoes
 
 # Configurações de locale para Altair para exibição em notebooks
 # Descomentar para funcionar corretamente em notebooks
 # alt.renderers.set_embed_options(format_locale="pt-BR", time_format_locale="pt-BR")
 
-# Lê o arquivo CSV removendo aspas duplas
-# O CSV original é um CSV "sujo", criado com Excel, que adiciona aspas duplas
-# em torno de cada campo, o que causa problemas na leitura.
-with open(
-    "../data/dados_exemplo_poluentes_no_acentos.csv", "r", encoding="utf-8-sig"
-) as f:
-    linhas = [linha.replace('"', "") for linha in f]
-
-# Converte as linhas limpas para um buffer em memória
-csv_buffer = StringIO("".join(linhas))
-
-# Lê o CSV normalmente após a limpeza
-df = pd.read_csv(csv_buffer, sep=",")
-#
-# Remove a coluna "unit" se todos os valores forem iguais
-# Neste caso, todos os valores são "mg/L", então a coluna é desnecessária
-if "unit" in df.columns and df["unit"].nunique() == 1:
-    df = df.drop(columns=["unit"])
-
-# Converte as colunas de latitude e longitude para o tipo numérico
-df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
-df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
-
-# Remove Estacao do nome das estações e converte para categoria
-df["station_name"] = df["station_name"].str.replace("Estacao", "")
-df["station_name"] = df["station_name"].str.strip()
-df["station_name"] = df["station_name"].astype("category")
-
-# Converte a coluna de data para o tipo datetime
-df["sample_dt"] = pd.to_datetime(df["sample_dt"], format="%Y-%m-%d")
-
-# Remove a coluna station_id, já que station_name é suficiente para identificar os pontos de coleta
-# Cada station_id tem um station_name único
-df = df.drop(columns=["station_id"])
-
-# Transforma o DataFrame para o formato longo (long format) para facilitar a plotagem
-# com bibliotecas de visualização
-df_longo = df.melt(
-    id_vars=["station_name", "lat", "lon", "sample_dt"],
-    value_vars=["pol_a", "pol_b"],
-    var_name="pollutant",
-    value_name="value",
-)
-
-gdf = gpd.GeoDataFrame(
-    df, geometry=gpd.points_from_xy(df["lon"], df["lat"]), crs="EPSG:4326"
-)
-
-estados_sudeste = ["ES", "MG", "RJ", "SP"]
-
-municipios_sudeste = json_municipios(estados_sudeste)
-municipios_sudeste["geometry"] = make_valid(municipios_sudeste["geometry"])
-pontos_coleta = (
-    gdf[["station_name", "geometry"]].drop_duplicates().reset_index(drop=True)
-)
-
-pontos_coleta_municipios = gpd.sjoin(
-    municipios_sudeste, pontos_coleta, how="inner", predicate="intersects"
-).drop(columns="index_right")
-
-pontos_coleta_municipios = gpd_merge(
-    gdf,
-    pontos_coleta_municipios[["station_name", "city", "state"]],
-    on="station_name",
-    how="left",
-)
-
-non_cat_cols = pontos_coleta_municipios.select_dtypes(exclude=["category"]).columns
-pontos_coleta_municipios[non_cat_cols] = pontos_coleta_municipios[non_cat_cols].fillna(
-    "N/A"
-)
-
-pontos_coleta_municipios_longo = pontos_coleta_municipios.melt(
-    id_vars=["station_name", "lat", "lon", "sample_dt", "city", "state", "geometry"],
-    value_vars=["pol_a", "pol_b"],
-    var_name="pollutant",
-    value_name="value",
-)
-
-pontos_coleta_municipios_longo["sample_dt"] = pd.to_datetime(
-    pontos_coleta_municipios_longo["sample_dt"], format="%d/%m/%Y"
-)
-
-pontos_coleta_municipios_longo = pontos_coleta_municipios_longo.sort_values("sample_dt")
-
-locale = carrega_locale_altair("pt-BR")
-m = cria_mapa_com_graficos(pontos_coleta_municipios_longo, locale)
-m.save("../maps/mapa.html")
+# Identificação de uma estação (o nome e as coordenadas, ver utils/municipios.py)
+CHAVE_ESTACAO = ["station_name", "lat", "lon"]
+
+# Mapa com gráficos por estação; o nome é diferente do mapa de src/map.py
+# (maps/mapa.html), já que cada um tem sua entrada no manifesto. Os dados dos
+# gráficos ficam fora do HTML, na pasta ao lado dele (ver utils/geo.py::pasta_graficos)
+NOME_MAPA_GRAFICOS = "mapa_com_graficos.html"
+
+# Versão do construtor do mapa com gráficos (salva_mapa_com_graficos): incrementar
+# ao mudar o conteúdo gerado, para que o manifesto refaça o mapa já existente
+VERSAO_MAPA_GRAFICOS = 2
+
+
+def prepara_coletas() -> pd.DataFrame:
+    """Lê as coletas brutas e as prepara para o dataset e os mapas."""
+    df = pd.read_parquet(COLETAS_BRUTAS_PATH)
+
+    # Remove a coluna "unit" se todos os valores forem iguais
+    # Neste caso, todos os valores são "mg/L", então a coluna é desnecessária
+    if "unit" in df.columns and df["unit"].nunique() == 1:
+        df = df.drop(columns=["unit"])
+
+    # Remove Estacao do nome das estações; a coluna já é categórica e a limpeza é
+    # feita nas categorias (uma vez por estação), não em cada linha
+    df["station_name"] = mapeia_categorias(
+        df["station_name"], lambda nomes: nomes.str.replace("Estacao", "").str.strip()
+    )
+
+    # Remove a coluna station_id, já que station_name é suficiente para identificar
+    # os pontos de coleta; cada station_id tem um station_name único
+    df = df.drop(columns=["station_id"])
+
+    # Cidade e estado de cada estação pela tabela persistente estação → município:
+    # só estações novas ou movidas são localizadas nas malhas municipais (todas as
+    # UFs do armazenamento local, ver utils/municipios.py)
+    estacoes = df[CHAVE_ESTACAO].drop_duplicates(ignore_index=True)
+    localizacao = localiza_estacoes(estacoes).astype(
+        {"station_name": df["station_name"].dtype}
+    )
+    estacoes = estacoes.merge(localizacao, on=CHAVE_ESTACAO, how="left")
+    estacoes[["city", "state"]] = estacoes[["city", "state"]].fillna("N/A")
+
+    # As coletas já estão no formato longo (long format), que facilita a plotagem
+    # com bibliotecas de visualização, e compacto: textos como categorias (códigos
+    # inteiros por linha), valores em float32 e sem geometria por linha
+    longo = df.merge(
+        estacoes.astype({"city": "category", "state": "category"}),
+        on=CHAVE_ESTACAO,
+        how="left",
+    )[
+        ["station_name", "lat", "lon", "sample_dt", "city", "state", "pollutant", "value"]
+    ]
+    del df
+
+    return longo.sort_values("sample_dt", ignore_index=True)
+
+
+def geometria_estacoes(coletas: pd.DataFrame) -> gpd.GeoDataFrame:
+    """Coletas com a geometria das estações para o mapa: um ponto por estação,
+    compartilhado (por referência) pelas linhas da estação."""
+    estacao = (
+        coletas.groupby(CHAVE_ESTACAO, observed=True, sort=False).ngroup().to_numpy()
+    )
+    primeiras = np.unique(estacao, return_index=True)[1]
+    pontos = gpd.points_from_xy(
+        coletas["lon"].to_numpy()[primeiras], coletas["lat"].to_numpy()[primeiras]
+    )
+    return gpd.GeoDataFrame(coletas, geometry=pontos.take(estacao), crs="EPSG:4326")
+
+
+def main() -> None:
+    # Junta os CSVs de data/ em um Parquet no formato longo (uma linha por estação,
+    # data e poluente), sem as coletas repetidas entre arquivos (ver ingestao.py)
+    # Os CSVs originais são CSVs "sujos", criados com Excel, que adicionam aspas
+    # duplas em torno de cada linha; as aspas são removidas bloco a bloco, e as
+    # colunas já saem tipadas (coordenadas e valores numéricos, datas como datetime)
+    ingere_arquivos(lista_entradas([ENTRADAS_PATH]), COLETAS_BRUTAS_PATH)
+    pontos_coleta_municipios_longo = prepara_coletas()
+
+    # Dataset particionado por estado, ano e poluente lido pelo app e por map.py
+    # (ver utils/dataset.py)
+    grava_dataset(pontos_coleta_municipios_longo, DATASET_PATH)
+
+    # O mapa só é refeito se os dados ou os parâmetros mudaram desde a última
+    # geração, ou se a pasta com os dados dos gráficos sumiu ou mudou (ver
+    # manifesto.py). Os popups buscam os dados dos gráficos só quando abertos, então
+    # o HTML não embute as séries de todas as estações
+    destino = MAPS_PATH / NOME_MAPA_GRAFICOS
+    parametros = {
+        "construtor": "src/data_prep.py",
+        "versao": VERSAO_MAPA_GRAFICOS,
+        "locale": "pt-BR",
+        "sob_demanda": True,
+    }
+    manifesto = Manifesto(MAPS_PATH)
+    entrada = hash_dados(pontos_coleta_municipios_longo)
+    if manifesto.atualizado(destino, entrada, parametros):
+        print(f"Mapa atualizado, mantido: {destino}")
+    else:
+        locale = carrega_locale_altair(parametros["locale"])
+        salva_mapa_com_graficos(
+            geometria_estacoes(pontos_coleta_municipios_longo),
+            locale,
+            destino,
+            sob_demanda=parametros["sob_demanda"],
+        )
+        manifesto.registra(destino, entrada, parametros, (pasta_graficos(destino),))
+        manifesto.salva()
+
+
+# Com a preparação toda em main(), processos filhos (spawn/forkserver) que
+# reimportem este módulo (p.ex. os da conversão paralela em `ingere_arquivos`) não
+# refazem a ingestão, a localização das estações nem o mapa
+if __name__ == "__main__":
+    main()
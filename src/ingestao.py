@@ -0,0 +1,315 @@
+"""Ingere as exportações CSV das coletas em um Parquet no formato longo.
+
+As exportações são CSVs "sujos", criados com Excel, com cada linha inteira entre
+aspas duplas. Cada arquivo é lido em blocos: as aspas são removidas de cada bloco
+de bytes, o CSV é interpretado pelo leitor colunar do PyArrow em lotes e cada
+lote, já tipado, é gravado direto no Parquet. Assim, só um bloco do arquivo fica
+em memória por vez, qualquer que seja o tamanho da exportação.
+
+Vários arquivos (p.ex. os envios diários das estações) são convertidos em
+paralelo por processos e juntados em um único Parquet no formato longo, sem as
+coletas repetidas entre arquivos (mesma estação, data e poluente).
+
+Uso:
+
+    python src/ingestao.py
+    python src/ingestao.py data/ envios/ --padrao "*.csv" --processos 4
+    python src/ingestao.py exportacao.csv --saida data/coletas_brutas.parquet
+"""
+
+import argparse
+import codecs
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from paths import COLETAS_BRUTAS_PATH, ENTRADAS_PATH
+
+# Tamanho dos blocos lidos do arquivo e dos lotes interpretados pelo leitor CSV
+TAMANHO_BLOCO = 1 << 24
+# Textos repetidos (estação, unidade, poluente) são gravados como dicionário: cada
+# linha guarda só o código, e o pandas os lê como categóricos
+TEXTO = pa.dictionary(pa.int32(), pa.string())
+# Tipo dos valores medidos (as colunas dos poluentes)
+TIPO_VALOR = pa.float32()
+# Tipos das colunas de identificação; as demais colunas são os poluentes (TIPO_VALOR)
+TIPOS_COLUNAS = {
+    "station_id": TEXTO,
+    "station_name": TEXTO,
+    "lat": pa.float64(),
+    "lon": pa.float64(),
+    "sample_dt": pa.timestamp("ns"),
+    "unit": TEXTO,
+}
+# Esquema das coletas no formato longo (uma linha por estação, data e poluente)
+ESQUEMA_LONGO = pa.schema(
+    [*TIPOS_COLUNAS.items(), ("pollutant", TEXTO), ("value", TIPO_VALOR)]
+)
+# Chave de uma coleta, usada para descartar duplicatas entre arquivos
+CHAVE_COLETA = ["station_id", "sample_dt", "pollutant"]
+# Arquivos lidos de cada pasta de entrada
+PADRAO_ENTRADAS = "*.csv"
+
+
+def blocos_sem_aspas(arquivo, tamanho_bloco: int = TAMANHO_BLOCO):
+    """Lê um arquivo em blocos de linhas inteiras, sem aspas duplas nem BOM UTF-8.
+
+    Args:
+        arquivo: Arquivo aberto em modo binário.
+        tamanho_bloco (int, optional): Bytes lidos do arquivo por vez. Padrão é
+            TAMANHO_BLOCO.
+
+    Yields:
+        bytes: Blocos terminados em fim de linha (exceto, talvez, o último).
+    """
+    inicio = arquivo.read(len(codecs.BOM_UTF8)).removeprefix(codecs.BOM_UTF8)
+    resto = inicio.replace(b'"', b"")
+    while bloco := arquivo.read(tamanho_bloco):
+        # Remover aspas byte a byte não depende das fronteiras entre os blocos;
+        # a linha incompleta do fim do bloco segue para o próximo
+        bloco = resto + bloco.replace(b'"', b"")
+        fim = bloco.rfind(b"\n") + 1
+        resto = bloco[fim:]
+        if fim:
+            yield bloco[:fim]
+    if resto.strip():
+        yield resto
+
+
+def le_csv_em_lotes(caminho: Path, tamanho_bloco: int = TAMANHO_BLOCO):
+    """Lê um CSV de coletas em lotes tipados, removendo as aspas em fluxo.
+
+    Cada bloco de linhas é interpretado pelo leitor CSV do PyArrow com as colunas
+    e os tipos do cabeçalho, então todos os lotes têm o mesmo esquema e só um
+    bloco do arquivo fica em memória por vez.
+
+    Args:
+        caminho (Path): CSV exportado (UTF-8, com ou sem BOM).
+        tamanho_bloco (int, optional): Bytes por bloco lido. Padrão é TAMANHO_BLOCO.
+
+    Yields:
+        pa.Table: Lotes do CSV.
+    """
+    with open(caminho, "rb") as f:
+        blocos = blocos_sem_aspas(f, tamanho_bloco)
+        primeiro = next(blocos, b"")
+        cabecalho, _, primeiro = primeiro.partition(b"\n")
+        colunas = cabecalho.decode("utf-8").strip().split(",")
+        if colunas == [""]:
+            raise ValueError(f"CSV sem cabeçalho: {caminho}")
+        # Colunas fora de TIPOS_COLUNAS são os poluentes: declaradas numéricas
+        # para que um bloco sem valores não tenha um tipo diferente dos demais
+        opcoes_leitura = pv.ReadOptions(column_names=colunas)
+        opcoes_conversao = pv.ConvertOptions(
+            column_types={c: TIPOS_COLUNAS.get(c, TIPO_VALOR) for c in colunas},
+            timestamp_parsers=["%Y-%m-%d", pv.ISO8601],
+        )
+        vazio = True
+        for bloco in itertools.chain([primeiro], blocos):
+            if bloco.strip():
+                vazio = False
+                yield pv.read_csv(
+                    pa.py_buffer(bloco),
+                    read_options=opcoes_leitura,
+                    convert_options=opcoes_conversao,
+                )
+        if vazio:
+            tipos = opcoes_conversao.column_types
+            yield pa.schema([(c, tipos[c]) for c in colunas]).empty_table()
+
+
+def formato_longo(lote: pa.Table) -> pa.Table:
+    """Passa um lote do formato largo (uma coluna por poluente) para o longo.
+
+    Os poluentes são as colunas do lote fora de TIPOS_COLUNAS, quantas forem.
+    Cada uma vira um bloco de linhas com `pollutant` (dicionário de um só valor,
+    sem repetir o nome em cada linha) e `value`; linhas sem valor são
+    descartadas. As colunas de identificação ausentes no lote entram nulas, então
+    todos os lotes têm o esquema ESQUEMA_LONGO.
+
+    Args:
+        lote (pa.Table): Lote lido do CSV.
+
+    Returns:
+        pa.Table: Lote no formato longo.
+    """
+    ids = {
+        c: lote[c] if c in lote.column_names else pa.nulls(lote.num_rows, t)
+        for c, t in TIPOS_COLUNAS.items()
+    }
+    poluentes = [c for c in lote.column_names if c not in TIPOS_COLUNAS]
+    partes = []
+    for poluente in poluentes:
+        valores = lote[poluente]
+        tem_valor = pc.is_valid(valores)
+        parte = pa.table({**ids, "value": valores}).filter(tem_valor)
+        codigos = pa.array(np.zeros(parte.num_rows, dtype=np.int32))
+        coluna = pa.DictionaryArray.from_arrays(codigos, pa.array([poluente]))
+        partes.append(
+            parte.add_column(len(ids), "pollutant", coluna).cast(ESQUEMA_LONGO)
+        )
+    return pa.concat_tables(partes) if partes else ESQUEMA_LONGO.empty_table()
+
+
+def converte_csv(
+    caminho: Path,
+    destino: Path = COLETAS_BRUTAS_PATH,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+    longo: bool = False,
+) -> int:
+    """Converte um CSV de coletas em Parquet, lote a lote.
+
+    O Parquet é gravado primeiro em um arquivo temporário, que só substitui o
+    destino ao final, então uma conversão interrompida não deixa um arquivo pela
+    metade.
+
+    Args:
+        caminho (Path): CSV exportado.
+        destino (Path, optional): Parquet de saída. Padrão é COLETAS_BRUTAS_PATH.
+        tamanho_bloco (int, optional): Bytes por bloco lido e por lote
+            interpretado. Padrão é TAMANHO_BLOCO.
+        longo (bool, optional): Grava no formato longo (ver `formato_longo`).
+            Padrão é False.
+
+    Returns:
+        int: Número de linhas gravadas.
+    """
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_suffix(".tmp")
+    linhas = 0
+    escritor = None
+    try:
+        for lote in le_csv_em_lotes(caminho, tamanho_bloco):
+            if longo:
+                lote = formato_longo(lote)
+            if escritor is None:
+                escritor = pq.ParquetWriter(temporario, lote.schema)
+            escritor.write_table(lote)
+            linhas += lote.num_rows
+    finally:
+        if escritor is not None:
+            escritor.close()
+    temporario.replace(destino)
+    return linhas
+
+
+def hash_chaves(caminho: Path) -> np.ndarray:
+    """Hash de 64 bits da chave CHAVE_COLETA de cada linha de um Parquet, lote a lote."""
+    hashes = [
+        pd.util.hash_pandas_object(lote.to_pandas(), index=False).to_numpy()
+        for lote in pq.ParquetFile(caminho).iter_batches(columns=CHAVE_COLETA)
+    ]
+    return np.concatenate(hashes) if hashes else np.empty(0, np.uint64)
+
+
+def _converte_parte(caminho: Path, destino: Path, tamanho_bloco: int) -> np.ndarray:
+    """Converte um CSV em uma parte no formato longo e retorna os hashes das chaves."""
+    converte_csv(caminho, destino, tamanho_bloco, longo=True)
+    return hash_chaves(destino)
+
+
+def lista_entradas(caminhos: list[Path], padrao: str = PADRAO_ENTRADAS) -> list[Path]:
+    """Lista os CSVs de entrada: os arquivos informados e os de cada pasta.
+
+    Args:
+        caminhos (list[Path]): Arquivos e/ou pastas.
+        padrao (str, optional): Padrão glob dos arquivos de uma pasta. Padrão é
+            PADRAO_ENTRADAS.
+
+    Returns:
+        list[Path]: Arquivos, em ordem de nome dentro de cada pasta.
+    """
+    arquivos = []
+    for caminho in map(Path, caminhos):
+        if caminho.is_dir():
+            arquivos.extend(sorted(c for c in caminho.glob(padrao) if c.is_file()))
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+
+def ingere_arquivos(
+    arquivos: list[Path],
+    destino: Path = COLETAS_BRUTAS_PATH,
+    processos: int | None = None,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> tuple[int, int]:
+    """Junta vários CSVs de coletas em um único Parquet no formato longo, sem duplicatas.
+
+    Cada arquivo é convertido em uma parte temporária (ESQUEMA_LONGO) por um
+    processo, que também calcula o hash de 64 bits da chave (estação, data,
+    poluente) de cada linha. Com todos os hashes, fica só a última ocorrência de
+    cada chave (os arquivos posteriores na lista prevalecem, p.ex. reenvios
+    corrigidos) e as partes são gravadas filtradas, uma a uma, no destino.
+
+    Args:
+        arquivos (list[Path]): CSVs de entrada (ver `lista_entradas`).
+        destino (Path, optional): Parquet de saída. Padrão é COLETAS_BRUTAS_PATH.
+        processos (int | None, optional): Processos da conversão; None usa todos
+            os núcleos. Padrão é None.
+        tamanho_bloco (int, optional): Bytes por bloco lido de cada CSV. Padrão é
+            TAMANHO_BLOCO.
+
+    Returns:
+        tuple[int, int]: Linhas lidas (no formato longo) e linhas gravadas.
+    """
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=destino.parent) as pasta:
+        partes = [Path(pasta) / f"{i:05d}.parquet" for i in range(len(arquivos))]
+        blocos = itertools.repeat(tamanho_bloco)
+        if processos == 1 or len(arquivos) < 2:
+            hashes = list(map(_converte_parte, arquivos, partes, blocos))
+        else:
+            trabalhadores = min(processos or os.cpu_count() or 1, len(arquivos))
+            with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+                hashes = list(executor.map(_converte_parte, arquivos, partes, blocos))
+
+        # Fica a última ocorrência de cada chave (tabela hash dos hashes)
+        todos = np.concatenate(hashes) if hashes else np.empty(0, np.uint64)
+        manter = ~pd.Series(todos).duplicated(keep="last").to_numpy()
+        del hashes, todos
+
+        temporario = destino.with_suffix(".tmp")
+        inicio = 0
+        with pq.ParquetWriter(temporario, ESQUEMA_LONGO) as escritor:
+            for parte in partes:
+                for lote in pq.ParquetFile(parte).iter_batches():
+                    filtro = pa.array(manter[inicio : inicio + lote.num_rows])
+                    escritor.write_batch(lote.filter(filtro))
+                    inicio += lote.num_rows
+        temporario.replace(destino)
+    return len(manter), int(manter.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("entradas", type=Path, nargs="*", default=[ENTRADAS_PATH])
+    parser.add_argument("--padrao", default=PADRAO_ENTRADAS)
+    parser.add_argument("--saida", type=Path, default=COLETAS_BRUTAS_PATH)
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--tamanho-bloco", type=int, default=TAMANHO_BLOCO)
+    args = parser.parse_args()
+
+    arquivos = lista_entradas(args.entradas, args.padrao)
+    lidas, gravadas = ingere_arquivos(
+        arquivos, args.saida, args.processos, args.tamanho_bloco
+    )
+    print(
+        f"{len(arquivos)} arquivos, {lidas} coletas lidas, "
+        f"{lidas - gravadas} duplicadas descartadas, {gravadas} gravadas em {args.saida}"
+    )
+
+
+if __name__ == "__main__":
+    main()
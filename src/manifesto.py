@@ -0,0 +1,129 @@
+"""Manifesto de construção dos artefatos gerados (mapas HTML).
+
+Para cada artefato, o manifesto guarda o hash do conteúdo dos dados de entrada e
+dos parâmetros do construtor usados na última geração, além do hash dos anexos
+gravados junto com ele (p.ex. a pasta com os dados dos gráficos de um mapa). Ao
+rodar de novo, os artefatos cujos hashes não mudaram (e que ainda existem, com os
+anexos intactos) são mantidos, e só os demais são refeitos.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Garante que app/src esteja no sys.path para o import de utils; vai ao final para
+# que `paths` continue sendo o src/paths.py dos scripts
+APP_SRC = Path(__file__).resolve().parents[1] / "app" / "src"
+if str(APP_SRC) not in sys.path:
+    sys.path.append(str(APP_SRC))
+
+from utils.utils import hash_arquivo  # noqa: E402
+
+NOME_MANIFESTO = "manifesto.json"
+
+
+def hash_dados(dados: pd.DataFrame) -> str:
+    """Hash do conteúdo de um DataFrame (valores e nomes das colunas, sem índice)."""
+    linhas = pd.util.hash_pandas_object(dados, index=False).to_numpy()
+    h = hashlib.sha1(linhas.tobytes())
+    h.update(json.dumps([str(c) for c in dados.columns]).encode())
+    return h.hexdigest()
+
+
+def hash_hashes(hashes: list[str]) -> str:
+    """Combina os hashes das partes de uma entrada (na ordem recebida)."""
+    return hashlib.sha1("".join(hashes).encode()).hexdigest()
+
+
+def hash_anexo(caminho: Path) -> str:
+    """Hash do conteúdo de um arquivo ou de uma pasta (nomes e conteúdo).
+
+    Os arquivos usam `hash_arquivo`, o mesmo da ingestão em `utils.db`.
+    """
+    caminho = Path(caminho)
+    if not caminho.is_dir():
+        return hash_arquivo(caminho)
+    arquivos = sorted(p for p in caminho.rglob("*") if p.is_file())
+    return hash_hashes(
+        [p.relative_to(caminho).as_posix() + hash_arquivo(p) for p in arquivos]
+    )
+
+
+def hash_parametros(parametros: dict) -> str:
+    """Hash dos parâmetros do construtor (JSON com chaves ordenadas)."""
+    texto = json.dumps(parametros, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode()).hexdigest()
+
+
+class Manifesto:
+    """Registro dos hashes de entrada e de parâmetros de cada artefato de uma pasta.
+
+    Args:
+        pasta (Path): Pasta dos artefatos; o manifesto é gravado nela, em
+            NOME_MANIFESTO, e os artefatos são identificados pelo caminho
+            relativo a ela.
+    """
+
+    def __init__(self, pasta: Path):
+        self.pasta = Path(pasta)
+        self.caminho = self.pasta / NOME_MANIFESTO
+        try:
+            self.entradas = json.loads(self.caminho.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entradas = {}
+
+    def _chave(self, artefato: Path) -> str:
+        return Path(artefato).resolve().relative_to(self.pasta.resolve()).as_posix()
+
+    def atualizado(self, artefato: Path, entrada: str, parametros: dict) -> bool:
+        """Indica se o artefato existe e foi gerado com os mesmos hashes, e se os
+        anexos registrados com ele existem e não mudaram."""
+        registro = self.entradas.get(self._chave(artefato))
+        return (
+            registro is not None
+            and Path(artefato).exists()
+            and registro["entrada"] == entrada
+            and registro["parametros"] == hash_parametros(parametros)
+            and all(
+                (self.pasta / anexo).exists()
+                and hash_anexo(self.pasta / anexo) == h
+                for anexo, h in registro.get("anexos", {}).items()
+            )
+        )
+
+    def registra(
+        self,
+        artefato: Path,
+        entrada: str,
+        parametros: dict,
+        anexos: tuple[Path, ...] = (),
+    ) -> None:
+        """Registra a geração do artefato (gravado só em `salva`).
+
+        Args:
+            artefato (Path): Artefato gerado.
+            entrada (str): Hash dos dados de entrada.
+            parametros (dict): Parâmetros do construtor.
+            anexos (tuple[Path, ...], optional): Arquivos ou pastas gravados junto
+                com o artefato, na mesma pasta do manifesto; se algum deles sumir ou
+                mudar, o artefato deixa de estar atualizado. Padrão é ().
+        """
+        registro = {"entrada": entrada, "parametros": hash_parametros(parametros)}
+        if anexos:
+            registro["anexos"] = {
+                self._chave(anexo): hash_anexo(anexo) for anexo in anexos
+            }
+        self.entradas[self._chave(artefato)] = registro
+
+    def salva(self) -> None:
+        """Grava o manifesto de forma atômica (arquivo temporário + troca)."""
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_suffix(".tmp")
+        temporario.write_text(
+            json.dumps(self.entradas, indent=1, sort_keys=True), encoding="utf-8"
+        )
+        os.replace(temporario, self.caminho)
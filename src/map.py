@@ -1,102 +1,551 @@
+"""Gera mapas Folium das coletas (mini-barras, heatmaps e marcadores por estação).
+
+Sem argumentos, gera um único mapa com todos os dados em `maps/mapa.html`. Com
+`--estados`, `--poluentes` e/ou `--meses`, gera um mapa para cada combinação (a
+matriz das opções), em paralelo por processos; cada opção sem valores gera um
+mapa por valor presente nos dados.
+
+Com `--tipo coropletico` ou `--tipo temporal`, gera os mapas de um poluente por
+vez de utils/geo.py (municípios coloridos pela média mensal, ou estações animadas
+no tempo) em vez do mapa de camadas; sem `--poluentes`, há um por poluente.
+
+Uso:
+
+    python src/map.py
+    python src/map.py --estados --poluentes pol_a pol_b --meses 2025-01 2025-02
+    python src/map.py --tipo coropletico --estados RJ
+    python src/map.py --tipo temporal --poluentes pol_a
+"""
+
+import argparse
+import itertools
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import geopandas as gpd
+import numpy as np
 import pandas as pd
 import folium
-from folium.features import DivIcon
+from branca.element import MacroElement
 from folium.plugins import HeatMap
 from folium.map import FeatureGroup, LayerControl
+from folium.utilities import JsCode
+from jinja2 import Template
 
+# Garante que app/src esteja no sys.path para permitir imports de utils; vai ao
+# final para que `paths` continue sendo o src/paths.py deste script
+APP_SRC = Path(__file__).resolve().parents[1] / "app" / "src"
+if str(APP_SRC) not in sys.path:
+    sys.path.append(str(APP_SRC))
 
-def main():
-    # --- Leitura dos dados ---
-    df = pd.read_parquet("../data/pontos_coleta_municipios_longo.parquet")
+from manifesto import Manifesto, hash_dados, hash_hashes
+from paths import DATASET_PATH, MAPS_PATH
+from utils.constants import NA_VALUE, ordena_poluentes, rotulo_poluente
+from utils.dataset import filtros_dataset
+from utils.geo import cria_mapa_coropletico, cria_mapa_temporal
+
+# Níveis de zoom com grade própria nos heatmaps: a grade de um nível é usada desde
+# esse zoom até o próximo nível (a primeira também abaixo dela e a última acima)
+ZOOMS_GRADE = (4, 6, 8, 10, 12)
+# Lado da célula da grade, em pixels no zoom do nível (menor que o raio do heatmap)
+PIXELS_CELULA = 8
+RAIO_HEATMAP = 15
+
+# Versão do construtor dos mapas: incrementar ao mudar o conteúdo gerado, para que
+# o manifesto refaça os mapas já existentes
+VERSAO_MAPAS = 2
+
+ESCALA_BARRA = 5  # Fator visual de escala das barras
+ALTURA_MAXIMA_BARRA = 40
+# Largura total das barras de uma estação (dividida entre os poluentes) e mínima
+# de cada barra, em pixels
+LARGURA_BARRAS = 20
+LARGURA_MINIMA_BARRA = 3
+# Cores das barras, na ordem dos poluentes (repetidas depois da última)
+CORES_BARRAS = (
+    "#e74c3c", "#3498db", "#2ecc71", "#f39c12", "#9b59b6", "#1abc9c", "#e67e22",
+    "#34495e",
+)
+
+# Eixos da matriz de mapas: coluna dos dados agrupados para cada opção da CLI
+EIXOS = {"estados": "state", "poluentes": "pollutant", "meses": "mes"}
+
+# Tipos de mapa (`--tipo`): o primeiro é o mapa de camadas de todos os poluentes;
+# os demais mostram um único poluente (ver `cria_mapa`)
+TIPOS_MAPA = ("poluentes", "coropletico", "temporal")
+
+# Executado no navegador para cada estação da camada de barras: o ícone é o HTML
+# das barras, montado em `camada_barras`
+JS_ICONE_BARRAS = JsCode(
+    """
+function(feature, layer) {
+    layer.setIcon(L.divIcon({html: feature.properties.html, className: "empty"}));
+    layer.bindTooltip(feature.properties.tooltip);
+}
+"""
+)
+
+JS_POPUP_MARCADOR = JsCode(
+    """
+function(feature, layer) {
+    layer.bindPopup(feature.properties.popup);
+}
+"""
+)
+
+
+def tamanho_celula(zoom: int, pixels: int = PIXELS_CELULA) -> float:
+    """Lado (em graus) de uma célula de `pixels` pixels no nível de zoom dado."""
+    return pixels * 360 / (256 * 2**zoom)
+
+
+def grade_densidade(
+    lat: np.ndarray, lon: np.ndarray, pesos: np.ndarray, celula: float
+) -> np.ndarray:
+    """Agrega pontos ponderados em uma grade regular de células.
+
+    As células são alinhadas a (-90, -180), então a grade de um nível é a mesma
+    para qualquer conjunto de dados; só as células com pontos são geradas
+    (esparsa), e o peso de cada uma é a soma dos pesos dos seus pontos,
+    normalizada pelo maior peso da grade.
+
+    Args:
+        lat (np.ndarray): Latitudes dos pontos.
+        lon (np.ndarray): Longitudes dos pontos.
+        pesos (np.ndarray): Peso de cada ponto (p.ex. o valor da coleta).
+        celula (float): Lado da célula, em graus.
+
+    Returns:
+        np.ndarray: Array (n_celulas, 3) com [lat, lon, peso] do centro de cada
+            célula, no formato do `HeatMap`.
+    """
+    linhas = np.floor((np.asarray(lat, dtype=float) + 90) / celula).astype(np.int64)
+    colunas = np.floor((np.asarray(lon, dtype=float) + 180) / celula).astype(np.int64)
+    # Chave única por célula (1-D, bem mais rápida de agrupar que pares de índices)
+    n_colunas = int(np.ceil(360 / celula)) + 1
+    chaves, inverso = np.unique(linhas * n_colunas + colunas, return_inverse=True)
+    somas = np.bincount(inverso, weights=pesos, minlength=len(chaves))
+    maximo = somas.max() if len(somas) else 0
+    if maximo > 0:
+        somas = somas / maximo
+    centros_lat = (chaves // n_colunas + 0.5) * celula - 90
+    centros_lon = (chaves % n_colunas + 0.5) * celula - 180
+    return np.column_stack([centros_lat, centros_lon, somas])
 
-    # --- Pré-processamento ---
-    # Remove linhas com dados essenciais ausentes
+
+class HeatmapPorZoom(MacroElement):
+    """Exibe, em cada grupo, só o heatmap da grade correspondente ao zoom atual."""
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function() {
+            const mapa = {{ this._parent.get_name() }};
+            const niveis = [
+            {%- for grupo, camada, minimo, maximo in this.niveis %}
+                {grupo: {{ grupo }}, camada: {{ camada }},
+                 minimo: {{ minimo }}, maximo: {{ maximo }}},
+            {%- endfor %}
+            ];
+            function atualiza() {
+                const zoom = mapa.getZoom();
+                niveis.forEach(function(n) {
+                    const visivel = zoom >= n.minimo && zoom < n.maximo;
+                    if (visivel && !n.grupo.hasLayer(n.camada)) {
+                        n.grupo.addLayer(n.camada);
+                    } else if (!visivel && n.grupo.hasLayer(n.camada)) {
+                        n.grupo.removeLayer(n.camada);
+                    }
+                });
+            }
+            mapa.on("zoomend", atualiza);
+            atualiza();
+        })();
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._name = "HeatmapPorZoom"
+        self.niveis = []
+
+    def adiciona(self, grupo: FeatureGroup, camada: HeatMap, minimo, maximo):
+        self.niveis.append((grupo.get_name(), camada.get_name(), minimo, maximo))
+
+
+def camada_heatmap(
+    amostras: pd.DataFrame, nome: str, controle: HeatmapPorZoom
+) -> FeatureGroup:
+    """Cria o grupo com um heatmap pré-agregado por nível de `ZOOMS_GRADE`.
+
+    O tamanho do HTML e o custo de desenho no navegador dependem do número de
+    células com coletas em cada grade, não do número de coletas.
+    """
+    grupo = FeatureGroup(name=nome)
+    lat = amostras["lat"].to_numpy()
+    lon = amostras["lon"].to_numpy()
+    pesos = amostras["value"].to_numpy(dtype=float)
+    for i, zoom in enumerate(ZOOMS_GRADE):
+        celulas = grade_densidade(lat, lon, pesos, tamanho_celula(zoom))
+        heatmap = HeatMap(
+            celulas.tolist(), radius=RAIO_HEATMAP, blur=20, max_opacity=0.7
+        )
+        minimo = 0 if i == 0 else zoom
+        maximo = ZOOMS_GRADE[i + 1] if i + 1 < len(ZOOMS_GRADE) else 99
+        # Todos entram no grupo; o controle deixa só o do zoom atual
+        grupo.add_child(heatmap)
+        controle.adiciona(grupo, heatmap, minimo, maximo)
+    return grupo
+
+
+def carrega_dados(
+    caminho: Path = DATASET_PATH,
+    estados: list[str] | None = None,
+    poluentes: list[str] | None = None,
+    meses: list[str] | None = None,
+) -> pd.DataFrame:
+    """Lê as coletas, descartando linhas sem coordenadas, poluente ou valor.
+
+    Com estados, poluentes e/ou meses selecionados, só o recorte é lido: as
+    partições do dataset e os row groups fora dele são descartados sem leitura
+    (ver utils/dataset.py). None ou uma lista vazia leem todos os valores do eixo.
+    """
+    inicio = fim = None
+    if meses:
+        periodos = sorted(pd.Period(mes, "M") for mes in meses)
+        inicio, fim = periodos[0].start_time, (periodos[-1] + 1).start_time
+    filtros = filtros_dataset(
+        estados or None,
+        poluentes or None,
+        inicio,
+        fim,
+        particionado=Path(caminho).is_dir(),
+    )
+    df = pd.read_parquet(
+        caminho,
+        columns=[
+            "station_name", "lat", "lon", "city", "state", "sample_dt", "pollutant",
+            "value",
+        ],
+        filters=filtros,
+    )
     dados = df.dropna(subset=["lat", "lon", "pollutant", "value"])
+    return dados.assign(
+        station_name=dados["station_name"].astype(str),
+        state=dados["state"].astype(str),
+        pollutant=dados["pollutant"].astype(str),
+        mes=dados["sample_dt"].dt.strftime("%Y-%m"),
+    )
+
+
+def agrupa_dados(dados: pd.DataFrame) -> dict[tuple, pd.DataFrame]:
+    """Agrupa as coletas por estado, poluente e mês (os eixos da matriz de mapas)."""
+    return dict(
+        tuple(dados.groupby(list(EIXOS.values()), observed=True, sort=False))
+    )
 
+
+class EspecMapa(NamedTuple):
+    """Recorte de um mapa da matriz; None em um eixo significa todos os valores."""
+
+    estado: str | None = None
+    poluente: str | None = None
+    mes: str | None = None
+
+    def nome_arquivo(self, tipo: str = TIPOS_MAPA[0]) -> str:
+        # Sem caracteres inválidos em nomes de arquivo (p.ex. a barra de "N/A")
+        partes = [re.sub(r"[^\w.-]+", "", valor) for valor in self if valor is not None]
+        prefixo = ["mapa"] if tipo == TIPOS_MAPA[0] else ["mapa", tipo]
+        return "_".join([*prefixo, *partes]) + ".html"
+
+    def pertence(self, chave: tuple) -> bool:
+        """Indica se um grupo (estado, poluente, mês) pertence ao recorte."""
+        return all(v is None or v == c for v, c in zip(self, chave))
+
+    def seleciona(self, grupos: dict[tuple, pd.DataFrame]) -> pd.DataFrame:
+        """Junta os grupos de `agrupa_dados` que pertencem ao recorte."""
+        partes = [grupo for chave, grupo in grupos.items() if self.pertence(chave)]
+        if not partes:
+            return pd.DataFrame()
+        return pd.concat(partes, ignore_index=True)
+
+
+def matriz_especs(
+    grupos: dict[tuple, pd.DataFrame],
+    estados: list[str] | None = None,
+    poluentes: list[str] | None = None,
+    meses: list[str] | None = None,
+) -> list[EspecMapa]:
+    """Combina os valores de cada eixo nas especificações dos mapas.
+
+    Em cada eixo, None não divide os mapas e uma lista vazia gera um mapa por
+    valor presente nos dados.
+    """
+    valores = []
+    for posicao, selecionados in enumerate((estados, poluentes, meses)):
+        if selecionados is None:
+            valores.append([None])
+        elif not selecionados:
+            valores.append(sorted({chave[posicao] for chave in grupos}))
+        else:
+            valores.append(list(selecionados))
+    return [EspecMapa(*combinacao) for combinacao in itertools.product(*valores)]
+
+
+def valores_por_estacao(dados: pd.DataFrame, poluentes: list[str]) -> pd.DataFrame:
+    """Último valor de cada poluente por estação, um poluente por coluna."""
     # Obter o último valor disponível por estação e poluente como proxy
-    dados_mais_recentes = (
+    mais_recentes = (
         dados.sort_values("sample_dt")
-        .groupby(["station_name", "lat", "lon", "pollutant"])
+        .groupby(["station_name", "lat", "lon", "pollutant"], observed=True)["value"]
         .last()
+    )
+    # Reorganiza para que cada poluente fique em uma coluna, na ordem de `poluentes`
+    return (
+        mais_recentes.unstack("pollutant", fill_value=0)
+        .reindex(columns=poluentes, fill_value=0)
         .reset_index()
     )
 
-    # Reorganiza para que pol_a e pol_b fiquem em colunas distintas
-    dados_pivot = dados_mais_recentes.pivot_table(
-        index=["station_name", "lat", "lon"],
-        columns="pollutant",
-        values="value",
-        fill_value=0,
-    ).reset_index()
+
+def _pontos_estacoes(estacoes: pd.DataFrame, **propriedades) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        propriedades,
+        geometry=gpd.points_from_xy(estacoes["lon"], estacoes["lat"]),
+        crs="EPSG:4326",
+    )
+
+
+def camada_barras(estacoes: pd.DataFrame, poluentes: list[str]) -> FeatureGroup:
+    """Camada de barras verticais (mini-gráfico) com o último valor por estação."""
+    # Barras mais estreitas e mais próximas quando há muitos poluentes
+    largura = max(LARGURA_MINIMA_BARRA, LARGURA_BARRAS // len(poluentes))
+    espaco = 4 if len(poluentes) <= 2 else 1
+    html = pd.Series(
+        '<div style="display: flex; align-items: flex-end; gap: '
+        f"{espaco}px; width: {max(30, len(poluentes) * (largura + espaco))}px; "
+        'height: 45px;">',
+        index=estacoes.index,
+    )
+    for i, poluente in enumerate(poluentes):
+        valor = estacoes[poluente].astype(float)
+        altura = np.minimum(valor * ESCALA_BARRA, ALTURA_MAXIMA_BARRA).astype(int)
+        html += (
+            f'<div style="width: {largura}px; height: ' + altura.astype(str)
+            + f"px; background-color: {CORES_BARRAS[i % len(CORES_BARRAS)]};\" "
+            + f'title="{poluente}: ' + valor.map("{:.2f}".format) + '"></div>'
+        )
+    html += "</div>"
+    camada = FeatureGroup(name="Barras (último valor por poluente)")
+    folium.GeoJson(
+        _pontos_estacoes(
+            estacoes,
+            html=html.to_numpy(),
+            tooltip=("<b>" + estacoes["station_name"] + "</b>").to_numpy(),
+        ),
+        on_each_feature=JS_ICONE_BARRAS,
+        control=False,
+    ).add_to(camada)
+    return camada
+
+
+def camada_marcadores(estacoes: pd.DataFrame, poluentes: list[str]) -> FeatureGroup:
+    """Marcadores tradicionais das estações, com o último valor no popup."""
+    popup = "<b>Estação:</b> " + estacoes["station_name"]
+    for poluente in poluentes:
+        popup += (
+            f"<br><b>{rotulo_poluente(poluente)}:</b> "
+            + estacoes[poluente].map("{:.2f}".format) + " mg/L"
+        )
+    camada = FeatureGroup(name="Marcadores das Estações")
+    folium.GeoJson(
+        _pontos_estacoes(estacoes, popup=popup.to_numpy()),
+        marker=folium.Marker(
+            icon=folium.Icon(color="green", icon="flask", prefix="fa")
+        ),
+        on_each_feature=JS_POPUP_MARCADOR,
+        control=False,
+    ).add_to(camada)
+    return camada
+
+
+def cria_mapa_poluentes(dados: pd.DataFrame) -> folium.Map:
+    """Monta o mapa com as camadas de barras, heatmaps e marcadores.
+
+    Há uma barra e um heatmap por poluente presente nos dados (ver
+    `ordena_poluentes`), qualquer que seja o número de poluentes.
+    """
+    poluentes = ordena_poluentes(dados["pollutant"].unique())
+    estacoes = valores_por_estacao(dados, poluentes)
 
     # --- Criação do mapa base ---
     mapa = folium.Map(location=[dados["lat"].mean(), dados["lon"].mean()], zoom_start=6)
 
-    # --- Camada de barras verticais (mini-grafico) ---
-    camada_barras = FeatureGroup(name="Barras (poluentes A e B)")
-    ESCALA_BARRA = 5  # Fator visual de escala das barras
+    camada_barras(estacoes, poluentes).add_to(mapa)
 
-    for _, linha in dados_pivot.iterrows():
-        valor_a = linha.get("pol_a", 0)
-        valor_b = linha.get("pol_b", 0)
+    # --- Heatmaps dos poluentes (grades pré-agregadas por nível de zoom) ---
+    controle_heatmaps = HeatmapPorZoom()
+    amostras = dict(tuple(dados.groupby("pollutant", observed=True)))
+    for poluente in poluentes:
+        nome = f"Heatmap {rotulo_poluente(poluente)}"
+        camada_heatmap(amostras[poluente], nome, controle_heatmaps).add_to(mapa)
 
-        altura_a = min(int(valor_a * ESCALA_BARRA), 40)
-        altura_b = min(int(valor_b * ESCALA_BARRA), 40)
+    camada_marcadores(estacoes, poluentes).add_to(mapa)
 
-        html_barras = f"""
-        <div style="display: flex; align-items: flex-end; gap: 4px; width: 30px; height: 45px;">
-            <div style="width: 10px; height: {altura_a}px; background-color: #e74c3c;" title="pol_a: {valor_a:.2f}"></div>
-            <div style="width: 10px; height: {altura_b}px; background-color: #3498db;" title="pol_b: {valor_b:.2f}"></div>
-        </div>
-        """
+    # --- Controle de camadas ---
+    LayerControl(collapsed=False).add_to(mapa)
+    controle_heatmaps.add_to(mapa)
+    return mapa
+
+
+def cria_mapa(dados: pd.DataFrame, tipo: str, poluente: str | None) -> folium.Map:
+    """Monta o mapa de um recorte no tipo pedido (ver TIPOS_MAPA).
+
+    Os mapas coroplético e temporal mostram um único poluente, o do recorte.
+    """
+    if tipo == "coropletico":
+        return cria_mapa_coropletico(dados, poluente)
+    if tipo == "temporal":
+        return cria_mapa_temporal(dados, poluente)
+    return cria_mapa_poluentes(dados)
+
+
+# Dados agrupados compartilhados pelos processos (carregados uma vez por processo)
+_GRUPOS: dict[tuple, pd.DataFrame] = {}
 
-        folium.Marker(
-            location=[linha["lat"], linha["lon"]],
-            icon=DivIcon(html=html_barras),
-            tooltip=f"<b>{linha['station_name']}</b>",
-        ).add_to(camada_barras)
 
-    camada_barras.add_to(mapa)
+def _inicializa_processo(grupos: dict[tuple, pd.DataFrame]) -> None:
+    global _GRUPOS
+    _GRUPOS = grupos
 
-    # --- Heatmap do poluente A ---
-    amostras_a = dados[dados["pollutant"] == "pol_a"]
-    pontos_a = amostras_a[["lat", "lon", "value"]].values.tolist()
 
-    camada_heatmap_a = FeatureGroup(name="Heatmap Poluente A")
-    HeatMap(pontos_a, radius=15, blur=20, max_opacity=0.7).add_to(camada_heatmap_a)
-    camada_heatmap_a.add_to(mapa)
+def gera_mapa(
+    espec: EspecMapa, saida: Path, tipo: str = TIPOS_MAPA[0]
+) -> tuple[Path, int]:
+    """Gera e salva o mapa de um recorte; retorna o arquivo e o número de coletas."""
+    dados = espec.seleciona(_GRUPOS)
+    destino = saida / espec.nome_arquivo(tipo)
+    if tipo == "coropletico" and not dados.empty:
+        # Coletas sem município (oceânicas) não aparecem no mapa coroplético
+        dados = dados[dados["city"] != NA_VALUE]
+    if dados.empty:
+        return destino, 0
+    cria_mapa(dados, tipo, espec.poluente).save(destino)
+    return destino, len(dados)
 
-    # --- Heatmap do poluente B ---
-    amostras_b = dados[dados["pollutant"] == "pol_b"]
-    pontos_b = amostras_b[["lat", "lon", "value"]].values.tolist()
 
-    camada_heatmap_b = FeatureGroup(name="Heatmap Poluente B")
-    HeatMap(pontos_b, radius=15, blur=20, max_opacity=0.7).add_to(camada_heatmap_b)
-    camada_heatmap_b.add_to(mapa)
+def parametros_mapa(espec: EspecMapa, tipo: str = TIPOS_MAPA[0]) -> dict:
+    """Parâmetros do construtor que definem o conteúdo do mapa de um recorte."""
+    return {
+        "construtor": "src/map.py",
+        "versao": VERSAO_MAPAS,
+        "tipo": tipo,
+        "espec": espec._asdict(),
+        "zooms_grade": ZOOMS_GRADE,
+        "pixels_celula": PIXELS_CELULA,
+        "raio_heatmap": RAIO_HEATMAP,
+        "escala_barra": ESCALA_BARRA,
+    }
 
-    # --- Marcadores tradicionais para as estações ---
-    camada_marcadores = FeatureGroup(name="Marcadores das Estações")
 
-    for _, linha in dados_pivot.iterrows():
-        popup_html = (
-            f"<b>Estação:</b> {linha['station_name']}<br>"
-            f"<b>Poluente A:</b> {linha.get('pol_a', 0):.2f} mg/L<br>"
-            f"<b>Poluente B:</b> {linha.get('pol_b', 0):.2f} mg/L"
+def gera_mapas(
+    grupos: dict[tuple, pd.DataFrame],
+    especs: list[EspecMapa],
+    saida: Path = MAPS_PATH,
+    processos: int | None = None,
+    forcar: bool = False,
+    tipo: str = TIPOS_MAPA[0],
+) -> list[tuple[Path, int | None]]:
+    """Gera os mapas da matriz que estiverem desatualizados, em paralelo.
+
+    A entrada de cada mapa é identificada pelos hashes do conteúdo dos grupos do
+    seu recorte (calculados uma vez por grupo); mapas já existentes com a mesma
+    entrada e os mesmos parâmetros (ver `parametros_mapa`), segundo o manifesto
+    da pasta de saída, são mantidos. Os grupos são enviados uma única vez a cada
+    processo (no inicializador), e não a cada mapa.
+
+    Returns:
+        list[tuple[Path, int | None]]: Arquivo de cada mapa e o número de coletas
+            (0 se o recorte não tem coletas, None se o mapa estava atualizado).
+    """
+    saida.mkdir(parents=True, exist_ok=True)
+    manifesto = Manifesto(saida)
+    hashes = {chave: hash_dados(grupo) for chave, grupo in grupos.items()}
+
+    resultados = {}
+    pendentes = []
+    for espec in especs:
+        destino = saida / espec.nome_arquivo(tipo)
+        entrada = hash_hashes([h for c, h in hashes.items() if espec.pertence(c)])
+        atualizado = manifesto.atualizado(
+            destino, entrada, parametros_mapa(espec, tipo)
         )
-        folium.Marker(
-            location=[linha["lat"], linha["lon"]],
-            popup=popup_html,
-            icon=folium.Icon(color="green", icon="flask", prefix="fa"),
-        ).add_to(camada_marcadores)
+        if atualizado and not forcar:
+            resultados[espec] = (destino, None)
+        else:
+            pendentes.append((espec, entrada))
 
-    camada_marcadores.add_to(mapa)
+    if processos == 1 or len(pendentes) < 2:
+        _inicializa_processo(grupos)
+        gerados = [gera_mapa(espec, saida, tipo) for espec, _ in pendentes]
+    else:
+        trabalhadores = min(processos or os.cpu_count() or 1, len(pendentes))
+        with ProcessPoolExecutor(
+            max_workers=trabalhadores,
+            initializer=_inicializa_processo,
+            initargs=(grupos,),
+        ) as executor:
+            gerados = list(
+                executor.map(
+                    gera_mapa,
+                    [e for e, _ in pendentes],
+                    itertools.repeat(saida),
+                    itertools.repeat(tipo),
+                )
+            )
 
-    # --- Controle de camadas ---
-    LayerControl(collapsed=False).add_to(mapa)
+    for (espec, entrada), (destino, n_coletas) in zip(pendentes, gerados):
+        resultados[espec] = (destino, n_coletas)
+        if n_coletas:
+            manifesto.registra(destino, entrada, parametros_mapa(espec, tipo))
+    manifesto.salva()
+    return [resultados[espec] for espec in especs]
 
-    # --- Salvar mapa offline ---
-    mapa.save("../maps/mapa.html")
-    print("Mapa salvo com sucesso em maps/mapa.html")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for eixo in EIXOS:
+        parser.add_argument(f"--{eixo}", nargs="*", default=None)
+    parser.add_argument("--dados", type=Path, default=DATASET_PATH)
+    parser.add_argument("--saida", type=Path, default=MAPS_PATH)
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--tipo", choices=TIPOS_MAPA, default=TIPOS_MAPA[0])
+    parser.add_argument(
+        "--forcar", action="store_true", help="refaz também os mapas atualizados"
+    )
+    args = parser.parse_args()
+    if args.tipo != TIPOS_MAPA[0] and args.poluentes is None:
+        # Os mapas de um poluente por vez são divididos por poluente
+        args.poluentes = []
+
+    dados = carrega_dados(args.dados, args.estados, args.poluentes, args.meses)
+    grupos = agrupa_dados(dados)
+    especs = matriz_especs(grupos, args.estados, args.poluentes, args.meses)
+    resultados = gera_mapas(
+        grupos, especs, args.saida, args.processos, args.forcar, args.tipo
+    )
+    for destino, n_coletas in resultados:
+        if n_coletas is None:
+            print(f"Mapa atualizado, mantido: {destino}")
+        elif n_coletas:
+            print(f"Mapa salvo com sucesso em {destino} ({n_coletas} coletas)")
+        else:
+            print(f"Sem coletas para {destino.name}; mapa não gerado")
     return 1
 
 
@@ -0,0 +1,119 @@
+import os
+import sys
+from pathlib import Path
+
+import altair as alt
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+# Os testes importam utils (app/src) e os scripts de src/; app/src vem primeiro para
+# que `paths` seja o do app
+RAIZ = Path(__file__).resolve().parents[1]
+APP_SRC = RAIZ / "app" / "src"
+SRC = RAIZ / "src"
+if str(APP_SRC) not in sys.path:
+    sys.path.insert(0, str(APP_SRC))
+if str(SRC) not in sys.path:
+    sys.path.append(str(SRC))
+
+# Sem o backend SQLite, importar utils.db não ingere o dataset do repositório em
+# data/coletas.db; os testes de ingestão usam bancos temporários
+os.environ["COLETAS_BACKEND"] = "parquet"
+
+from utils import geo  # noqa: E402
+
+
+@pytest.fixture
+def locale() -> alt.Locale:
+    """Localidade pt-BR mínima, sem depender do download dos arquivos do D3."""
+    return alt.Locale(
+        number={
+            "decimal": ",",
+            "thousands": ".",
+            "grouping": [3],
+            "currency": ["R$", ""],
+        },
+        time={
+            "dateTime": "%A, %e de %B de %Y. %X",
+            "date": "%d/%m/%Y",
+            "time": "%H:%M:%S",
+            "periods": ["AM", "PM"],
+            "days": [
+                "Domingo", "Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado",
+            ],
+            "shortDays": ["Dom", "Seg", "Ter", "Qua", "Qui", "Sex", "Sáb"],
+            "months": [
+                "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho",
+                "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro",
+            ],
+            "shortMonths": [
+                "Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out",
+                "Nov", "Dez",
+            ],
+        },
+    )
+
+
+def cria_coletas(n_estacoes: int = 4, n_dias: int = 30) -> pd.DataFrame:
+    """Coletas sintéticas no formato longo: dois poluentes por estação e dia."""
+    rng = np.random.default_rng(0)
+    estados = ["RJ", "SP", "MG", "ES"]
+    linhas = []
+    for i in range(n_estacoes):
+        for dia in pd.date_range("2025-01-01", periods=n_dias, freq="D"):
+            for poluente in ("pol_a", "pol_b"):
+                linhas.append(
+                    {
+                        "station_name": f"E{i}",
+                        "lat": -22.0 - i * 0.5,
+                        "lon": -43.0 - i * 0.5,
+                        "sample_dt": dia,
+                        "city": f"Cidade {i}",
+                        "state": estados[i % len(estados)],
+                        "pollutant": poluente,
+                        "value": rng.uniform(0, 10),
+                    }
+                )
+    return pd.DataFrame(linhas)
+
+
+@pytest.fixture
+def coletas() -> pd.DataFrame:
+    return cria_coletas()
+
+
+@pytest.fixture
+def coletas_geo(coletas: pd.DataFrame) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        coletas,
+        geometry=gpd.points_from_xy(coletas["lon"], coletas["lat"]),
+        crs="EPSG:4326",
+    )
+
+
+@pytest.fixture
+def municipios(monkeypatch, coletas: pd.DataFrame) -> gpd.GeoDataFrame:
+    """Malha sintética no lugar do armazenamento local das malhas municipais.
+
+    Um quadrado por cidade das coletas e mais um município sem coletas no RJ.
+    """
+    cidades = coletas[["state", "city"]].drop_duplicates().to_numpy().tolist()
+    cidades.append(["RJ", "Sem Coletas"])
+    malha = gpd.GeoDataFrame(
+        {
+            "id": [str(i) for i in range(len(cidades))],
+            "city": [cidade for _, cidade in cidades],
+            "state": [uf for uf, _ in cidades],
+        },
+        geometry=[box(-44 + i, -23, -43.5 + i, -22.5) for i in range(len(cidades))],
+        crs="EPSG:4326",
+    )
+
+    def json_municipios(ufs, tolerancia=0.0):
+        return malha[malha["state"].isin(ufs)].copy()
+
+    monkeypatch.setattr(geo, "json_municipios", json_municipios)
+    return malha
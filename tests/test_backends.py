@@ -0,0 +1,26 @@
+import numpy as np
+
+from utils.backends import BackendParquet, BackendSQLite
+from utils.dataset import grava_dataset
+from utils.db import ingere_parquet
+
+
+def test_combinacoes_filtros_incluem_pares_sem_valores(tmp_path, coletas):
+    # Todas as coletas de um par (estação, poluente) sem valor: o par não tem
+    # agregados, mas as coletas existem e devem aparecer nos filtros
+    sem_valor = (coletas["station_name"] == "E2") & (coletas["pollutant"] == "pol_b")
+    coletas.loc[sem_valor, "value"] = np.nan
+    data_path, db_path = tmp_path / "coletas", tmp_path / "coletas.db"
+    grava_dataset(coletas, data_path)
+    ingere_parquet(data_path, db_path)
+
+    sqlite = set(BackendSQLite(db_path).combinacoes_filtros())
+    parquet = set(BackendParquet(data_path).combinacoes_filtros())
+
+    esperadas = set(
+        coletas[["state", "city", "station_name", "pollutant"]].itertuples(
+            index=False, name=None
+        )
+    )
+    assert ("MG", "Cidade 2", "E2", "pol_b") in sqlite
+    assert sqlite == parquet == esperadas
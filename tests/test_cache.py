@@ -0,0 +1,139 @@
+import pandas as pd
+import pytest
+
+from utils.cache import CacheResultados, colunas_filtro, filtra_coletas
+from utils.constants import NA_VALUE
+from utils.sql import normaliza_filtro
+
+COLUNAS = (
+    "state", "city", "station_name", "lat", "lon", "sample_dt", "pollutant", "value"
+)
+
+
+@pytest.fixture
+def coletas_oceanicas(coletas: pd.DataFrame) -> pd.DataFrame:
+    """Coletas com uma estação oceânica (estado e cidade N/A)."""
+    oceanica = coletas[coletas["station_name"] == "E0"].assign(
+        station_name="Boia", state=NA_VALUE, city=NA_VALUE
+    )
+    return pd.concat([coletas, oceanica], ignore_index=True)[list(COLUNAS)]
+
+
+def _filtro(coletas, estados=None, poluentes=("pol_a", "pol_b"), **kwargs):
+    estados = estados or sorted(set(coletas["state"]) - {NA_VALUE})
+    selecao = coletas[coletas["state"].isin(estados)]
+    return normaliza_filtro(
+        estados,
+        selecao["city"].unique(),
+        selecao["station_name"].unique(),
+        poluentes,
+        **kwargs,
+    )
+
+
+def test_normaliza_filtro_ignora_ordem_e_repeticoes():
+    a = normaliza_filtro(["SP", "RJ", "SP"], ["b", "a"], ["E1"], ["pol_b", "pol_a"])
+    b = normaliza_filtro(["RJ", "SP"], ["a", "b"], ["E1", "E1"], ["pol_a", "pol_b"])
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a.estados == ("RJ", "SP")
+
+
+def test_filtro_contem_selecoes_mais_restritas():
+    amplo = normaliza_filtro(["RJ", "SP"], ["a", "b"], ["E0", "E1"], ["pol_a"])
+    restrito = normaliza_filtro(["RJ"], ["a"], ["E0"], ["pol_a"])
+    assert amplo.contem(restrito)
+    assert not restrito.contem(amplo)
+    # As coletas oceânicas não estão no filtro amplo
+    assert not amplo.contem(restrito._replace(incluir_oceanicas=True))
+    # Uma área só contém áreas dentro dela
+    com_area = amplo._replace(area=(-24.0, -45.0, -21.0, -42.0))
+    assert com_area.contem(restrito._replace(area=(-23.0, -44.0, -22.0, -43.0)))
+    assert not com_area.contem(restrito)
+
+
+def test_colunas_filtro_so_das_restricoes_que_mudam(coletas_oceanicas):
+    base = _filtro(coletas_oceanicas)
+    menos_estacoes = base._replace(estacoes=base.estacoes[:1])
+    assert colunas_filtro(menos_estacoes, base) == {"station_name"}
+    assert colunas_filtro(base._replace(poluentes=("pol_a",)), base) == {"pollutant"}
+    com_oceanicas = menos_estacoes._replace(incluir_oceanicas=True)
+    assert colunas_filtro(com_oceanicas, base) == {"state", "city", "station_name"}
+    assert colunas_filtro(base) == {"state", "city", "station_name", "pollutant"}
+
+
+def test_filtra_coletas_mantem_as_oceanicas_dos_poluentes(coletas_oceanicas):
+    filtro = _filtro(
+        coletas_oceanicas, ["RJ"], poluentes=("pol_a",), incluir_oceanicas=True
+    )
+    resultado = filtra_coletas(coletas_oceanicas, filtro)
+
+    assert set(resultado["station_name"]) == {"E0", "Boia"}
+    assert set(resultado["pollutant"]) == {"pol_a"}
+    sem_oceanicas = filtra_coletas(
+        coletas_oceanicas, filtro._replace(incluir_oceanicas=False)
+    )
+    assert set(sem_oceanicas["station_name"]) == {"E0"}
+
+
+def test_cache_responde_subconjunto_a_partir_do_resultado_amplo(coletas_oceanicas):
+    cache = CacheResultados()
+    amplo = _filtro(coletas_oceanicas)
+    base = filtra_coletas(coletas_oceanicas, amplo)
+    cache.guarda(amplo, 1, COLUNAS, base)
+
+    restrito = _filtro(coletas_oceanicas, ["RJ", "SP"], poluentes=("pol_b",))
+    colunas = ("station_name", "sample_dt", "value")
+    resultado = cache.obtem(restrito, 1, colunas)
+
+    esperado = filtra_coletas(coletas_oceanicas, restrito)[list(colunas)]
+    pd.testing.assert_frame_equal(resultado, esperado)
+    # O resultado derivado é guardado com a própria chave
+    assert (restrito, colunas) in cache._entradas
+
+
+def test_cache_nao_usa_base_sem_as_colunas_do_filtro(coletas_oceanicas):
+    cache = CacheResultados()
+    amplo = _filtro(coletas_oceanicas)
+    colunas = ("station_name", "sample_dt", "value")
+    cache.guarda(amplo, 1, colunas, coletas_oceanicas[list(colunas)])
+
+    # Restringir os poluentes exige a coluna 'pollutant', ausente da base
+    assert cache.obtem(amplo._replace(poluentes=("pol_a",)), 1, colunas) is None
+    # Restringir as estações usa só 'station_name'
+    resultado = cache.obtem(amplo._replace(estacoes=("E1",)), 1, colunas)
+    assert set(resultado["station_name"]) == {"E1"}
+
+
+def test_cache_descarta_tudo_quando_a_versao_muda(coletas_oceanicas):
+    cache = CacheResultados()
+    filtro = _filtro(coletas_oceanicas)
+    cache.guarda(filtro, 1, COLUNAS, coletas_oceanicas)
+
+    assert cache.obtem(filtro, 1, COLUNAS) is coletas_oceanicas
+    assert cache.obtem(filtro, 2, COLUNAS) is None
+    assert cache.obtem(filtro, 1, COLUNAS) is None
+
+
+def test_cache_descarta_os_menos_usados_ao_passar_do_limite(coletas_oceanicas):
+    partes = {
+        uf: coletas_oceanicas[coletas_oceanicas["state"] == uf]
+        for uf in ("RJ", "SP", "MG")
+    }
+    filtros = {uf: _filtro(coletas_oceanicas, [uf]) for uf in partes}
+    maior = max(int(df.memory_usage(deep=True).sum()) for df in partes.values())
+    cache = CacheResultados(limite_bytes=2 * maior)
+
+    cache.guarda(filtros["RJ"], 1, COLUNAS, partes["RJ"])
+    cache.guarda(filtros["SP"], 1, COLUNAS, partes["SP"])
+    # Usar RJ o torna o mais recente; SP é o descartado ao guardar MG
+    assert cache.obtem(filtros["RJ"], 1, COLUNAS) is partes["RJ"]
+    cache.guarda(filtros["MG"], 1, COLUNAS, partes["MG"])
+
+    assert cache.obtem(filtros["SP"], 1, COLUNAS) is None
+    assert cache.obtem(filtros["RJ"], 1, COLUNAS) is partes["RJ"]
+    assert cache._total <= cache.limite_bytes
+    # Um resultado maior que o limite total não é guardado
+    pequeno = CacheResultados(limite_bytes=1)
+    pequeno.guarda(filtros["RJ"], 1, COLUNAS, partes["RJ"])
+    assert pequeno.obtem(filtros["RJ"], 1, COLUNAS) is None
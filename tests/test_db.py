@@ -0,0 +1,140 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utils.dataset import grava_dataset
+from utils.db import SCHEMA_VERSAO, ingere_parquet
+
+
+@pytest.fixture
+def caminhos(tmp_path):
+    return tmp_path / "coletas", tmp_path / "coletas.db"
+
+
+def _amostras(db_path) -> pd.DataFrame:
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql_query(
+            "SELECT station_name, pollutant, sample_dt, value FROM coletas "
+            "ORDER BY station_name, pollutant, sample_dt",
+            conn,
+            parse_dates=["sample_dt"],
+        )
+
+
+def _agregados_total(db_path) -> pd.DataFrame:
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql_query(
+            "SELECT e.station_name, p.pollutant, g.n, g.soma FROM agregados g "
+            "JOIN estacoes e ON e.station_id = g.station_id "
+            "JOIN poluentes p ON p.pollutant_id = g.pollutant_id "
+            "WHERE g.granularidade = 'total' ORDER BY e.station_name, p.pollutant",
+            conn,
+        )
+
+
+def _esperado(coletas: pd.DataFrame) -> pd.DataFrame:
+    return (
+        coletas[["station_name", "pollutant", "sample_dt", "value"]]
+        .sort_values(["station_name", "pollutant", "sample_dt"], ignore_index=True)
+    )
+
+
+def test_ingestao_completa_e_sem_mudancas(caminhos, coletas):
+    data_path, db_path = caminhos
+    grava_dataset(coletas, data_path)
+
+    assert ingere_parquet(data_path, db_path) == len(coletas)
+    pd.testing.assert_frame_equal(_amostras(db_path), _esperado(coletas))
+    # Dataset inalterado: nada é relido
+    assert ingere_parquet(data_path, db_path) == 0
+    # completo=True regrava tudo mesmo sem mudanças
+    assert ingere_parquet(data_path, db_path, completo=True) == len(coletas)
+    pd.testing.assert_frame_equal(_amostras(db_path), _esperado(coletas))
+
+
+def test_ingestao_rele_so_as_particoes_alteradas(caminhos, coletas):
+    data_path, db_path = caminhos
+    # A coleta do primeiro dia de uma estação chega depois das demais
+    atrasada = coletas.index[0]
+    grava_dataset(coletas.drop(index=atrasada), data_path)
+    ingere_parquet(data_path, db_path)
+
+    grava_dataset(coletas, data_path)
+    linha = coletas.loc[atrasada]
+    particao = (
+        (coletas["state"] == linha["state"])
+        & (coletas["pollutant"] == linha["pollutant"])
+        & (coletas["sample_dt"].dt.year == linha["sample_dt"].year)
+    )
+    # Só a partição da coleta atrasada é relida, com todas as suas linhas
+    assert ingere_parquet(data_path, db_path) == particao.sum()
+    assert particao.sum() < len(coletas)
+    pd.testing.assert_frame_equal(_amostras(db_path), _esperado(coletas))
+
+
+def test_ingestao_apaga_amostras_de_arquivos_removidos_ou_reduzidos(
+    caminhos, coletas
+):
+    data_path, db_path = caminhos
+    grava_dataset(coletas, data_path)
+    ingere_parquet(data_path, db_path)
+
+    # Sai um estado inteiro (partições removidas) e uma coleta de outra partição
+    restantes = coletas[coletas["state"] != "ES"].iloc[1:]
+    grava_dataset(restantes, data_path)
+    ingere_parquet(data_path, db_path)
+
+    pd.testing.assert_frame_equal(_amostras(db_path), _esperado(restantes))
+    agregados = _agregados_total(db_path)
+    esperados = (
+        restantes.groupby(["station_name", "pollutant"])["value"]
+        .agg(n="count", soma="sum")
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(
+        agregados[["station_name", "pollutant", "n"]],
+        esperados[["station_name", "pollutant", "n"]],
+    )
+    assert agregados["soma"].to_numpy() == pytest.approx(esperados["soma"].to_numpy())
+    with sqlite3.connect(db_path) as conn:
+        registrados = conn.execute("SELECT COUNT(*) FROM arquivos_ingeridos").fetchone()
+    assert registrados[0] == len(list(data_path.rglob("*.parquet")))
+
+
+def test_ingestao_de_parquet_unico(tmp_path, coletas):
+    data_path, db_path = tmp_path / "coletas.parquet", tmp_path / "coletas.db"
+    coletas.to_parquet(data_path)
+    ingere_parquet(data_path, db_path)
+
+    menos = coletas.iloc[10:]
+    menos.to_parquet(data_path)
+    assert ingere_parquet(data_path, db_path) == len(menos)
+    pd.testing.assert_frame_equal(_amostras(db_path), _esperado(menos))
+
+
+@pytest.mark.parametrize("versao_antiga", [None, SCHEMA_VERSAO - 1])
+def test_banco_de_esquema_antigo_e_recriado(caminhos, coletas, versao_antiga):
+    data_path, db_path = caminhos
+    grava_dataset(coletas, data_path)
+    # Banco de uma versão anterior: amostras sem arquivo_id e um registro de
+    # ingestão que, se fosse mantido, faria a ingestão não reler nada
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE amostras (station_id INTEGER, pollutant_id INTEGER, "
+            "sample_day INTEGER, value REAL)"
+        )
+        conn.execute("CREATE TABLE arquivos_ingeridos (arquivo TEXT, hash TEXT)")
+        if versao_antiga is not None:
+            conn.execute("CREATE TABLE esquema (chave TEXT PRIMARY KEY, valor TEXT)")
+            conn.execute(
+                "INSERT INTO esquema VALUES ('versao', ?)", (str(versao_antiga),)
+            )
+
+    assert ingere_parquet(data_path, db_path) == len(coletas)
+    pd.testing.assert_frame_equal(_amostras(db_path), _esperado(coletas))
+    with sqlite3.connect(db_path) as conn:
+        versao = conn.execute("SELECT valor FROM esquema WHERE chave = 'versao'")
+        assert versao.fetchone()[0] == str(SCHEMA_VERSAO)
+        colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(amostras)")}
+    assert "arquivo_id" in colunas
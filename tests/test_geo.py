@@ -0,0 +1,105 @@
+import json
+
+import folium
+import pandas as pd
+import pytest
+
+from manifesto import Manifesto
+from utils import geo
+from utils.constants import NA_VALUE
+from utils.geo import pasta_graficos, salva_mapa_com_graficos
+
+
+def test_mapa_sob_demanda_grava_um_json_por_estacao(tmp_path, coletas_geo, locale):
+    caminho = salva_mapa_com_graficos(coletas_geo, locale, tmp_path / "mapa.html")
+
+    arquivos = sorted(pasta_graficos(caminho).glob("*.json"))
+    assert len(arquivos) == coletas_geo["station_name"].nunique()
+    dados = json.loads(arquivos[0].read_text(encoding="utf-8"))
+    assert dados["poluentes"] == ["A", "B"]
+    assert len(dados["value"]) == len(dados["sample_dt"]) == 60
+
+
+def test_mapa_sob_demanda_nao_embute_as_series(tmp_path, coletas_geo, locale):
+    sob_demanda = salva_mapa_com_graficos(coletas_geo, locale, tmp_path / "a.html")
+    embutido = salva_mapa_com_graficos(
+        coletas_geo, locale, tmp_path / "b.html", sob_demanda=False
+    )
+
+    tamanho = sob_demanda.stat().st_size
+    assert tamanho < embutido.stat().st_size / 2
+    # O HTML cresce com o número de estações, não com o de coletas
+    assert tamanho < 64 * 1024
+    assert not pasta_graficos(embutido).exists()
+
+
+def test_mapa_sob_demanda_remove_arquivos_de_geracoes_anteriores(
+    tmp_path, coletas_geo, locale
+):
+    caminho = tmp_path / "mapa.html"
+    salva_mapa_com_graficos(coletas_geo, locale, caminho)
+    menos = coletas_geo[coletas_geo["station_name"].isin(["E0", "E1"])]
+    salva_mapa_com_graficos(menos, locale, caminho)
+
+    assert len(list(pasta_graficos(caminho).iterdir())) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["mapa.html", "mapa_graficos"]
+
+
+def test_manifesto_refaz_mapa_sem_os_anexos(tmp_path, coletas_geo, locale):
+    caminho = salva_mapa_com_graficos(coletas_geo, locale, tmp_path / "mapa.html")
+    manifesto = Manifesto(tmp_path)
+    manifesto.registra(caminho, "entrada", {"versao": 1}, (pasta_graficos(caminho),))
+    manifesto.salva()
+
+    assert Manifesto(tmp_path).atualizado(caminho, "entrada", {"versao": 1})
+    next(pasta_graficos(caminho).glob("*.json")).unlink()
+    assert not Manifesto(tmp_path).atualizado(caminho, "entrada", {"versao": 1})
+
+
+def _camada_geojson(m: folium.Map) -> folium.GeoJson:
+    return next(c for c in m._children.values() if isinstance(c, folium.GeoJson))
+
+
+def test_mapa_coropletico_colore_os_municipios_com_coletas(municipios, coletas):
+    oceanica = coletas.iloc[:2].assign(city=NA_VALUE, state=NA_VALUE)
+    m = geo.cria_mapa_coropletico(
+        pd.concat([coletas, oceanica], ignore_index=True), "pol_a"
+    )
+
+    feicoes = _camada_geojson(m).data["features"]
+    # Todos os municípios dos estados com coletas; só os com coletas têm valor
+    assert len(feicoes) == len(municipios)
+    propriedades = {f["properties"]["city"]: f["properties"] for f in feicoes}
+    com_valor = {c for c, p in propriedades.items() if p["valor"] is not None}
+    assert com_valor == set(coletas["city"])
+    # O período exibido é o mais recente, e o valor é a média das coletas dele
+    recentes = coletas[
+        (coletas["pollutant"] == "pol_a") & (coletas["sample_dt"].dt.month == 1)
+    ]
+    esperado = recentes.groupby("city")["value"].mean().round(2)
+    for cidade in com_valor:
+        assert propriedades[cidade]["valor"] == pytest.approx(esperado[cidade])
+        assert propriedades[cidade]["n_coletas"] == 30
+
+
+def test_mapa_temporal_tem_um_quadro_por_semana(coletas):
+    # Uma estação sem coletas na segunda semana: o quadro existe, com valor nulo
+    lacuna = (coletas["station_name"] == "E1") & (
+        coletas["sample_dt"].between("2025-01-06", "2025-01-12")
+    )
+    m = geo.cria_mapa_temporal(coletas[~lacuna], "pol_a")
+
+    camada = next(
+        c for c in m._children.values() if isinstance(c, geo.CamadaTemporal)
+    )
+    dados = json.loads(camada.dados)
+    semanas = pd.period_range("2025-01-01", "2025-01-30", freq="W")
+    assert dados["quadros"] == [s.start_time.strftime("%Y-%m-%d") for s in semanas]
+    assert [e[0] for e in dados["estacoes"]] == ["E0", "E1", "E2", "E3"]
+    assert len(dados["valores"]) == len(semanas)
+    assert all(len(valores) == 4 for valores in dados["valores"])
+    assert dados["valores"][1][1] is None
+
+    e0 = coletas[(coletas["pollutant"] == "pol_a") & (coletas["station_name"] == "E0")]
+    medias = e0.groupby(e0["sample_dt"].dt.to_period("W"))["value"].mean()
+    assert [v[0] for v in dados["valores"]] == pytest.approx(medias.round(2).tolist())
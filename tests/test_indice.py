@@ -0,0 +1,37 @@
+from utils.constants import NA_VALUE
+from utils.indice import IndiceFiltros
+
+LINHAS = [
+    ("RJ", "Niterói", "E0", "pol_a"),
+    ("RJ", "Niterói", "E0", "pol_b"),
+    ("RJ", "Rio de Janeiro", "E1", "pol_a"),
+    ("SP", "Santos", "E2", "pol_c"),
+    # Mesmo nome de cidade em outro estado: as cidades são indexadas pelo nome
+    ("MG", "Santos", "E3", "pol_a"),
+    (NA_VALUE, NA_VALUE, "Boia", "pol_d"),
+]
+
+
+def test_cascata_de_filtros():
+    indice = IndiceFiltros(LINHAS)
+
+    assert indice.estados() == ["MG", "RJ", "SP"]
+    assert indice.cidades(["RJ"]) == ["Niterói", "Rio de Janeiro"]
+    assert indice.cidades(["SP", "MG"]) == ["Santos"]
+    assert indice.estacoes(["Santos"]) == ["E2", "E3"]
+    assert indice.poluentes(["E0", "E1"]) == ["pol_a", "pol_b"]
+    assert indice.poluentes(["E0"], incluir_oceanicas=True) == [
+        "pol_a",
+        "pol_b",
+        "pol_d",
+    ]
+    assert indice.cidades(["AC"]) == []
+
+
+def test_valores_omitem_na_de_estado_e_cidade():
+    indice = IndiceFiltros(LINHAS)
+
+    assert NA_VALUE not in indice.valores("state")
+    assert NA_VALUE not in indice.valores("city")
+    assert "Boia" in indice.valores("station_name")
+    assert indice.valores("pollutant") == ["pol_a", "pol_b", "pol_c", "pol_d"]
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from manifesto import Manifesto, hash_anexo, hash_dados
+
+
+def test_hash_dados_depende_do_conteudo_e_das_colunas():
+    dados = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+
+    assert hash_dados(dados) == hash_dados(dados.copy().set_axis([5, 6]))
+    assert hash_dados(dados) != hash_dados(dados.assign(a=[1, 3]))
+    assert hash_dados(dados) != hash_dados(dados.rename(columns={"b": "c"}))
+
+
+def test_hash_anexo_de_pasta_depende_de_nomes_e_conteudo(tmp_path):
+    pasta = tmp_path / "graficos"
+    pasta.mkdir()
+    (pasta / "E0.json").write_text("{}")
+    original = hash_anexo(pasta)
+
+    (pasta / "E0.json").rename(pasta / "E1.json")
+    assert hash_anexo(pasta) != original
+    (pasta / "E1.json").rename(pasta / "E0.json")
+    assert hash_anexo(pasta) == original
+    (pasta / "E0.json").write_text("[]")
+    assert hash_anexo(pasta) != original
+
+
+def test_manifesto_so_refaz_artefatos_alterados(tmp_path):
+    mapa = tmp_path / "mapa.html"
+    mapa.write_text("<html></html>")
+    manifesto = Manifesto(tmp_path)
+    manifesto.registra(mapa, "entrada", {"versao": 1, "tipo": "poluentes"})
+    manifesto.salva()
+
+    salvo = Manifesto(tmp_path)
+    assert salvo.atualizado(mapa, "entrada", {"tipo": "poluentes", "versao": 1})
+    assert not salvo.atualizado(mapa, "outra", {"versao": 1, "tipo": "poluentes"})
+    assert not salvo.atualizado(mapa, "entrada", {"versao": 2, "tipo": "poluentes"})
+    assert not salvo.atualizado(tmp_path / "outro.html", "entrada", {"versao": 1})
+    mapa.unlink()
+    assert not salvo.atualizado(mapa, "entrada", {"versao": 1, "tipo": "poluentes"})
+
+
+def test_manifesto_corrompido_e_ignorado(tmp_path):
+    (tmp_path / "manifesto.json").write_text("{ incompleto")
+    assert Manifesto(tmp_path).entradas == {}
@@ -0,0 +1,46 @@
+import pandas as pd
+
+import map as script_mapa
+from utils.constants import NA_VALUE
+
+
+def test_gera_mapas_coropleticos_um_por_poluente(tmp_path, municipios, coletas):
+    oceanica = coletas.iloc[:2].assign(city=NA_VALUE, state=NA_VALUE)
+    dados = pd.concat([coletas, oceanica], ignore_index=True).assign(
+        mes=lambda d: d["sample_dt"].dt.strftime("%Y-%m")
+    )
+    grupos = script_mapa.agrupa_dados(dados)
+    especs = script_mapa.matriz_especs(grupos, poluentes=[])
+
+    resultados = script_mapa.gera_mapas(
+        grupos, especs, tmp_path, processos=1, tipo="coropletico"
+    )
+
+    assert [destino.name for destino, _ in resultados] == [
+        "mapa_coropletico_pol_a.html",
+        "mapa_coropletico_pol_b.html",
+    ]
+    # As coletas oceânicas ficam de fora do mapa coroplético
+    assert [n for _, n in resultados] == [len(coletas) // 2] * 2
+    assert all(destino.exists() for destino, _ in resultados)
+    # Uma segunda execução com os mesmos dados mantém os mapas
+    resultados = script_mapa.gera_mapas(
+        grupos, especs, tmp_path, processos=1, tipo="coropletico"
+    )
+    assert [n for _, n in resultados] == [None, None]
+
+
+def test_gera_mapas_temporais_com_todos_os_quadros(tmp_path, coletas):
+    dados = coletas.assign(mes=coletas["sample_dt"].dt.strftime("%Y-%m"))
+    grupos = script_mapa.agrupa_dados(dados)
+    especs = script_mapa.matriz_especs(grupos, poluentes=["pol_b"])
+
+    [(destino, n_coletas)] = script_mapa.gera_mapas(
+        grupos, especs, tmp_path, processos=1, tipo="temporal"
+    )
+
+    assert destino.name == "mapa_temporal_pol_b.html"
+    assert n_coletas == len(coletas) // 2
+    html = destino.read_text(encoding="utf-8")
+    for semana in pd.period_range("2025-01-01", "2025-01-30", freq="W"):
+        assert semana.start_time.strftime("%Y-%m-%d") in html
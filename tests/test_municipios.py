@@ -0,0 +1,99 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from utils import municipios as mod_municipios
+from utils.constants import NA_VALUE
+from utils.municipios import (
+    COLUNAS_MUNICIPIOS,
+    arquivo_municipios,
+    carrega_municipios,
+    localiza_estacoes,
+    localiza_pontos,
+)
+
+# Dois municípios vizinhos no RJ, com divisa em lon = -43
+MALHA = gpd.GeoDataFrame(
+    {"id": ["1", "2"], "city": ["A", "B"], "state": ["RJ", "RJ"]},
+    geometry=[box(-44, -23, -43, -22), box(-43, -23, -42, -22)],
+    crs="EPSG:4326",
+)
+
+
+def _grava_malha(pasta, tolerancias=(0.0,)):
+    for tolerancia in tolerancias:
+        destino = arquivo_municipios("RJ", tolerancia, pasta)
+        destino.parent.mkdir(parents=True)
+        MALHA.to_parquet(destino, write_covering_bbox=True)
+
+
+def test_carrega_municipios_so_com_as_colunas_da_malha(tmp_path):
+    _grava_malha(tmp_path, (0.0, 0.01))
+
+    municipios = carrega_municipios("RJ", 0.01, pasta=tmp_path)
+    assert municipios.columns.tolist() == COLUNAS_MUNICIPIOS
+    assert municipios["city"].tolist() == ["A", "B"]
+
+    # A leitura por caixa também não traz a coluna da partição
+    recorte = carrega_municipios(
+        "RJ", pasta=tmp_path, bbox=(-43.9, -22.9, -43.5, -22.5)
+    )
+    assert recorte.columns.tolist() == COLUNAS_MUNICIPIOS
+    assert recorte["city"].tolist() == ["A"]
+
+
+def test_localiza_pontos_na_divisa_e_fora_dos_municipios():
+    lat = np.array([-22.5, -22.5, -22.5, -30.0, np.nan])
+    lon = np.array([-43.5, -42.5, -43.0, -43.5, -43.5])
+
+    localizados = localiza_pontos(lat, lon, MALHA)
+
+    # Na divisa fica o primeiro município; fora de todos ou sem coordenadas, N/A
+    assert localizados["city"].tolist() == ["A", "B", "A", NA_VALUE, NA_VALUE]
+    assert localizados["state"].tolist() == ["RJ", "RJ", "RJ", NA_VALUE, NA_VALUE]
+
+
+def test_localiza_estacoes_so_localiza_as_novas_ou_movidas(tmp_path, monkeypatch):
+    _grava_malha(tmp_path / "malhas")
+    tabela = tmp_path / "estacoes_municipios.parquet"
+    localizados = []
+    original = mod_municipios.localiza_pontos
+
+    def localiza_pontos_contando(lat, lon, municipios):
+        localizados.append(len(lat))
+        return original(lat, lon, municipios)
+
+    monkeypatch.setattr(mod_municipios, "localiza_pontos", localiza_pontos_contando)
+    estacoes = pd.DataFrame(
+        {"station_name": ["E0", "E0", "E1"], "lat": [-22.5] * 3, "lon": [-43.5] * 3}
+    )
+    kwargs = {"caminho": tabela, "pasta": tmp_path / "malhas"}
+
+    primeira = localiza_estacoes(estacoes, **kwargs)
+    assert primeira["city"].tolist() == ["A", "A"]
+    assert localizados == [2]
+
+    # E1 foi movida para o município B e E2 está no mar
+    estacoes = pd.DataFrame(
+        {
+            "station_name": ["E0", "E1", "E2"],
+            "lat": [-22.5, -22.5, -30.0],
+            "lon": [-43.5, -42.5, -43.5],
+        }
+    )
+    segunda = localiza_estacoes(estacoes, **kwargs)
+    assert segunda["city"].tolist() == ["A", "B", NA_VALUE]
+    assert localizados == [2, 2]
+    # Só há malha do RJ: a estação no mar não é gravada como definitiva
+    gravadas = pd.read_parquet(tabela)
+    assert sorted(gravadas["station_name"]) == ["E0", "E1", "E1"]
+
+
+def test_localiza_estacoes_sem_malhas(tmp_path):
+    estacoes = pd.DataFrame({"station_name": ["E0"], "lat": [-22.5], "lon": [-43.5]})
+    with pytest.raises(FileNotFoundError):
+        localiza_estacoes(
+            estacoes, caminho=tmp_path / "tabela.parquet", pasta=tmp_path / "malhas"
+        )